@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
 from redis.asyncio import Redis
 
-from backend.database.database import session_dep
+from backend.database.database import session_dep, read_session_dep, new_session, pool_stats, engine, read_engine
 from backend.dependencies import check_admin, check_vacancy, check_resume, check_user_for_edit_by_admin
 from backend.models.user import User
 from backend.models.vacancy import Vacancy
@@ -11,6 +11,14 @@ from backend.schemas.vacancy import EditVacancy
 from backend.schemas.resume import EditResume
 from backend.services.admin import get_all_users, edit_user_name, update_user_role, delete_user_by_admin, edit_vacancy_by_admin, get_all_vacancies, delete_vacancy_by_admin, edit_resume_by_admin, get_all_resumes, delete_resume_by_admin, get_all_responses, delete_response_by_admin
 from backend.database.redis_database import get_redis
+from backend.utils.skill_index import skill_index
+from backend.utils.match_index import match_index
+from backend.utils.search_cache import search_cache_stats
+from backend.utils.local_cache import local_cache, redis_cache_stats
+from backend.services.facets import rebuild_facets
+from backend.utils.hash import hash_executor
+from backend.utils.limiter import pre_limiter_stats
+from backend.utils.suggest import rebuild_suggestions
 
 
 router = APIRouter()
@@ -18,9 +26,9 @@ router = APIRouter()
 
 #-------------Work with users-------------
 @router.get('/admin/get_users', tags=['Admin'])
-async def get_users(session: session_dep, limit: int = 10, offset: int = 0, admin: User = Depends(check_admin)):
+async def get_users(session: read_session_dep, limit: int = 10, offset: int = 0, cursor: str | None = None, estimate: bool = False, admin: User = Depends(check_admin), redis: Redis = Depends(get_redis)):
     
-    users_info = await get_all_users(session=session, limit=limit, offset=offset, admin=admin)
+    users_info = await get_all_users(session=session, redis=redis, limit=limit, offset=offset, cursor=cursor, estimate=estimate, admin=admin)
     return {**users_info}
 
 
@@ -54,9 +62,9 @@ async def edit_vacancy(session: session_dep, current_vacancy: Vacancy = Depends(
 
 
 @router.get('/admin/get_vacancies', tags=['Admin'])
-async def get_vacancies(session: session_dep, limit: int = 10, offset: int = 0, admin: User = Depends(check_admin)):
+async def get_vacancies(session: read_session_dep, limit: int = 10, offset: int = 0, cursor: str | None = None, estimate: bool = False, admin: User = Depends(check_admin), redis: Redis = Depends(get_redis)):
 
-    vacancies_info = await get_all_vacancies(session=session, limit=limit, offset=offset, admin=admin)
+    vacancies_info = await get_all_vacancies(session=session, redis=redis, limit=limit, offset=offset, cursor=cursor, estimate=estimate, admin=admin)
     return {**vacancies_info}
 
 
@@ -76,9 +84,9 @@ async def edit_resume(session: session_dep, current_resume: Resume = Depends(che
 
 
 @router.get('/admin/get_resumes', tags=['Admin'])
-async def get_resumes(session: session_dep, limit: int = 10, offset: int = 0, admin: User = Depends(check_admin)):
+async def get_resumes(session: read_session_dep, limit: int = 10, offset: int = 0, cursor: str | None = None, estimate: bool = False, admin: User = Depends(check_admin), redis: Redis = Depends(get_redis)):
 
-    resumes_info = await get_all_resumes(session=session, limit=limit, offset=offset, admin=admin)
+    resumes_info = await get_all_resumes(session=session, redis=redis, limit=limit, offset=offset, cursor=cursor, estimate=estimate, admin=admin)
     return {**resumes_info}
 
 
@@ -91,9 +99,9 @@ async def delete_resume(session: session_dep, current_resume: Resume = Depends(c
 
 #-------------Work with responses-------------
 @router.get('/admin/get_responses', tags=['Admin'])
-async def get_responses(session: session_dep, limit: int = 10, offset: int = 0, admin: User = Depends(check_admin)):
+async def get_responses(session: read_session_dep, limit: int = 10, offset: int = 0, cursor: str | None = None, estimate: bool = False, admin: User = Depends(check_admin), redis: Redis = Depends(get_redis)):
 
-    responses_info = await get_all_responses(session=session, limit=limit, offset=offset, admin=admin)    
+    responses_info = await get_all_responses(session=session, redis=redis, limit=limit, offset=offset, cursor=cursor, estimate=estimate, admin=admin)    
     return {**responses_info}
 
 
@@ -101,4 +109,35 @@ async def get_responses(session: session_dep, limit: int = 10, offset: int = 0,
 async def delete_response(response_id: int, session: session_dep, admin: User = Depends(check_admin)):
 
     await delete_response_by_admin(response_id, session, admin)
-    return {'success': True, 'message': 'Response was deleted'}
\ No newline at end of file
+    return {'success': True, 'message': 'Response was deleted'}
+
+
+#-------------Metrics-------------
+@router.get('/admin/metrics', tags=['Admin'])
+async def get_metrics(admin: User = Depends(check_admin)):
+
+    return {
+        'skill_index': skill_index.stats(),
+        'match_index': match_index.stats(),
+        'search_cache': search_cache_stats.snapshot(),
+        'local_cache': local_cache.snapshot(),
+        'redis_cache': redis_cache_stats.snapshot(),
+        'database_pool': pool_stats(),
+        'password_hashing': hash_executor.stats(),
+        'replica_pool': pool_stats(read_engine) if read_engine is not engine else None,
+        'rate_limiter_pre_limit': pre_limiter_stats()
+    }
+
+
+@router.post('/admin/rebuild_facets', tags=['Admin'])
+async def rebuild_search_facets(session: session_dep, admin: User = Depends(check_admin)):
+
+    await rebuild_facets(session)
+    return {'success': True, 'message': 'Facet counts were rebuilt'}
+
+
+@router.post('/admin/rebuild_suggestions', tags=['Admin'])
+async def rebuild_search_suggestions(admin: User = Depends(check_admin), redis: Redis = Depends(get_redis)):
+
+    await rebuild_suggestions(redis, new_session)
+    return {'success': True, 'message': 'Suggestions were rebuilt'}
\ No newline at end of file
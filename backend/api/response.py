@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
-from backend.database.database import session_dep
+from backend.database.database import session_dep, read_session_dep
 from backend.dependencies import check_user, check_vacancy, check_resume
+from backend.database.loader import prefetch
 from backend.models.user import User
 from backend.models.vacancy import Vacancy
 from backend.models.resume import Resume
 from backend.schemas.response import ResponseSchema, ResponseRead, SetStatus
 from backend.utils.limiter import rate_limiter_factory
-from backend.services.response import send_response_to_vacancy, get_responses_to_vacancy, set_status_to_response
+from backend.services.response import send_response_to_vacancy, get_responses_to_vacancy, set_status_to_response, export_responses_to_vacancy
+from backend.schemas.export import ExportFormat
 
 
 router = APIRouter()
@@ -15,7 +17,8 @@ router = APIRouter()
 
 response_limiter = rate_limiter_factory("/response/apply_to_vacancy/{vacancy_id}", 5, 60)
 
-@router.post('/response/apply_to_vacancy/{vacancy_id}', tags=['Response'], dependencies=[Depends(response_limiter)])
+#Vacancy and resume are read with one statement
+@router.post('/response/apply_to_vacancy/{vacancy_id}', tags=['Response'], dependencies=[Depends(response_limiter), Depends(prefetch(vacancy_id=Vacancy, resume_id=Resume))])
 async def apply_to_vacancy(data: ResponseSchema, session: session_dep, current_vacancy: Vacancy = Depends(check_vacancy), current_resume: Resume = Depends(check_resume), current_user: User = Depends(check_user)):
 
     response = await send_response_to_vacancy(data, session, current_vacancy, current_resume, current_user)
@@ -23,12 +26,18 @@ async def apply_to_vacancy(data: ResponseSchema, session: session_dep, current_v
 
 
 @router.get('/response/{vacancy_id}/get_responses', response_model=list[ResponseRead], tags=['Response'])
-async def get_responses(session: session_dep, current_vacancy: Vacancy = Depends(check_vacancy), current_user: User = Depends(check_user)):
+async def get_responses(session: read_session_dep, current_vacancy: Vacancy = Depends(check_vacancy), current_user: User = Depends(check_user)):
 
     all_resumes = await get_responses_to_vacancy(session, current_vacancy, current_user)
     return all_resumes
 
 
+@router.get('/response/{vacancy_id}/export_responses', tags=['Response'])
+async def export_responses(export_format: ExportFormat = Query(ExportFormat.ndjson, alias='format'), current_vacancy: Vacancy = Depends(check_vacancy), current_user: User = Depends(check_user)):
+
+    return await export_responses_to_vacancy(current_vacancy, current_user, export_format)
+
+
 set_status_limiter = rate_limiter_factory("/response/set_status/{response_id}", 5, 60)
 
 @router.put('/response/set_status/{response_id}', tags=['Response'], dependencies=[Depends(set_status_limiter)])
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy import select
 from redis.asyncio import Redis
 
 from backend.models.user import User, Role
 from backend.models.resume import Resume
-from backend.database.database import session_dep
+from backend.database.database import session_dep, read_session_dep
 from backend.schemas.resume import CreateResume, EditResume
 from backend.dependencies import check_user, check_resume
 from backend.database.redis_database import get_redis
@@ -22,10 +22,10 @@ async def create_resume(data: CreateResume, session: session_dep, current_user:
 
 
 @router.get('/resume/get_all_my_resumes', tags=['Resume'])
-async def get_all_my_resumes(session: session_dep, current_user: User = Depends(check_user)):
+async def get_all_my_resumes(session: read_session_dep, limit: int | None = Query(None, ge=1, le=100), cursor: str | None = None, current_user: User = Depends(check_user)):
 
-    all_resumes = await get_all_user_resumes(session, current_user)
-    return {'success': True, 'Your resumes': all_resumes}
+    all_resumes = await get_all_user_resumes(session, current_user, limit, cursor)
+    return {'success': True, **all_resumes}
 
 
 @router.put('/resume/edit_resume/{resume_id}', tags=['Resume'])
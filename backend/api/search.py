@@ -1,31 +1,83 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from redis.asyncio import Redis
 
-from backend.dependencies import check_user
-from backend.database.database import session_dep
+from backend.dependencies import check_user, get_user_token
+from backend.database.database import session_dep, read_session_dep
 from backend.models.user import User
-from backend.schemas.search import SearchResumes, SearchVacancies
-from backend.utils.limiter import rate_limiter_factory
+from backend.schemas.search import SearchResumes, SearchVacancies, VacancyFilters, Suggest
+from backend.utils.limiter import rate_limiter_factory, PreLimit
 from backend.database.redis_database import get_redis
-from backend.services.search import search_resumes_service, search_vacancies_service
+from backend.services.search import search_resumes_service, search_vacancies_service, export_resumes_service, export_vacancies_service, suggest_service
+from backend.schemas.export import ExportFormat
+from backend.services.saved_search import create_saved_search, get_user_saved_searches, delete_saved_search
 
 
 router = APIRouter()
 
 
-search_resumes_limiter = rate_limiter_factory("/search/search_resumes", 5, 60)
+#Search misses fill the shared cache, so they read the primary: a lagging replica would put back
+#a page the last write has just invalidated, for every client until it expires
+search_resumes_limiter = rate_limiter_factory("/search/search_resumes", 5, 60, pre_limit=PreLimit())
 
 @router.get('/search/search_resumes', tags=['Search'], dependencies=[Depends(search_resumes_limiter)])
 async def search_resumes(session: session_dep, data: SearchResumes = Depends(), current_user: User = Depends(check_user), redis: Redis = Depends(get_redis)):
 
-    resumes = await search_resumes_service(session, data, current_user, redis)
-    return {**resumes}
+    return await search_resumes_service(session, data, current_user, redis)
 
 
-search_vacancy_limiter = rate_limiter_factory("/search/search_vacancies", 5, 60)
+search_vacancy_limiter = rate_limiter_factory("/search/search_vacancies", 5, 60, pre_limit=PreLimit())
 
 @router.get('/search/search_vacancies', tags=['Search'], dependencies=[Depends(search_vacancy_limiter)])
 async def search_vacancies(session: session_dep, data: SearchVacancies = Depends(), current_user: User = Depends(check_user), redis: Redis = Depends(get_redis)):
 
-    vacancies = await search_vacancies_service(session, data, current_user, redis)
-    return {**vacancies}
\ No newline at end of file
+    return await search_vacancies_service(session, data, current_user, redis)
+
+
+#-------------Suggest-------------
+#Fired on every keystroke: authenticated by the token alone, no user row is read from Postgres,
+#and a worker takes up to 10 requests from Redis at once
+suggest_limiter = rate_limiter_factory("/search/suggest", 60, 10, pre_limit=PreLimit(lease=10))
+
+@router.get('/search/suggest', tags=['Search'], dependencies=[Depends(suggest_limiter)])
+async def suggest(data: Suggest = Depends(), user_id: int = Depends(get_user_token), redis: Redis = Depends(get_redis)):
+
+    suggestions = await suggest_service(data, redis)
+    return {'suggestions': suggestions}
+
+
+#-------------Export-------------
+#limit, offset and cursor are ignored, an export streams every matching row
+export_limiter = rate_limiter_factory("/search/export", 2, 60)
+
+@router.get('/search/export_resumes', tags=['Search'], dependencies=[Depends(export_limiter)])
+async def export_resumes(data: SearchResumes = Depends(), export_format: ExportFormat = Query(ExportFormat.ndjson, alias='format'), current_user: User = Depends(check_user)):
+
+    return await export_resumes_service(data, current_user, export_format)
+
+
+@router.get('/search/export_vacancies', tags=['Search'], dependencies=[Depends(export_limiter)])
+async def export_vacancies(data: SearchVacancies = Depends(), export_format: ExportFormat = Query(ExportFormat.ndjson, alias='format'), current_user: User = Depends(check_user)):
+
+    return await export_vacancies_service(data, current_user, export_format)
+
+
+#-------------Saved searches-------------
+@router.post('/search/saved_searches', tags=['Search'])
+async def save_search(data: VacancyFilters, session: session_dep, current_user: User = Depends(check_user)):
+
+    saved_search = await create_saved_search(data, session, current_user)
+    return {'success': True, 'message': 'Search was saved', 'Saved search': saved_search}
+
+
+@router.get('/search/saved_searches', tags=['Search'])
+async def get_saved_searches(session: read_session_dep, current_user: User = Depends(check_user)):
+
+    saved_searches = await get_user_saved_searches(session, current_user)
+    return {'success': True, 'Your saved searches': saved_searches}
+
+
+@router.delete('/search/saved_searches/{saved_search_id}', tags=['Search'])
+async def delete_search(saved_search_id: int, session: session_dep, current_user: User = Depends(check_user)):
+
+    await delete_saved_search(saved_search_id, session, current_user)
+    return {'success': True, 'message': 'Saved search was deleted'}
\ No newline at end of file
@@ -4,8 +4,8 @@ from redis.asyncio import Redis
 from backend.database.database import session_dep
 from backend.models.user import User
 from backend.schemas.user import CreateUser, Login, EditPassword, EditName, Delete
-from backend.dependencies import check_user
-from backend.utils.limiter import rate_limiter_factory, rate_limiter_factory_by_ip
+from backend.dependencies import check_user, check_user_for_update
+from backend.utils.limiter import rate_limiter_factory, rate_limiter_factory_by_ip, PreLimit
 from backend.database.redis_database import get_redis
 from backend.services.user import create_user, login, get_user_info, update_password, update_name, delete_current_user
 
@@ -20,7 +20,7 @@ async def sign_up(data: CreateUser, session: session_dep):
     return {'success': True, 'message': 'Account was created'}
 
 
-login_limit = rate_limiter_factory_by_ip("/user/sign_in", 5, 60)
+login_limit = rate_limiter_factory_by_ip("/user/sign_in", 5, 60, pre_limit=PreLimit())
 
 @router.post('/user/sign_in', tags=['Users'], dependencies=[Depends(login_limit)])
 async def sign_in(data: Login, session: session_dep, response: Response):
@@ -32,21 +32,20 @@ async def sign_in(data: Login, session: session_dep, response: Response):
 @router.get('/user/get_info', tags=['Users'])
 async def get_info(current_user: User = Depends(check_user), redis: Redis = Depends(get_redis)):
 
-    user_info = await get_user_info(current_user, redis)
-    return {**user_info}
+    return await get_user_info(current_user, redis)
 
 
 password_limit = rate_limiter_factory("/user/edit_password", 5, 60)
 
 @router.put('/user/edit_password', tags=['Users'], dependencies=[Depends(password_limit)])
-async def edit_password(data: EditPassword, session: session_dep, current_user: User = Depends(check_user)):
+async def edit_password(data: EditPassword, session: session_dep, current_user: User = Depends(check_user_for_update), redis: Redis = Depends(get_redis)):
 
-    await update_password(data, session, current_user)
+    await update_password(data, session, current_user, redis)
     return {'success': 'True', 'message': 'Password was changed'}
 
 
 @router.put('/user/edit_name', tags=['Users'])
-async def edit_name(data: EditName, session: session_dep, current_user: User = Depends(check_user), redis: Redis = Depends(get_redis)):
+async def edit_name(data: EditName, session: session_dep, current_user: User = Depends(check_user_for_update), redis: Redis = Depends(get_redis)):
 
     await update_name(data, session, current_user, redis)
     return {'success': True, 'message': 'Name was changed'}
@@ -55,7 +54,7 @@ async def edit_name(data: EditName, session: session_dep, current_user: User = D
 delete_limit = rate_limiter_factory("/user/delete_user", 5, 60)
 
 @router.delete('/user/delete_user', tags=['Users'])
-async def delete_user(data: Delete, session: session_dep, current_user = Depends(check_user), redis: Redis = Depends(get_redis)):
+async def delete_user(data: Delete, session: session_dep, current_user: User = Depends(check_user_for_update), redis: Redis = Depends(get_redis)):
 
     await delete_current_user(data, session, current_user, redis)
     return {'success': True, 'message': 'Account was deleted'}
\ No newline at end of file
@@ -1,13 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from redis.asyncio import Redis
 
 from backend.models.user import User
 from backend.models.vacancy import Vacancy
 from backend.schemas.vacancy import CreateVacancy, EditVacancy
-from backend.database.database import session_dep
+from backend.database.database import session_dep, read_session_dep
 from backend.dependencies import check_user, check_vacancy
 from backend.database.redis_database import get_redis
-from backend.services.vacancy import create_new_vacancy, get_all_user_vacancies, edit_user_vacancy, delete_user_vacancy
+from backend.services.vacancy import create_new_vacancy, get_all_user_vacancies, edit_user_vacancy, delete_user_vacancy, get_vacancy_matches
 
 
 router = APIRouter()
@@ -21,10 +21,10 @@ async def create_vacancy(data: CreateVacancy, session: session_dep, current_user
 
 
 @router.get('/vacancy/get_all_my_vacancies', tags=['Vacancy'])
-async def get_all_my_vacancies(session: session_dep, current_user: User = Depends(check_user)):
+async def get_all_my_vacancies(session: read_session_dep, limit: int | None = Query(None, ge=1, le=100), cursor: str | None = None, current_user: User = Depends(check_user)):
 
-    all_vacancies = await get_all_user_vacancies(session, current_user)
-    return {'success': True, 'Your vacancies': all_vacancies}
+    all_vacancies = await get_all_user_vacancies(session, current_user, limit, cursor)
+    return {'success': True, **all_vacancies}
 
 
 @router.put('/vacancy/edit_vacancy/{vacancy_id}', tags=['Vacancy'])
@@ -38,4 +38,11 @@ async def edit_vacancy(session: session_dep, current_vacancy: Vacancy = Depends(
 async def delete_vacancy(session: session_dep, current_vacancy: Vacancy = Depends(check_vacancy), current_user: User = Depends(check_user), redis: Redis = Depends(get_redis)):
 
     await delete_user_vacancy(session, current_vacancy, current_user, redis)
-    return {'success': True, 'message': 'Vacancy was deleted'}
\ No newline at end of file
+    return {'success': True, 'message': 'Vacancy was deleted'}
+
+
+@router.get('/vacancy/{vacancy_id}/matches', tags=['Vacancy'])
+async def get_matches(session: read_session_dep, limit: int = Query(10, ge=1, le=100), current_vacancy: Vacancy = Depends(check_vacancy), current_user: User = Depends(check_user), redis: Redis = Depends(get_redis)):
+
+    matches = await get_vacancy_matches(session, current_vacancy, current_user, redis, limit)
+    return {'success': True, 'matches': matches}
\ No newline at end of file
@@ -15,11 +15,53 @@ class Settings(BaseSettings):
 
     REDIS_HOST: str
     REDIS_PORT: int
+    #Per worker: the decoded client and the raw bytes client cached bodies are read through
+    REDIS_MAX_CONNECTIONS: int = 100
+    REDIS_BINARY_MAX_CONNECTIONS: int = 50
 
     KEY_FOR_JWT: str
 
     RABBITMQ: str
 
+    #queue keeps DB_POOL_SIZE connections open per worker (plus DB_MAX_OVERFLOW under bursts), null opens one per session
+    DB_POOL: str = 'queue'
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    #Optional read replica (full SQLAlchemy URL), reads stay on the primary for REPLICA_STICKY_SECONDS after a client writes
+    REPLICA_DATABASE_URL: str | None = None
+    REPLICA_STICKY_SECONDS: int = 5
+
+    #check_user / check_admin serve the user from cache for IDENTITY_CACHE_TTL, in-process only when IDENTITY_CACHE_REDIS is off
+    IDENTITY_CACHE_TTL: int = 60
+    IDENTITY_CACHE_REDIS: bool = True
+
+    #bcrypt runs in a thread or process pool of HASH_WORKERS, calls beyond HASH_MAX_PENDING queued ones get a 503
+    HASH_EXECUTOR: str = 'thread'
+    HASH_WORKERS: int = 4
+    HASH_MAX_PENDING: int = 64
+
+    #sliding_log (sorted set per key) or gcra (Lua script, one number per key), rate_limiter_factory(engine=...) overrides it
+    RATE_LIMITER_ENGINE: str = 'sliding_log'
+    #Off turns every factory's pre_limit=PreLimit(...) into a plain Redis check
+    RATE_LIMITER_PRE_LIMIT: bool = True
+
+    SKILL_INDEX_ENABLED: bool = False
+    SKILL_INDEX_REFRESH_SECONDS: int = 300
+
+    MATCH_INDEX_REFRESH_SECONDS: int = 300
+
+    LOCAL_CACHE_MAX_ENTRIES: int = 10_000
+    LOCAL_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    LOCAL_CACHE_TTL: int = 30
+
+    #none, zlib or zstd (needs the optional zstandard package, workers refuse to start without it), applied to cached bodies from CACHE_COMPRESS_MIN_BYTES on
+    CACHE_COMPRESSION: str = 'zlib'
+    CACHE_COMPRESS_MIN_BYTES: int = 4096
+
     @property
     def database(self):
         return f'postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.POSTGRES_DB}'
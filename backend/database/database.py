@@ -1,15 +1,97 @@
+from time import perf_counter, time
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from typing import Annotated
-from fastapi import Depends
-from sqlalchemy import create_engine
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, exc
 from sqlalchemy.orm import sessionmaker
 
 from backend.config import settings
 
 
-engine = create_async_engine(settings.database, future=True, echo=False, poolclass=NullPool)
+class PoolWaitStats:
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, seconds: float):
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3)
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        #Per pool, the primary and the replica engine report their own waits
+        self.wait_stats = PoolWaitStats()
+
+    def connect(self):
+        #Time until a connection is handed out: queue wait, plus connect and pre-ping when one is opened or checked
+        start = perf_counter()
+
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        finally:
+            self.wait_stats.record(perf_counter() - start)
+
+
+def engine_options() -> dict:
+
+    #null opens a connection per session, tests need it since every test runs in its own event loop
+    if settings.DB_POOL == 'null':
+        return {"poolclass": NullPool}
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+
+
+engine = create_async_engine(settings.database, future=True, echo=False, **engine_options())
+
+#Without a replica every read goes to the primary engine
+if settings.REPLICA_DATABASE_URL:
+    read_engine = create_async_engine(settings.REPLICA_DATABASE_URL, future=True, echo=False, **engine_options())
+else:
+    read_engine = engine
+
+
+def pool_stats(pool_engine=engine) -> dict:
+
+    pool = pool_engine.pool
+
+    if not isinstance(pool, InstrumentedQueuePool):
+        return {"pool": settings.DB_POOL}
+
+    return {
+        "pool": settings.DB_POOL,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        **pool.wait_stats.snapshot()
+    }
 
 new_session = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
 
@@ -19,6 +101,42 @@ async def get_session():
 
 session_dep = Annotated[AsyncSession, Depends(get_session)]
 
+
+#Reads of requests that may be a few seconds behind the primary: listings, search, exports
+new_read_session = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=read_engine)
+
+STICKY_COOKIE = 'primary_until'
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+def reads_from_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time()
+    except ValueError:
+        return False
+
+
+async def get_read_session(request: Request):
+
+    #A client that just wrote reads from the primary, so replica lag never hides its own resume or vacancy
+    session_factory = new_session if reads_from_primary(request) else new_read_session
+
+    async with session_factory() as session:
+        yield session
+
+read_session_dep = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+async def stick_to_primary(request: Request, call_next):
+
+    response = await call_next(request)
+
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        primary_until = time() + settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(STICKY_COOKIE, f"{primary_until:.3f}", max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='lax')
+
+    return response
+
 class Base(DeclarativeBase):
     pass
 
@@ -0,0 +1,88 @@
+from collections import defaultdict
+from fastapi import Depends, Request
+from sqlalchemy import select, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database.database import session_dep
+
+
+class Loader:
+    """Request-scoped identity map over the request's session.
+
+    Dependencies ask for rows with want() and get(). Everything wanted and not loaded yet is
+    fetched together on the next get(): one id per model in a single LEFT JOIN statement, several
+    ids of a model with one IN query. Rows come back attached to the session, so services can
+    change and commit them as before.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self._identity: dict[tuple, object] = {}
+        self._pending: dict[type, set[int]] = defaultdict(set)
+
+    def want(self, model, row_id: int):
+        if (model, row_id) not in self._identity:
+            self._pending[model].add(row_id)
+
+    async def get(self, model, row_id: int):
+        self.want(model, row_id)
+        await self.flush()
+        return self._identity.get((model, row_id))
+
+    async def flush(self):
+
+        pending, self._pending = self._pending, defaultdict(set)
+
+        if not pending:
+            return
+
+        #Misses are remembered too, a second get() of a missing row costs nothing
+        for model, ids in pending.items():
+            for row_id in ids:
+                self._identity[(model, row_id)] = None
+
+        if all(len(ids) == 1 for ids in pending.values()):
+            await self._load_fused(pending)
+        else:
+            for model, ids in pending.items():
+                rows = await self.session.scalars(select(model).where(model.id.in_(ids)))
+                for row in rows:
+                    self._identity[(model, row.id)] = row
+
+    async def _load_fused(self, pending: dict):
+
+        #SELECT vacancies.*, resumes.* FROM (SELECT 1) LEFT JOIN vacancies ON id = :v LEFT JOIN resumes ON id = :r
+        models = list(pending)
+        anchor = select(literal(1).label('one')).subquery()
+        stmt = select(*models).select_from(anchor)
+
+        for model in models:
+            stmt = stmt.outerjoin(model, model.id == next(iter(pending[model])))
+
+        row = (await self.session.execute(stmt)).one()
+
+        for model, entity in zip(models, row):
+            if entity is not None:
+                self._identity[(model, entity.id)] = entity
+
+
+async def get_loader(session: session_dep) -> Loader:
+    #FastAPI caches a dependency per request, so every check_* of one request shares this loader
+    return Loader(session)
+
+
+def prefetch(**models):
+    """Route dependency queuing path/query ids for the loader: prefetch(vacancy_id=Vacancy, resume_id=Resume).
+
+    Route level dependencies are resolved before the parameters' ones, so the later check_*
+    dependencies find every id queued and the first of them loads all rows in one statement.
+    """
+
+    async def dependency(request: Request, loader: Loader = Depends(get_loader)):
+        for param, model in models.items():
+            value = request.path_params.get(param) or request.query_params.get(param)
+
+            if value is not None and value.isdigit():
+                loader.want(model, int(value))
+
+    return dependency
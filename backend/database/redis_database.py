@@ -6,7 +6,15 @@ redis_conn = Redis(
     host=settings.REDIS_HOST,
     port=settings.REDIS_PORT,
     decode_responses=True,
-    max_connections=100
+    max_connections=settings.REDIS_MAX_CONNECTIONS
+)
+
+#Same server, raw bytes for the packed cache frames. Created once per worker next to redis_conn
+redis_binary_conn = Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    decode_responses=False,
+    max_connections=settings.REDIS_BINARY_MAX_CONNECTIONS
 )
 
 async def get_redis():
@@ -1,8 +1,13 @@
 from fastapi import Depends, Cookie, HTTPException
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis.asyncio import Redis
 
 from backend.utils.auth import security
 from backend.database.database import session_dep
+from backend.database.redis_database import get_redis
+from backend.database.loader import Loader, get_loader
+from backend.utils.identity_cache import get_identity, set_identity, get_identity_version
 from backend.models.user import User, Role
 from backend.models.vacancy import Vacancy
 from backend.models.resume import Resume
@@ -18,10 +23,28 @@ async def get_user_token(token: str = Cookie()):
         raise HTTPException(status_code=401, detail='No token')
 
 
-async def check_admin(session: session_dep, admin_id: int = Depends(get_user_token)):
+async def get_current_identity(session: AsyncSession, user_id: int, redis: Redis):
 
-    query = await session.execute(select(User).where(User.id == admin_id))
-    current_admin = query.scalar_one_or_none()
+    #The session is only used on a cache miss, a cached user costs no database round trip
+    identity = await get_identity(redis, user_id)
+    if identity:
+        return identity
+
+    #Read before the row: a change committed after this makes set_identity skip the stale snapshot
+    version = await get_identity_version(redis, user_id)
+
+    query = await session.execute(select(User).where(User.id == user_id))
+    current_user = query.scalar_one_or_none()
+
+    if not current_user:
+        return None
+
+    return await set_identity(redis, current_user, version)
+
+
+async def check_admin(session: session_dep, admin_id: int = Depends(get_user_token), redis: Redis = Depends(get_redis)):
+
+    current_admin = await get_current_identity(session, admin_id, redis)
 
     if not current_admin:
         raise HTTPException(status_code=404, detail='Admin not found')
@@ -32,8 +55,19 @@ async def check_admin(session: session_dep, admin_id: int = Depends(get_user_tok
     return current_admin
 
 
-async def check_user(session: session_dep, user_id: int = Depends(get_user_token)):
+async def check_user(session: session_dep, user_id: int = Depends(get_user_token), redis: Redis = Depends(get_redis)):
+
+    current_user = await get_current_identity(session, user_id, redis)
+
+    if not current_user:
+        raise HTTPException(status_code=404, detail='User not found')
+
+    return current_user
+
+
+async def check_user_for_update(session: session_dep, user_id: int = Depends(get_user_token)):
 
+    #The ORM row, for endpoints that verify the password or change the user itself
     query = await session.execute(select(User).where(User.id == user_id))
     current_user = query.scalar_one_or_none()
 
@@ -54,10 +88,9 @@ async def check_user_for_edit_by_admin(session: session_dep, user_id: int):
     return current_user
 
 
-async def check_vacancy(session: session_dep, vacancy_id: int):
+async def check_vacancy(vacancy_id: int, loader: Loader = Depends(get_loader)):
 
-    query = await session.execute(select(Vacancy).where(Vacancy.id == vacancy_id))
-    current_vacancy = query.scalar_one_or_none()
+    current_vacancy = await loader.get(Vacancy, vacancy_id)
 
     if not current_vacancy:
         raise HTTPException(status_code=404, detail='Vacancy not found')
@@ -65,10 +98,9 @@ async def check_vacancy(session: session_dep, vacancy_id: int):
     return current_vacancy
 
 
-async def check_resume(session: session_dep, resume_id: int):
+async def check_resume(resume_id: int, loader: Loader = Depends(get_loader)):
 
-    query = await session.execute(select(Resume).where(Resume.id == resume_id))
-    current_resume = query.scalar_one_or_none()
+    current_resume = await loader.get(Resume, resume_id)
 
     if not current_resume:
         raise HTTPException(status_code=404, detail='Resume not found')
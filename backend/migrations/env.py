@@ -24,6 +24,9 @@ from models.response import Response
 from models.resume import Resume
 from models.user import User
 from models.vacancy import Vacancy
+from models.facet import FacetCount
+from models.skill import Skill, ResumeSkill
+from models.saved_search import SavedSearch
 from config import settings
 
 config.set_main_option('sqlalchemy.url', f"{settings.database}?async_fallback=True")
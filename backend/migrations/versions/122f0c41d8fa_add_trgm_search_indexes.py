@@ -0,0 +1,58 @@
+"""add trigram indexes for search filters
+
+Revision ID: 122f0c41d8fa
+Revises: d6c9eadbc59e
+Create Date: 2026-10-18 10:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '122f0c41d8fa'
+down_revision: Union[str, Sequence[str], None] = 'd6c9eadbc59e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TRGM_INDEXES = [
+    ('ix_resumes_title_trgm', 'resumes', 'title'),
+    ('ix_resumes_stack_trgm', 'resumes', 'stack'),
+    ('ix_resumes_city_trgm', 'resumes', 'city'),
+    ('ix_vacancies_title_trgm', 'vacancies', 'title'),
+    ('ix_vacancies_city_trgm', 'vacancies', 'city'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    #CREATE INDEX CONCURRENTLY can not run inside a transaction block
+    with op.get_context().autocommit_block():
+        for index_name, table_name, column_name in TRGM_INDEXES:
+            op.create_index(
+                index_name,
+                table_name,
+                [column_name],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_ops={column_name: 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for index_name, table_name, _ in TRGM_INDEXES:
+            op.drop_index(
+                index_name,
+                table_name=table_name,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
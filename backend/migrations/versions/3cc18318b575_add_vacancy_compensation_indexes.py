@@ -0,0 +1,30 @@
+"""add composite compensation index for sorted vacancy search
+
+Revision ID: 3cc18318b575
+Revises: 978701182b6c
+Create Date: 2026-10-18 14:05:52.641907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3cc18318b575'
+down_revision: Union[str, Sequence[str], None] = '978701182b6c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_vacancies_compensation_id', 'vacancies', ['compensation', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_vacancies_compensation_id', table_name='vacancies', postgresql_concurrently=True, if_exists=True)
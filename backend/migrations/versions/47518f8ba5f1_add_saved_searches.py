@@ -0,0 +1,49 @@
+"""add saved_searches
+
+Revision ID: 47518f8ba5f1
+Revises: 3cc18318b575
+Create Date: 2026-10-18 14:32:17.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '47518f8ba5f1'
+down_revision: Union[str, Sequence[str], None] = '3cc18318b575'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('saved_searches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('q', sa.String(), nullable=True),
+    sa.Column('city', sa.String(), nullable=True),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('compensation', sa.Integer(), nullable=True),
+    sa.Column('compensation_max', sa.Integer(), nullable=True),
+    sa.Column('city_key', sa.String(), nullable=False),
+    sa.Column('title_key', sa.String(), nullable=False),
+    sa.Column('city_grams', postgresql.ARRAY(sa.String()), nullable=False),
+    sa.Column('title_grams', postgresql.ARRAY(sa.String()), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_saved_searches_city_grams', 'saved_searches', ['city_grams'], unique=False, postgresql_using='gin')
+    op.create_index('ix_saved_searches_title_grams', 'saved_searches', ['title_grams'], unique=False, postgresql_using='gin')
+    op.create_index('ix_saved_searches_user_id_id', 'saved_searches', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_saved_searches_user_id_id', table_name='saved_searches')
+    op.drop_index('ix_saved_searches_title_grams', table_name='saved_searches')
+    op.drop_index('ix_saved_searches_city_grams', table_name='saved_searches')
+    op.drop_table('saved_searches')
@@ -0,0 +1,86 @@
+"""add coordinates and grid cells to resumes and vacancies
+
+Revision ID: 6f0247adf145
+Revises: 47518f8ba5f1
+Create Date: 2026-10-18 15:10:43.218734
+
+"""
+import csv
+import math
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f0247adf145'
+down_revision: Union[str, Sequence[str], None] = '47518f8ba5f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'cities.csv')
+
+#Frozen copy of backend.utils.geo.grid_cell at the time of this revision
+CELL_DEGREES = 0.5
+LON_CELLS = int(360 / CELL_DEGREES) + 1
+
+
+def grid_cell(latitude: float, longitude: float) -> int:
+    return math.floor((latitude + 90) / CELL_DEGREES) * LON_CELLS + math.floor((longitude + 180) / CELL_DEGREES)
+
+
+def backfill(table: str):
+
+    with open(GAZETTEER_PATH, encoding='utf-8') as file:
+        cities = [(" ".join(row['name'].lower().split()), float(row['latitude']), float(row['longitude'])) for row in csv.DictReader(file)]
+
+    op.create_table('gazetteer_backfill',
+    sa.Column('name', sa.String(), primary_key=True),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('geo_cell', sa.Integer(), nullable=False),
+    prefixes=['TEMPORARY']
+    )
+
+    gazetteer = sa.table('gazetteer_backfill', sa.column('name'), sa.column('latitude'), sa.column('longitude'), sa.column('geo_cell'))
+    op.bulk_insert(gazetteer, [
+        {'name': name, 'latitude': latitude, 'longitude': longitude, 'geo_cell': grid_cell(latitude, longitude)}
+        for name, latitude, longitude in cities
+    ])
+
+    op.execute(f"""
+        UPDATE {table} AS t
+        SET latitude = g.latitude, longitude = g.longitude, geo_cell = g.geo_cell
+        FROM gazetteer_backfill AS g
+        WHERE lower(regexp_replace(trim(t.city), '\\s+', ' ', 'g')) = g.name
+    """)
+
+    op.drop_table('gazetteer_backfill')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('resumes', 'vacancies'):
+        op.add_column(table, sa.Column('latitude', sa.Float(), nullable=True))
+        op.add_column(table, sa.Column('longitude', sa.Float(), nullable=True))
+        op.add_column(table, sa.Column('geo_cell', sa.Integer(), nullable=True))
+        backfill(table)
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_resumes_geo_cell_id', 'resumes', ['geo_cell', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_vacancies_geo_cell_id', 'vacancies', ['geo_cell', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_vacancies_geo_cell_id', table_name='vacancies', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_resumes_geo_cell_id', table_name='resumes', postgresql_concurrently=True, if_exists=True)
+
+    for table in ('vacancies', 'resumes'):
+        op.drop_column(table, 'geo_cell')
+        op.drop_column(table, 'longitude')
+        op.drop_column(table, 'latitude')
@@ -0,0 +1,65 @@
+"""add facet_counts aggregates for faceted search
+
+Revision ID: 7124dc416bf0
+Revises: c5d6c95a6f05
+Create Date: 2026-10-18 13:02:41.530219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7124dc416bf0'
+down_revision: Union[str, Sequence[str], None] = 'c5d6c95a6f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+#Frozen copy of the recount at this revision, backend.services.facets.recount_facets() builds the current one
+BACKFILL = """
+    INSERT INTO facet_counts (entity, dimension, city, value, count)
+    SELECT 'resume', 'city', city, '', count(*) FROM resumes GROUP BY city
+    UNION ALL
+    SELECT 'resume', 'skill', city, skill, count(*)
+    FROM (
+        SELECT DISTINCT id, city, trim(regexp_replace(lower(part), '\\s+', ' ', 'g')) AS skill
+        FROM resumes, regexp_split_to_table(stack, '[,;]') AS part
+    ) AS skills
+    WHERE skill <> ''
+    GROUP BY city, skill
+    UNION ALL
+    SELECT 'vacancy', 'compensation', city, bucket::varchar, count(*)
+    FROM (
+        SELECT city, CASE
+            WHEN compensation >= 1000000 THEN 1000000
+            WHEN compensation >= 500000 THEN 500000
+            WHEN compensation >= 300000 THEN 300000
+            WHEN compensation >= 200000 THEN 200000
+            WHEN compensation >= 100000 THEN 100000
+            ELSE 0
+        END AS bucket
+        FROM vacancies
+    ) AS buckets
+    GROUP BY city, bucket
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('facet_counts',
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('dimension', sa.String(), nullable=False),
+    sa.Column('city', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('entity', 'dimension', 'city', 'value')
+    )
+    op.execute(BACKFILL)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('facet_counts')
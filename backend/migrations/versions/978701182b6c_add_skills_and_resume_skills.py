@@ -0,0 +1,62 @@
+"""add skills and resume_skills and backfill them from resume stacks
+
+Revision ID: 978701182b6c
+Revises: 7124dc416bf0
+Create Date: 2026-10-18 13:41:09.207335
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '978701182b6c'
+down_revision: Union[str, Sequence[str], None] = '7124dc416bf0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+#Same normalization as utils.skills.split_stack: split on , and ;, lowercase, collapse whitespace
+RESUME_SKILL_NAMES = """
+    SELECT DISTINCT id AS resume_id, trim(regexp_replace(lower(part), '\\s+', ' ', 'g')) AS name
+    FROM resumes, regexp_split_to_table(stack, '[,;]') AS part
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('skills',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('resume_skills',
+    sa.Column('skill_id', sa.Integer(), nullable=False),
+    sa.Column('resume_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['resume_id'], ['resumes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['skill_id'], ['skills.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('skill_id', 'resume_id')
+    )
+
+    op.execute(f"""
+        INSERT INTO skills (name)
+        SELECT DISTINCT name FROM ({RESUME_SKILL_NAMES}) AS names WHERE name <> ''
+    """)
+    op.execute(f"""
+        INSERT INTO resume_skills (skill_id, resume_id)
+        SELECT skills.id, names.resume_id
+        FROM ({RESUME_SKILL_NAMES}) AS names JOIN skills ON skills.name = names.name
+    """)
+
+    #Built after the backfill, bulk index creation is cheaper than maintaining it row by row
+    op.create_index('ix_resume_skills_resume_id_skill_id', 'resume_skills', ['resume_id', 'skill_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_resume_skills_resume_id_skill_id', table_name='resume_skills')
+    op.drop_table('resume_skills')
+    op.drop_table('skills')
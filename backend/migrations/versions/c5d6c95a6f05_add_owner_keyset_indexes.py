@@ -0,0 +1,32 @@
+"""add owner indexes for keyset pagination of my listings
+
+Revision ID: c5d6c95a6f05
+Revises: e160b7466fe4
+Create Date: 2026-10-18 12:20:05.118364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d6c95a6f05'
+down_revision: Union[str, Sequence[str], None] = 'e160b7466fe4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_resumes_applicant_id_id', 'resumes', ['applicant_id', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_vacancies_tenant_id_id', 'vacancies', ['tenant_id', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_vacancies_tenant_id_id', table_name='vacancies', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_resumes_applicant_id_id', table_name='resumes', postgresql_concurrently=True, if_exists=True)
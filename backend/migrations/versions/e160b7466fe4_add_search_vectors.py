@@ -0,0 +1,51 @@
+"""add generated tsvector columns for full-text search
+
+Revision ID: e160b7466fe4
+Revises: 122f0c41d8fa
+Create Date: 2026-10-18 11:02:17.630942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e160b7466fe4'
+down_revision: Union[str, Sequence[str], None] = '122f0c41d8fa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+RESUME_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(stack, '')), 'B') || "
+    "setweight(to_tsvector('russian', coalesce(about, '')), 'C')"
+)
+
+VACANCY_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(city, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('resumes', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(RESUME_VECTOR, persisted=True), nullable=True))
+    op.add_column('vacancies', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(VACANCY_VECTOR, persisted=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_resumes_search_vector', 'resumes', ['search_vector'], unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_vacancies_search_vector', 'vacancies', ['search_vector'], unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_vacancies_search_vector', table_name='vacancies', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_resumes_search_vector', table_name='resumes', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('vacancies', 'search_vector')
+    op.drop_column('resumes', 'search_vector')
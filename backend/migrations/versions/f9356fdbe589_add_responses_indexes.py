@@ -0,0 +1,43 @@
+"""add unique resume/vacancy index and lookup indexes to responses
+
+Revision ID: f9356fdbe589
+Revises: 6f0247adf145
+Create Date: 2026-10-18 15:41:09.573120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9356fdbe589'
+down_revision: Union[str, Sequence[str], None] = '6f0247adf145'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    #Duplicates let in by the old SELECT-then-INSERT race, the earliest response of each pair is kept
+    op.execute("""
+        DELETE FROM responses AS duplicate
+        USING responses AS original
+        WHERE duplicate.resume_id = original.resume_id
+          AND duplicate.vacancy_id = original.vacancy_id
+          AND duplicate.id > original.id
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_responses_resume_id_vacancy_id', 'responses', ['resume_id', 'vacancy_id'], unique=True, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_responses_vacancy_id', 'responses', ['vacancy_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_responses_applicant_id', 'responses', ['applicant_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_responses_applicant_id', table_name='responses', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_responses_vacancy_id', table_name='responses', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_responses_resume_id_vacancy_id', table_name='responses', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,13 @@
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.database.database import Base
+
+
+class FacetCount(Base):
+    __tablename__ = 'facet_counts'
+
+    entity: Mapped[str] = mapped_column(primary_key=True)
+    dimension: Mapped[str] = mapped_column(primary_key=True)
+    city: Mapped[str] = mapped_column(primary_key=True)
+    value: Mapped[str] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 import enum
 
 from backend.database.database import Base
@@ -23,6 +23,13 @@ class Response(Base):
     cover_letter: Mapped[str | None] = mapped_column(default=None)
     status: Mapped[ResponseStatus] = mapped_column(default="send")
 
+    __table_args__ = (
+        #One response per resume and vacancy, also the conflict target of the apply INSERT
+        Index('ix_responses_resume_id_vacancy_id', 'resume_id', 'vacancy_id', unique=True),
+        Index('ix_responses_vacancy_id', 'vacancy_id'),
+        Index('ix_responses_applicant_id', 'applicant_id'),
+    )
+
     user = relationship('User', back_populates='responses')
     vacancy = relationship('Vacancy', back_populates='responses')
     resume = relationship('Resume', back_populates='responses')
\ No newline at end of file
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 from backend.database.database import Base
 
@@ -14,6 +15,34 @@ class Resume(Base):
     stack: Mapped[str]
     city: Mapped[str]
 
+    #Filled from the bundled gazetteer on write, None for cities it does not know
+    latitude: Mapped[float | None]
+    longitude: Mapped[float | None]
+    geo_cell: Mapped[int | None]
+
+    #'russian' config stems Cyrillic words and falls back to english_stem for Latin ones
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(stack, '')), 'B') || "
+            "setweight(to_tsvector('russian', coalesce(about, '')), 'C')",
+            persisted=True
+        ),
+        deferred=True
+    )
+
+    __table_args__ = (
+        Index('ix_resumes_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        Index('ix_resumes_stack_trgm', 'stack', postgresql_using='gin', postgresql_ops={'stack': 'gin_trgm_ops'}),
+        Index('ix_resumes_city_trgm', 'city', postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'}),
+        Index('ix_resumes_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_resumes_geo_cell_id', 'geo_cell', 'id'),
+        Index('ix_resumes_applicant_id_id', 'applicant_id', 'id'),
+    )
+
+    #Keep the generated search_vector out of INSERT ... RETURNING
+    __mapper_args__ = {'eager_defaults': False}
 
     user = relationship('User', back_populates='resume')
     responses = relationship('Response', back_populates='resume')
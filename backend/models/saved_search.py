@@ -0,0 +1,42 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Index, String
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from backend.database.database import Base
+
+
+class SavedSearch(Base):
+    __tablename__ = 'saved_searches'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id', ondelete='CASCADE'))
+    q: Mapped[str | None] = mapped_column(default=None)
+    city: Mapped[str | None] = mapped_column(default=None)
+    title: Mapped[str | None] = mapped_column(default=None)
+    compensation: Mapped[int | None] = mapped_column(default=None)
+    compensation_max: Mapped[int | None] = mapped_column(default=None)
+
+    #Lowercased city / title filters, '' when the filter is not set
+    city_key: Mapped[str] = mapped_column(default='')
+    title_key: Mapped[str] = mapped_column(default='')
+
+    #Trigrams of the keys. A key can only be a substring of a vacancy's city or title if all its
+    #trigrams are among the vacancy's, so GIN <@ narrows the candidates before the LIKE check
+    city_grams: Mapped[list[str]] = mapped_column(ARRAY(String), default=list)
+    title_grams: Mapped[list[str]] = mapped_column(ARRAY(String), default=list)
+
+    __table_args__ = (
+        Index('ix_saved_searches_city_grams', 'city_grams', postgresql_using='gin'),
+        Index('ix_saved_searches_title_grams', 'title_grams', postgresql_using='gin'),
+        Index('ix_saved_searches_user_id_id', 'user_id', 'id'),
+    )
+
+    def saved_searches_to_dict(self):
+        return {
+            "id": self.id,
+            "q": self.q,
+            "city": self.city,
+            "title": self.title,
+            "compensation": self.compensation,
+            "compensation_max": self.compensation_max
+        }
@@ -0,0 +1,24 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Index
+
+from backend.database.database import Base
+
+
+class Skill(Base):
+    __tablename__ = 'skills'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    #Normalized with utils.skills.normalize_skill, e.g. "postgresql", "machine learning"
+    name: Mapped[str] = mapped_column(unique=True)
+
+
+class ResumeSkill(Base):
+    __tablename__ = 'resume_skills'
+
+    #(skill_id, resume_id) primary key: every skill filter is an index only scan returning resume ids in order
+    skill_id: Mapped[int] = mapped_column(ForeignKey('skills.id', ondelete='CASCADE'), primary_key=True)
+    resume_id: Mapped[int] = mapped_column(ForeignKey('resumes.id', ondelete='CASCADE'), primary_key=True)
+
+    __table_args__ = (
+        Index('ix_resume_skills_resume_id_skill_id', 'resume_id', 'skill_id'),
+    )
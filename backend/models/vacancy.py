@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 from backend.database.database import Base
 
@@ -12,6 +13,33 @@ class Vacancy(Base):
     compensation: Mapped[int]
     city: Mapped[str]
 
+    #Filled from the bundled gazetteer on write, None for cities it does not know
+    latitude: Mapped[float | None]
+    longitude: Mapped[float | None]
+    geo_cell: Mapped[int | None]
+
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(city, '')), 'B')",
+            persisted=True
+        ),
+        deferred=True
+    )
+
+    __table_args__ = (
+        Index('ix_vacancies_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        Index('ix_vacancies_city_trgm', 'city', postgresql_using='gin', postgresql_ops={'city': 'gin_trgm_ops'}),
+        Index('ix_vacancies_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_vacancies_geo_cell_id', 'geo_cell', 'id'),
+        Index('ix_vacancies_tenant_id_id', 'tenant_id', 'id'),
+        Index('ix_vacancies_compensation_id', 'compensation', 'id'),
+    )
+
+    #Keep the generated search_vector out of INSERT ... RETURNING
+    __mapper_args__ = {'eager_defaults': False}
+
     user = relationship('User', back_populates='vacancy')
     responses = relationship('Response', back_populates='vacancy')
 
@@ -1,16 +1,57 @@
 from pydantic import BaseModel, Field
+from enum import Enum
 
 
+class StackMode(str, Enum):
+    all = 'all'
+    any = 'any'
+
+class VacancySort(str, Enum):
+    compensation_desc = 'compensation_desc'
+    compensation_asc = 'compensation_asc'
+    newest = 'newest'
+
+class SuggestEntity(str, Enum):
+    resumes = 'resumes'
+    vacancies = 'vacancies'
+
+class SuggestField(str, Enum):
+    city = 'city'
+    title = 'title'
+    skill = 'skill'
+
 class SearchResumes(BaseModel):
+    q: str | None = Field(None, min_length=2, max_length=100, pattern=r'^[a-zA-Zа-яА-ЯёЁ0-9\s\.,\-"]+$')
     city: str | None = Field(None, min_length=2, max_length=50, pattern=r'^[a-zA-Zа-яА-Я\s]+$')
     stack: str | None = Field(None, min_length=2, max_length=100, pattern=r'^[a-zA-Zа-яА-Я0-9\s\.,!\?\-\(\):;]+$')
+    skills: str | None = Field(None, min_length=1, max_length=100, pattern=r'^[a-zA-Zа-яА-Я0-9\s\.,!\?\-\(\):;]+$')
+    stack_mode: StackMode = StackMode.all
+    near: str | None = Field(None, min_length=2, max_length=50, pattern=r'^[a-zA-Zа-яА-ЯёЁ\s\-]+$')
+    radius_km: int = Field(50, ge=1, le=300)
     title: str | None = Field(None, min_length=2, max_length=100, pattern=r'^[a-zA-Zа-яА-Я\s]+$')
     limit: int = Field(10, ge=1, le=100)
     offset: int = Field(0, ge=0)
+    cursor: str | None = Field(None, max_length=200, pattern=r'^[a-zA-Z0-9_\-]+$')
+    facets: bool = False
 
-class SearchVacancies(BaseModel):
+class VacancyFilters(BaseModel):
+    q: str | None = Field(None, min_length=2, max_length=100, pattern=r'^[a-zA-Zа-яА-ЯёЁ0-9\s\.,\-"]+$')
     city: str | None = Field(None, min_length=2, max_length=50, pattern=r'^[a-zA-Zа-яА-Я\s]+$')
     title: str | None = Field(None, min_length=2, max_length=100, pattern=r'^[a-zA-Zа-яА-Я\s]+$')
     compensation: int | None = Field(None, ge=0, le=10000000)
+    compensation_max: int | None = Field(None, ge=0, le=10000000)
+
+class SearchVacancies(VacancyFilters):
+    near: str | None = Field(None, min_length=2, max_length=50, pattern=r'^[a-zA-Zа-яА-ЯёЁ\s\-]+$')
+    radius_km: int = Field(50, ge=1, le=300)
+    sort: VacancySort | None = None
     limit: int = Field(10, ge=1, le=100)
     offset: int = Field(0, ge=0)
+    cursor: str | None = Field(None, max_length=200, pattern=r'^[a-zA-Z0-9_\-]+$')
+    facets: bool = False
+
+class Suggest(BaseModel):
+    field: SuggestField
+    prefix: str = Field(min_length=1, max_length=50, pattern=r'^[a-zA-Zа-яА-ЯёЁ0-9\s\.,\-\+#]+$')
+    entity: SuggestEntity = SuggestEntity.vacancies
+    limit: int = Field(10, ge=1, le=20)
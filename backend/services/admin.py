@@ -1,5 +1,5 @@
 from fastapi import HTTPException
-from sqlalchemy import select, func
+from sqlalchemy import select
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -11,18 +11,31 @@ from backend.schemas.admin import EditUserNameByAdmin, UpdateUserRoleByAdmin
 from backend.schemas.vacancy import EditVacancy
 from backend.schemas.resume import EditResume
 from backend.dependencies import get_cache_key
+from backend.utils.identity_cache import invalidate_identity
+from backend.utils.pagination import page_by_id, next_cursor
+from backend.utils.table_counts import table_count
+from backend.utils.skill_index import skill_index
+from backend.utils.match_index import match_index
+from backend.utils.search_cache import invalidate_resumes_search, invalidate_vacancies_search
+from backend.utils.suggest import apply_resume_suggestions, apply_vacancy_suggestions
+from backend.utils.geo import place
+from backend.services.facets import apply_resume_facets, apply_vacancy_facets
+from backend.services.skills import sync_resume_skills
+from backend.services.search import get_owned_search_rows
 
 
 #-------------Service for work with users-------------
-async def get_all_users(session: AsyncSession, admin: User, limit: int = 10, offset: int = 0):
-    query = await session.execute(select(User).limit(limit).offset(offset))
+async def get_all_users(session: AsyncSession, redis: Redis, admin: User, limit: int = 10, offset: int = 0, cursor: str | None = None, estimate: bool = False):
+    query = await session.execute(page_by_id(select(User), User.id, limit, offset, cursor))
     users = query.scalars().all()
 
-    quantity = await session.scalar(select(func.count(User.id)))
+    quantity, estimated = await table_count(session, redis, User, estimate)
 
     return {
         'quantity of all users': quantity,
-        'users': users
+        'quantity is estimated': estimated,
+        'users': users,
+        'next_cursor': next_cursor(users, limit, 'id')
     }
 
 
@@ -40,7 +53,7 @@ async def edit_user_name(data: EditUserNameByAdmin, session: AsyncSession, curre
     await session.refresh(current_user)
 
     key = get_cache_key("user", current_user.id, "profile")
-    await redis.delete(key)
+    await invalidate_identity(redis, current_user.id, key)
 
 
 async def update_user_role(session: AsyncSession, data: UpdateUserRoleByAdmin, current_user: User, admin: User, redis: Redis):
@@ -54,7 +67,7 @@ async def update_user_role(session: AsyncSession, data: UpdateUserRoleByAdmin, c
     await session.refresh(current_user)
 
     key = get_cache_key("user", current_user.id, "profile")
-    await redis.delete(key)
+    await invalidate_identity(redis, current_user.id, key)
 
 
 async def delete_user_by_admin(session: AsyncSession, current_user: User, admin: User, redis: Redis):
@@ -65,56 +78,78 @@ async def delete_user_by_admin(session: AsyncSession, current_user: User, admin:
     if current_user.role == Role.admin:
         raise HTTPException(status_code=403, detail='You can not delete other admins')
 
+    owned_resumes, owned_vacancies = await get_owned_search_rows(session, current_user.id)
+
     await session.delete(current_user)
+    await apply_resume_facets(session, removed=owned_resumes)
+    await apply_vacancy_facets(session, removed=owned_vacancies)
     await session.commit()
 
+    skill_index.remove_applicant(current_user.id)
+    match_index.remove_applicant(current_user.id)
+    await apply_resume_suggestions(redis, removed=owned_resumes)
+    await apply_vacancy_suggestions(redis, removed=owned_vacancies)
+    skill_index.advance(await invalidate_resumes_search(redis, *owned_resumes))
+    await invalidate_vacancies_search(redis, *owned_vacancies)
+
     key = get_cache_key("user", current_user.id, "profile")
-    await redis.delete(key)
+    await invalidate_identity(redis, current_user.id, key)
 
 
 #-------------Service for work with vacancies-------------
 async def edit_vacancy_by_admin(session: AsyncSession, current_vacancy: Vacancy, data: EditVacancy, admin: User, redis: Redis):
-    
+
+    old_vacancy = current_vacancy.vacancies_to_dict()
+
     if data.new_title:
         current_vacancy.title = data.new_title
 
     if data.new_city:
         current_vacancy.city = data.new_city
+        place(current_vacancy)
 
     if data.new_compensation:
         current_vacancy.compensation = data.new_compensation
 
+    await apply_vacancy_facets(session, [old_vacancy], [current_vacancy.vacancies_to_dict()])
     await session.commit()
     await session.refresh(current_vacancy)
-    
-    await redis.incr("vacancy_version")
 
+    await apply_vacancy_suggestions(redis, [old_vacancy], [current_vacancy.vacancies_to_dict()])
+    await invalidate_vacancies_search(redis, old_vacancy, current_vacancy.vacancies_to_dict())
 
-async def get_all_vacancies(session: AsyncSession, admin: User, limit: int = 10, offset: int = 0):
+
+async def get_all_vacancies(session: AsyncSession, redis: Redis, admin: User, limit: int = 10, offset: int = 0, cursor: str | None = None, estimate: bool = False):
     
-    query = await session.execute(select(Vacancy).limit(limit).offset(offset))
+    query = await session.execute(page_by_id(select(Vacancy), Vacancy.id, limit, offset, cursor))
     vacancies = query.scalars().all()
 
-    quantity = await session.scalar(select(func.count(Vacancy.id)))
+    quantity, estimated = await table_count(session, redis, Vacancy, estimate)
 
     return {
         'quantity of all vacancies': quantity,
-        'vacancies': vacancies
+        'quantity is estimated': estimated,
+        'vacancies': vacancies,
+        'next_cursor': next_cursor(vacancies, limit, 'id')
     }
 
 
 async def delete_vacancy_by_admin(session: AsyncSession, current_vacancy: Vacancy, admin: User, redis: Redis):
     
     await session.delete(current_vacancy)
+    await apply_vacancy_facets(session, removed=[current_vacancy.vacancies_to_dict()])
     await session.commit()
-    
-    await redis.incr("vacancy_version")
+
+    await apply_vacancy_suggestions(redis, removed=[current_vacancy.vacancies_to_dict()])
+    await invalidate_vacancies_search(redis, current_vacancy.vacancies_to_dict())
 
 
 
 #-------------Service for work with resumes-------------
 async def edit_resume_by_admin(session: AsyncSession, current_resume: Resume, data: EditResume, admin: User, redis: Redis):
-    
+
+    old_resume = current_resume.resumes_to_dict()
+
     if data.new_title:
         current_resume.title = data.new_title
 
@@ -123,47 +158,61 @@ async def edit_resume_by_admin(session: AsyncSession, current_resume: Resume, da
 
     if data.new_city:
         current_resume.city = data.new_city
+        place(current_resume)
 
     if data.new_stack:
         current_resume.stack = data.new_stack
+        await sync_resume_skills(session, current_resume.id, current_resume.stack)
 
+    await apply_resume_facets(session, [old_resume], [current_resume.resumes_to_dict()])
     await session.commit()
     await session.refresh(current_resume)
 
-    await redis.incr("resume_version")
+    skill_index.add(current_resume)
+    match_index.add(current_resume)
+    await apply_resume_suggestions(redis, [old_resume], [current_resume.resumes_to_dict()])
+    skill_index.advance(await invalidate_resumes_search(redis, old_resume, current_resume.resumes_to_dict()))
 
 
-async def get_all_resumes(session: AsyncSession, admin: User, limit: int = 10, offset: int = 0):
+async def get_all_resumes(session: AsyncSession, redis: Redis, admin: User, limit: int = 10, offset: int = 0, cursor: str | None = None, estimate: bool = False):
 
-    query = await session.execute(select(Resume).limit(limit).offset(offset))
+    query = await session.execute(page_by_id(select(Resume), Resume.id, limit, offset, cursor))
     resumes = query.scalars().all()
 
-    quantity = await session.scalar(select(func.count(Resume.id)))
+    quantity, estimated = await table_count(session, redis, Resume, estimate)
 
     return {
         'quantity of all resumes': quantity,
-        'resumes': resumes
+        'quantity is estimated': estimated,
+        'resumes': resumes,
+        'next_cursor': next_cursor(resumes, limit, 'id')
     }
 
 
 async def delete_resume_by_admin(session: AsyncSession, current_resume: Resume, admin: User, redis: Redis):
 
     await session.delete(current_resume)
+    await apply_resume_facets(session, removed=[current_resume.resumes_to_dict()])
     await session.commit()
 
-    await redis.incr("resume_version")
+    skill_index.remove(current_resume.id)
+    match_index.remove(current_resume.id)
+    await apply_resume_suggestions(redis, removed=[current_resume.resumes_to_dict()])
+    skill_index.advance(await invalidate_resumes_search(redis, current_resume.resumes_to_dict()))
 
 
 #-------------Service for work with responses-------------
-async def get_all_responses(session: AsyncSession, admin: User, limit: int = 10, offset: int = 0):
+async def get_all_responses(session: AsyncSession, redis: Redis, admin: User, limit: int = 10, offset: int = 0, cursor: str | None = None, estimate: bool = False):
     
-    query = await session.execute(select(Response).limit(limit).offset(offset))    
+    query = await session.execute(page_by_id(select(Response), Response.id, limit, offset, cursor))    
     responses = query.scalars().all()
-    quantity = await session.scalar(select(func.count(Response.id)))
+    quantity, estimated = await table_count(session, redis, Response, estimate)
 
     return {
         'quantity of all responses': quantity,
-        'responses': responses
+        'quantity is estimated': estimated,
+        'responses': responses,
+        'next_cursor': next_cursor(responses, limit, 'id')
         }
 
 
@@ -0,0 +1,231 @@
+from collections import Counter
+from sqlalchemy import select, func, text, case, cast, literal, union_all, Integer, String
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models.facet import FacetCount
+from backend.models.resume import Resume
+from backend.models.vacancy import Vacancy
+from backend.schemas.search import SearchResumes, SearchVacancies
+from backend.utils.skills import split_stack
+
+
+FACET_LIMIT = 20
+
+#Lower bounds of the compensation buckets shown next to vacancy search results
+COMPENSATION_BUCKETS = [0, 100_000, 200_000, 300_000, 500_000, 1_000_000]
+
+
+def compensation_bucket(compensation: int) -> str:
+    return str(max(bound for bound in COMPENSATION_BUCKETS if bound <= compensation))
+
+
+def resume_facet_keys(resume: dict) -> list[tuple]:
+    keys = [("resume", "city", resume["city"], "")]
+    keys += [("resume", "skill", resume["city"], skill) for skill in split_stack(resume["stack"])]
+
+    return keys
+
+
+def vacancy_facet_keys(vacancy: dict) -> list[tuple]:
+    return [("vacancy", "compensation", vacancy["city"], compensation_bucket(vacancy["compensation"]))]
+
+
+def skill_rows(stack_column):
+    #SQL twin of split_stack: one row per normalized skill of the stack
+    return func.trim(func.regexp_replace(func.lower(func.regexp_split_to_table(stack_column, "[,;]")), r"\s+", " ", "g"))
+
+
+def bucket_of(compensation_column):
+    #SQL twin of compensation_bucket
+    return case(*[(compensation_column >= bound, bound) for bound in reversed(COMPENSATION_BUCKETS)], else_=0)
+
+
+async def apply_facet_deltas(session: AsyncSession, removed: list[dict] = (), added: list[dict] = (), keys=resume_facet_keys):
+    """Move the precomputed facet counts from the removed rows to the added ones.
+
+    Runs inside the caller's transaction, so counts commit or roll back together with the write.
+    """
+
+    deltas = Counter()
+
+    for row in removed:
+        deltas.subtract(keys(row))
+
+    for row in added:
+        deltas.update(keys(row))
+
+    values = [
+        {"entity": entity, "dimension": dimension, "city": city, "value": value, "count": delta}
+        for (entity, dimension, city, value), delta in deltas.items() if delta
+    ]
+
+    if not values:
+        return
+
+    stmt = insert(FacetCount).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FacetCount.entity, FacetCount.dimension, FacetCount.city, FacetCount.value],
+        set_={"count": FacetCount.count + stmt.excluded.count}
+    )
+
+    await session.execute(stmt)
+
+
+async def apply_resume_facets(session: AsyncSession, removed: list[dict] = (), added: list[dict] = ()):
+    await apply_facet_deltas(session, removed, added, keys=resume_facet_keys)
+
+
+async def apply_vacancy_facets(session: AsyncSession, removed: list[dict] = (), added: list[dict] = ()):
+    await apply_facet_deltas(session, removed, added, keys=vacancy_facet_keys)
+
+
+def facet_list(rows) -> list[dict]:
+    return [{"value": value, "count": count} for value, count in rows if count > 0]
+
+
+async def aggregate_facet(session: AsyncSession, entity: str, dimension: str, group_by, city: str | None = None, value: str | None = None, min_bucket: int | None = None):
+
+    total = func.sum(FacetCount.count).label("total")
+    query = (
+        select(group_by, total)
+        .where(FacetCount.entity == entity, FacetCount.dimension == dimension)
+        .group_by(group_by)
+        .order_by(total.desc())
+        .limit(FACET_LIMIT)
+    )
+
+    if city:
+        query = query.where(FacetCount.city.ilike(f"%{city.strip()}%"))
+
+    if value is not None:
+        query = query.where(FacetCount.value == value)
+
+    if min_bucket is not None:
+        query = query.where(cast(FacetCount.value, Integer) >= min_bucket)
+
+    result = await session.execute(query)
+    return facet_list(result.all())
+
+
+async def get_resume_facets(session: AsyncSession, data: SearchResumes, filtered_query):
+
+    skills = split_stack(data.stack)
+
+    #Aggregates are kept per (city, skill), so they answer a city filter and at most one skill exactly
+    if not data.q and not data.title and not data.skills and not data.near and len(skills) <= 1:
+        if skills:
+            return {
+                "city": await aggregate_facet(session, "resume", "skill", FacetCount.city, city=data.city, value=skills[0]),
+                "skill": await live_skill_facet(session, filtered_query)
+            }
+
+        return {
+            "city": await aggregate_facet(session, "resume", "city", FacetCount.city, city=data.city),
+            "skill": await aggregate_facet(session, "resume", "skill", FacetCount.value, city=data.city)
+        }
+
+    return {
+        "city": await live_facet(session, filtered_query, "city"),
+        "skill": await live_skill_facet(session, filtered_query)
+    }
+
+
+async def get_vacancy_facets(session: AsyncSession, data: SearchVacancies, filtered_query):
+
+    on_bucket_boundary = not data.compensation or data.compensation in COMPENSATION_BUCKETS
+
+    if not data.q and not data.title and not data.near and data.compensation_max is None and data.sort is None and on_bucket_boundary:
+        return {
+            "city": await aggregate_facet(session, "vacancy", "compensation", FacetCount.city, city=data.city, min_bucket=data.compensation),
+            "compensation": await aggregate_facet(session, "vacancy", "compensation", FacetCount.value, city=data.city, min_bucket=data.compensation)
+        }
+
+    return {
+        "city": await live_facet(session, filtered_query, "city"),
+        "compensation": await live_compensation_facet(session, filtered_query)
+    }
+
+
+async def live_facet(session: AsyncSession, filtered_query, column: str):
+
+    #Filters the aggregates can not express (title, q, several skills) are counted over the index-served matches
+    filtered = filtered_query.subquery()
+    total = func.count().label("total")
+
+    result = await session.execute(
+        select(filtered.c[column], total)
+        .group_by(filtered.c[column])
+        .order_by(total.desc())
+        .limit(FACET_LIMIT)
+    )
+
+    return facet_list(result.all())
+
+
+async def live_skill_facet(session: AsyncSession, filtered_query):
+
+    filtered = filtered_query.subquery()
+    skills = select(filtered.c.id, skill_rows(filtered.c.stack).label("skill")).distinct().subquery()
+    total = func.count().label("total")
+
+    result = await session.execute(
+        select(skills.c.skill, total)
+        .where(skills.c.skill != "")
+        .group_by(skills.c.skill)
+        .order_by(total.desc())
+        .limit(FACET_LIMIT)
+    )
+
+    return facet_list(result.all())
+
+
+async def live_compensation_facet(session: AsyncSession, filtered_query):
+
+    filtered = filtered_query.subquery()
+    bucket = cast(bucket_of(filtered.c.compensation), String).label("bucket")
+    total = func.count().label("total")
+
+    result = await session.execute(
+        select(bucket, total)
+        .group_by(text("bucket"))
+        .order_by(total.desc())
+        .limit(FACET_LIMIT)
+    )
+
+    return facet_list(result.all())
+
+
+async def rebuild_facets(session: AsyncSession):
+
+    #Full recount, for drift repair after manual SQL changes
+    await session.execute(text("DELETE FROM facet_counts"))
+    await session.execute(recount_facets())
+    await session.commit()
+
+
+def recount_facets():
+    """INSERT ... SELECT of every facet count, built from the same helpers as the live facets.
+
+    Migration 7124dc416bf0 keeps a frozen SQL copy of what this produced when the table was added.
+    """
+
+    resume_cities = select(literal("resume"), literal("city"), Resume.city, literal(""), func.count()).group_by(Resume.city)
+
+    skills = select(Resume.id, Resume.city, skill_rows(Resume.stack).label("skill")).distinct().subquery()
+    resume_skills = (
+        select(literal("resume"), literal("skill"), skills.c.city, skills.c.skill, func.count())
+        .where(skills.c.skill != "")
+        .group_by(skills.c.city, skills.c.skill)
+    )
+
+    buckets = select(Vacancy.city, bucket_of(Vacancy.compensation).label("bucket")).subquery()
+    vacancy_buckets = (
+        select(literal("vacancy"), literal("compensation"), buckets.c.city, cast(buckets.c.bucket, String), func.count())
+        .group_by(buckets.c.city, buckets.c.bucket)
+    )
+
+    return insert(FacetCount).from_select(
+        ["entity", "dimension", "city", "value", "count"],
+        union_all(resume_cities, resume_skills, vacancy_buckets)
+    )
@@ -1,6 +1,7 @@
 import traceback
 from fastapi import HTTPException
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import joinedload
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -11,6 +12,8 @@ from backend.models.resume import Resume
 from backend.models.mails import Mails
 from backend.schemas.response import ResponseSchema, SetStatus
 from backend.utils.celery_tasks import send_mail_task
+from backend.schemas.export import ExportFormat
+from backend.utils.export import export_response
 
 
 async def send_response_to_vacancy(data: ResponseSchema, session: AsyncSession, current_vacancy: Vacancy, current_resume: Resume, current_user: User):
@@ -21,18 +24,18 @@ async def send_response_to_vacancy(data: ResponseSchema, session: AsyncSession,
     if current_user.role != Role.applicant:
         raise HTTPException(status_code=403, detail='Only applicant can apply to vacancy')
 
-    query_check = await session.execute(select(Response).where(Response.resume_id == current_resume.id, Response.vacancy_id == current_vacancy.id))
-
-    if query_check.scalar_one_or_none():
-        raise HTTPException(status_code=400, detail='You have already applied to this vacancy with this resume')
-
-    response = Response(**data.model_dump())
+    #One statement instead of SELECT then INSERT: the unique index decides, so double clicks can not both get in
+    stmt = (
+        insert(Response)
+        .values(**data.model_dump(), applicant_id=current_user.id, resume_id=current_resume.id, vacancy_id=current_vacancy.id)
+        .on_conflict_do_nothing(index_elements=[Response.resume_id, Response.vacancy_id])
+        .returning(Response)
+    )
 
-    response.applicant_id = current_user.id
-    response.resume_id = current_resume.id
-    response.vacancy_id = current_vacancy.id
+    response = (await session.scalars(stmt)).one_or_none()
 
-    session.add(response)
+    if response is None:
+        raise HTTPException(status_code=400, detail='You have already applied to this vacancy with this resume')
 
     mail = Mails(
         recipient_id = current_vacancy.tenant_id,
@@ -98,4 +101,36 @@ async def set_status_to_response(response_id: int, data: SetStatus, session: Asy
 
     send_mail_task.delay(mail.id)
 
-    return current_response
\ No newline at end of file
+    return current_response
+
+
+RESPONSE_EXPORT_FIELDS = ["id", "status", "cover_letter", "resume_id", "resume_title", "resume_stack", "applicant_id", "applicant_name", "applicant_email"]
+
+
+async def export_responses_to_vacancy(current_vacancy: Vacancy, current_user: User, export_format: ExportFormat):
+
+    if current_user.role != Role.tenant:
+        raise HTTPException(status_code=403, detail='You are not a tenant')
+
+    if current_user.id != current_vacancy.tenant_id:
+        raise HTTPException(status_code=403, detail="It's not your vacancy")
+
+    query = (
+        select(
+            Response.id,
+            Response.status,
+            Response.cover_letter,
+            Response.resume_id,
+            Resume.title.label('resume_title'),
+            Resume.stack.label('resume_stack'),
+            Response.applicant_id,
+            User.name.label('applicant_name'),
+            User.email.label('applicant_email')
+        )
+        .join(Resume, Resume.id == Response.resume_id)
+        .join(User, User.id == Response.applicant_id)
+        .where(Response.vacancy_id == current_vacancy.id)
+        .order_by(Response.id)
+    )
+
+    return export_response(query, RESPONSE_EXPORT_FIELDS, export_format, f"vacancy_{current_vacancy.id}_responses")
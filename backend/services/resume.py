@@ -9,6 +9,14 @@ from backend.database.database import session_dep
 from backend.schemas.resume import CreateResume, EditResume
 from backend.dependencies import check_user, check_resume
 from backend.database.redis_database import get_redis
+from backend.utils.pagination import page_by_id, next_cursor
+from backend.utils.skill_index import skill_index
+from backend.utils.match_index import match_index
+from backend.utils.search_cache import invalidate_resumes_search
+from backend.utils.suggest import apply_resume_suggestions
+from backend.utils.geo import place
+from backend.services.facets import apply_resume_facets
+from backend.services.skills import sync_resume_skills
 
 
 async def create_new_resume(data: CreateResume, session: AsyncSession, current_user: User, redis: Redis):
@@ -19,21 +27,35 @@ async def create_new_resume(data: CreateResume, session: AsyncSession, current_u
     new_resume = Resume(**data.model_dump())
 
     new_resume.applicant_id = current_user.id
+    place(new_resume)
 
     session.add(new_resume)
+    await session.flush()
+    await sync_resume_skills(session, new_resume.id, new_resume.stack)
+    await apply_resume_facets(session, added=[new_resume.resumes_to_dict()])
     await session.commit()
 
-    await redis.incr("resume_version")
+    skill_index.add(new_resume)
+    match_index.add(new_resume)
+    await apply_resume_suggestions(redis, added=[new_resume.resumes_to_dict()])
+    skill_index.advance(await invalidate_resumes_search(redis, new_resume.resumes_to_dict()))
 
     return new_resume
 
 
-async def get_all_user_resumes(session: AsyncSession, current_user: User):
+async def get_all_user_resumes(session: AsyncSession, current_user: User, limit: int | None = None, cursor: str | None = None):
 
-    resume_query = await session.execute(select(Resume).where(Resume.applicant_id == current_user.id))
+    query = select(Resume).where(Resume.applicant_id == current_user.id)
+
+    #Without limit the whole list is returned as before
+    if limit is None:
+        resume_query = await session.execute(query.order_by(Resume.id))
+        return {'Your resumes': resume_query.scalars().all(), 'next_cursor': None}
+
+    resume_query = await session.execute(page_by_id(query, Resume.id, limit, cursor=cursor))
     all_resumes = resume_query.scalars().all()
 
-    return all_resumes
+    return {'Your resumes': all_resumes, 'next_cursor': next_cursor(all_resumes, limit, 'id')}
 
 
 async def edit_user_resume(session: AsyncSession, current_resume: Resume, data: EditResume, current_user: User, redis: Redis):
@@ -44,6 +66,8 @@ async def edit_user_resume(session: AsyncSession, current_resume: Resume, data:
     if current_user.id != current_resume.applicant_id:
         raise HTTPException(status_code=403, detail="It's not your resume")
 
+    old_resume = current_resume.resumes_to_dict()
+
     if data.new_title:
         current_resume.title = data.new_title
 
@@ -52,14 +76,20 @@ async def edit_user_resume(session: AsyncSession, current_resume: Resume, data:
 
     if data.new_city:
         current_resume.city = data.new_city
+        place(current_resume)
 
     if data.new_stack:
         current_resume.stack = data.new_stack
+        await sync_resume_skills(session, current_resume.id, current_resume.stack)
 
+    await apply_resume_facets(session, [old_resume], [current_resume.resumes_to_dict()])
     await session.commit()
     await session.refresh(current_resume)
 
-    await redis.incr("resume_version")
+    skill_index.add(current_resume)
+    match_index.add(current_resume)
+    await apply_resume_suggestions(redis, [old_resume], [current_resume.resumes_to_dict()])
+    skill_index.advance(await invalidate_resumes_search(redis, old_resume, current_resume.resumes_to_dict()))
 
 
 async def delete_user_resume(session: AsyncSession, current_resume: Resume, current_user: User, redis: Redis):
@@ -71,6 +101,10 @@ async def delete_user_resume(session: AsyncSession, current_resume: Resume, curr
         raise HTTPException(status_code=403, detail='This is not your resume')
 
     await session.delete(current_resume)
+    await apply_resume_facets(session, removed=[current_resume.resumes_to_dict()])
     await session.commit()
 
-    await redis.incr("resume_version")
\ No newline at end of file
+    skill_index.remove(current_resume.id)
+    match_index.remove(current_resume.id)
+    await apply_resume_suggestions(redis, removed=[current_resume.resumes_to_dict()])
+    await invalidate_resumes_search(redis, current_resume.resumes_to_dict())
\ No newline at end of file
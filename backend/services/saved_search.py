@@ -0,0 +1,111 @@
+from fastapi import HTTPException
+from sqlalchemy import select, func, or_, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models.user import User, Role
+from backend.models.vacancy import Vacancy
+from backend.models.mails import Mails
+from backend.models.saved_search import SavedSearch
+from backend.schemas.search import VacancyFilters
+
+
+MAX_SAVED_SEARCHES = 20
+
+#Same text search config as the generated search_vector columns
+TS_CONFIG = 'russian'
+
+
+def filter_key(value: str | None) -> str:
+    return value.strip().lower() if value else ''
+
+
+def grams(key: str) -> list[str]:
+    #Unpadded trigrams, a key shorter than 3 has none and is left to the LIKE check
+    return sorted({key[start:start + 3] for start in range(len(key) - 2)})
+
+
+async def create_saved_search(data: VacancyFilters, session: AsyncSession, current_user: User):
+
+    if current_user.role != Role.applicant:
+        raise HTTPException(status_code=403, detail='Only applicants can save searches')
+
+    if data.compensation and data.compensation_max is not None and data.compensation > data.compensation_max:
+        raise HTTPException(status_code=400, detail='compensation can not be greater than compensation_max')
+
+    quantity = await session.scalar(select(func.count(SavedSearch.id)).where(SavedSearch.user_id == current_user.id))
+
+    if quantity >= MAX_SAVED_SEARCHES:
+        raise HTTPException(status_code=400, detail=f'You can not have more than {MAX_SAVED_SEARCHES} saved searches')
+
+    saved_search = SavedSearch(**data.model_dump())
+    saved_search.user_id = current_user.id
+    saved_search.city_key = filter_key(data.city)
+    saved_search.title_key = filter_key(data.title)
+    saved_search.city_grams = grams(saved_search.city_key)
+    saved_search.title_grams = grams(saved_search.title_key)
+
+    session.add(saved_search)
+    await session.commit()
+
+    return saved_search.saved_searches_to_dict()
+
+
+async def get_user_saved_searches(session: AsyncSession, current_user: User):
+
+    query = await session.execute(select(SavedSearch).where(SavedSearch.user_id == current_user.id).order_by(SavedSearch.id))
+
+    return [saved_search.saved_searches_to_dict() for saved_search in query.scalars().all()]
+
+
+async def delete_saved_search(saved_search_id: int, session: AsyncSession, current_user: User):
+
+    saved_search = await session.get(SavedSearch, saved_search_id)
+
+    if not saved_search:
+        raise HTTPException(status_code=404, detail='Saved search not found')
+
+    if saved_search.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="It's not your saved search")
+
+    await session.delete(saved_search)
+    await session.commit()
+
+
+def percolate_query(vacancy: Vacancy):
+    """Saved searches the vacancy matches: the search runs backwards, from document to queries.
+
+    Keys are matched in reverse, lower(:city) LIKE '%' || city_key || '%'. The GIN indexes on the
+    key trigrams narrow the candidates to keys whose trigrams all occur in the vacancy, compensation
+    and q are checked on that small set only. Runs in the notify_saved_searches_task worker.
+    """
+
+    city, title = filter_key(vacancy.city), filter_key(vacancy.title)
+
+    return (
+        select(SavedSearch)
+        .join(Vacancy, Vacancy.id == vacancy.id)
+        .where(
+            SavedSearch.city_grams.contained_by(grams(city)),
+            SavedSearch.title_grams.contained_by(grams(title)),
+            literal(city).contains(SavedSearch.city_key),
+            literal(title).contains(SavedSearch.title_key),
+            or_(SavedSearch.compensation.is_(None), Vacancy.compensation >= SavedSearch.compensation),
+            or_(SavedSearch.compensation_max.is_(None), Vacancy.compensation <= SavedSearch.compensation_max),
+            or_(SavedSearch.q.is_(None), Vacancy.search_vector.bool_op('@@')(func.websearch_to_tsquery(TS_CONFIG, SavedSearch.q)))
+        )
+    )
+
+
+def saved_search_mails(vacancy: Vacancy, matched: list[SavedSearch]) -> list[Mails]:
+
+    #One mail per user, however many of their saved searches matched
+    users = sorted({saved_search.user_id for saved_search in matched})
+
+    return [
+        Mails(
+            recipient_id = user_id,
+            subject = "New vacancy for your saved search!",
+            body = f"A new vacancy matches your saved search:\ntitle: {vacancy.title}\ncompensation: {vacancy.compensation}\ncity: {vacancy.city}"
+        )
+        for user_id in users
+    ]
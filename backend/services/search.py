@@ -1,80 +1,306 @@
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, func
 from redis.asyncio import Redis
-import json
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.models.user import User, Role
 from backend.models.vacancy import Vacancy
 from backend.models.resume import Resume
-from backend.schemas.search import SearchResumes, SearchVacancies
+from backend.schemas.search import SearchResumes, SearchVacancies, StackMode, VacancySort, Suggest, SuggestEntity, SuggestField
+from backend.utils.pagination import page_by_id, page_by_rank, page_by_value, next_cursor, decode_cursor
+from backend.utils.skills import split_stack
+from backend.utils.skill_index import skill_index
+from backend.config import settings
+from backend.utils.search_cache import cached_search, get_generation, resume_tags, vacancy_tags
+from backend.services.facets import get_resume_facets, get_vacancy_facets
+from backend.services.skills import resumes_with_skills
+from backend.schemas.export import ExportFormat
+from backend.utils.export import export_response
+from backend.utils.cache_codec import json_response
+from backend.utils.suggest import get_suggestions
+from backend.utils.geo import locate, within_radius
 
 
-async def search_resumes_service(session: AsyncSession, data: SearchResumes, current_user: User, redis: Redis):
+#Same text search config as the generated search_vector columns
+TS_CONFIG = 'russian'
 
-    if current_user.role != Role.tenant:
-        raise HTTPException(status_code=403, detail='Only tenants can search resumes')
 
-    version = await redis.get("resume_version") or "0"
-    search_params = f"version:{version}_q:{data.title or ''}_city:{data.city or ''}_stack:{data.stack or ''}_limit:{data.limit}_offset:{data.offset}"
-    cache_key = f"search:resumes:{search_params}"
+def contains(column, value: str):
+    #Both sides are wildcarded so the pg_trgm GIN index on the column can serve the ILIKE
+    return column.ilike(f'%{value.strip()}%')
+
+
+def text_rank(model, q: str):
+    ts_query = func.websearch_to_tsquery(TS_CONFIG, q)
+    return model.search_vector.bool_op('@@')(ts_query), func.ts_rank(model.search_vector, ts_query)
+
 
-    cached_resumes = await redis.get(cache_key)
-    if cached_resumes:
-        return {"resumes": json.loads(cached_resumes), "source": "cache"}
+def near_filter(model, data: SearchResumes | SearchVacancies):
 
-    query = select(Resume)
+    point = locate(data.near)
+
+    if point is None:
+        raise HTTPException(status_code=400, detail='Unknown city in near')
+
+    return within_radius(model, point, data.radius_km)
+
+
+def build_resumes_query(data: SearchResumes):
+
+    rank = None
+
+    if data.q:
+        matches, rank = text_rank(Resume, data.q)
+        query = select(Resume, rank.label('rank')).where(matches).order_by(rank.desc(), Resume.id)
+    else:
+        query = select(Resume)
 
     if data.city:
-        query = query.where(Resume.city.ilike(f"%{data.city}%"))
+        query = query.where(contains(Resume.city, data.city))
+
+    if data.near:
+        query = query.where(near_filter(Resume, data))
 
-    if data.stack:
-        query = query.where(Resume.stack.ilike(f'%{data.stack}%'))
+    #Exact skill names through resume_skills, the same matching as the skill index and the facet aggregates
+    for skills in (split_stack(data.stack), split_stack(data.skills)):
+        if skills:
+            query = query.where(Resume.id.in_(resumes_with_skills(skills, data.stack_mode == StackMode.all)))
 
     if data.title:
-        query = query.where(Resume.title.ilike(f'%{data.title}%'))
+        query = query.where(contains(Resume.title, data.title))
+
+    return query, rank
+
+
+def build_vacancies_query(data: SearchVacancies):
+
+    rank = None
+
+    if data.q:
+        matches, rank = text_rank(Vacancy, data.q)
+        query = select(Vacancy, rank.label('rank')).where(matches).order_by(rank.desc(), Vacancy.id)
+    else:
+        query = select(Vacancy)
+
+    #Substring match for every sort, like resumes, facets and saved searches. Sorted by pay the
+    #planner picks the city trigram index for narrow cities and walks (compensation, id) for broad ones
+    if data.city:
+        query = query.where(contains(Vacancy.city, data.city))
+
+    if data.near:
+        query = query.where(near_filter(Vacancy, data))
+
+    if data.compensation:
+        query = query.where(Vacancy.compensation >= int(data.compensation))
+
+    if data.compensation_max is not None:
+        query = query.where(Vacancy.compensation <= int(data.compensation_max))
+
+    if data.title:
+        query = query.where(contains(Vacancy.title, data.title))
+
+    return query, rank
+
+
+SORT_BY_COMPENSATION = (VacancySort.compensation_desc, VacancySort.compensation_asc)
+
+
+def paginate(query, rank, id_column, data: SearchResumes | SearchVacancies):
+
+    sort = getattr(data, "sort", None)
+
+    #An explicit sort replaces the rank order of q searches, q then only filters
+    if sort == VacancySort.newest:
+        return page_by_id(query.order_by(None), id_column, data.limit, data.offset, data.cursor, descending=True)
+
+    if sort in SORT_BY_COMPENSATION:
+        descending = sort == VacancySort.compensation_desc
+        return page_by_value(query.order_by(None), Vacancy.compensation, id_column, data.limit, data.offset, data.cursor, descending)
+
+    if rank is not None:
+        return page_by_rank(query, rank, id_column, data.limit, data.offset, data.cursor)
+
+    return page_by_id(query, id_column, data.limit, data.offset, data.cursor)
+
+
+def page_cursor(items: list, data: SearchResumes | SearchVacancies):
+
+    sort = getattr(data, "sort", None)
+
+    if sort in SORT_BY_COMPENSATION:
+        return next_cursor(items, data.limit, "compensation", "id")
+
+    if sort == VacancySort.newest:
+        return next_cursor(items, data.limit, "id")
+
+    if data.q:
+        return next_cursor(items, data.limit, "rank", "id")
+
+    return next_cursor(items, data.limit, "id")
+
+
+async def use_skill_index(data: SearchResumes, redis: Redis) -> bool:
+
+    if not (settings.SKILL_INDEX_ENABLED and skill_index.ready and split_stack(data.stack)) or data.q or data.skills or data.near:
+        return False
+
+    #Pages end up in the shared cache, so an index missing another worker's write must not answer them
+    return skill_index.is_current(await get_generation(redis, "resumes"))
+
+
+async def search_resumes_in_index(session: AsyncSession, data: SearchResumes):
+
+    resume_ids = skill_index.search(
+        split_stack(data.stack),
+        match_all=data.stack_mode == StackMode.all,
+        city=data.city,
+        title=data.title,
+        limit=data.limit,
+        offset=0 if data.cursor else data.offset,
+        after_id=decode_cursor(data.cursor, 1)[0] if data.cursor else None
+    )
+
+    if not resume_ids:
+        return []
 
-    query = query.limit(data.limit).offset(data.offset)
+    #Only the page itself is read from Postgres, by primary key
+    result = await session.execute(select(Resume).where(Resume.id.in_(resume_ids)).order_by(Resume.id))
 
-    result = await session.execute(query)
-    resumes = result.scalars().all()
+    return [r.resumes_to_dict() for r in result.scalars().all()]
 
-    resumes_json = [r.resumes_to_dict() for r in resumes]
-    await redis.set(cache_key, json.dumps(resumes_json), ex=300)
 
-    return {"resumes": resumes_json, "source": "db"}
+async def get_owned_search_rows(session: AsyncSession, user_id: int):
+
+    #Resumes and vacancies go away with their owner through ON DELETE CASCADE, collect them for cache invalidation first
+    resumes = await session.scalars(select(Resume).where(Resume.applicant_id == user_id))
+    vacancies = await session.scalars(select(Vacancy).where(Vacancy.tenant_id == user_id))
+
+    return [r.resumes_to_dict() for r in resumes], [v.vacancies_to_dict() for v in vacancies]
+
+
+def rows_to_dicts(rows, to_dict: str, ranked: bool):
+
+    if not ranked:
+        return [getattr(row, to_dict)() for row in rows.scalars().all()]
+
+    return [{**getattr(row[0], to_dict)(), "rank": row.rank} for row in rows.all()]
+
+
+async def load_resumes(session: AsyncSession, data: SearchResumes, redis: Redis):
+
+    if await use_skill_index(data, redis):
+        resumes = await search_resumes_in_index(session, data)
+    else:
+        query, rank = build_resumes_query(data)
+        result = await session.execute(paginate(query, rank, Resume.id, data))
+        resumes = rows_to_dicts(result, "resumes_to_dict", ranked=bool(data.q))
+
+    #The cached page is the response body itself, next_cursor included
+    return {"resumes": resumes, "next_cursor": page_cursor(resumes, data)}
+
+
+async def load_vacancies(session: AsyncSession, data: SearchVacancies):
+
+    query, rank = build_vacancies_query(data)
+    result = await session.execute(paginate(query, rank, Vacancy.id, data))
+    vacancies = rows_to_dicts(result, "vacancies_to_dict", ranked=bool(data.q))
+
+    return {"vacancies": vacancies, "next_cursor": page_cursor(vacancies, data)}
+
+
+async def search_resumes_service(session: AsyncSession, data: SearchResumes, current_user: User, redis: Redis):
+
+    if current_user.role != Role.tenant:
+        raise HTTPException(status_code=403, detail='Only tenants can search resumes')
+
+    search_params = f"text:{data.q or ''}_q:{data.title or ''}_city:{data.city or ''}_stack:{data.stack or ''}_skills:{data.skills or ''}_mode:{data.stack_mode.value}_near:{data.near or ''}_radius:{data.radius_km}_limit:{data.limit}_offset:{data.offset}_cursor:{data.cursor or ''}"
+    cache_key = f"search:resumes:{search_params}"
+
+    page, source = await cached_search(redis, "resumes", cache_key, resume_tags(data), session, lambda s: load_resumes(s, data, redis))
+    fields = {"source": source}
+
+    if data.facets:
+        #Facets depend on the filters only, so every page of a search shares one cache entry
+        facets_key = f"search:resumes:facets:text:{data.q or ''}_q:{data.title or ''}_city:{data.city or ''}_stack:{data.stack or ''}_skills:{data.skills or ''}_mode:{data.stack_mode.value}_near:{data.near or ''}_radius:{data.radius_km}"
+        fields["facets"], _ = await cached_search(redis, "resumes", facets_key, resume_tags(data), session, lambda s: get_resume_facets(s, data, build_resumes_query(data)[0]))
+
+    return json_response(page, **fields)
 
 
 async def search_vacancies_service(session: AsyncSession, data: SearchVacancies, current_user: User, redis: Redis):
-    
+
     if current_user.role != Role.applicant:
         raise HTTPException(status_code=403, detail='Only applicants can search vacancies')
 
-    version = await redis.get("vacancy_version") or "0"
-    search_params = f"version:{version}_q:{data.title or ''}_city:{data.city or ''}_compensation:{data.compensation or ''}_limit:{data.limit}_offset:{data.offset}"
+    if data.compensation and data.compensation_max is not None and data.compensation > data.compensation_max:
+        raise HTTPException(status_code=400, detail='compensation can not be greater than compensation_max')
+
+    search_params = f"text:{data.q or ''}_q:{data.title or ''}_city:{data.city or ''}_compensation:{data.compensation or ''}_compensation_max:{data.compensation_max if data.compensation_max is not None else ''}_near:{data.near or ''}_radius:{data.radius_km}_sort:{data.sort.value if data.sort else ''}_limit:{data.limit}_offset:{data.offset}_cursor:{data.cursor or ''}"
     cache_key = f"search:vacancies:{search_params}"
 
-    cached_vacancies = await redis.get(cache_key)
-    if cached_vacancies:
-        return {"vacancies": json.loads(cached_vacancies), "source": "cache"}
+    page, source = await cached_search(redis, "vacancies", cache_key, vacancy_tags(data), session, lambda s: load_vacancies(s, data))
+    fields = {"source": source}
 
-    query = select(Vacancy)
+    if data.facets:
+        facets_key = f"search:vacancies:facets:text:{data.q or ''}_q:{data.title or ''}_city:{data.city or ''}_compensation:{data.compensation or ''}_compensation_max:{data.compensation_max if data.compensation_max is not None else ''}_near:{data.near or ''}_radius:{data.radius_km}"
+        fields["facets"], _ = await cached_search(redis, "vacancies", facets_key, vacancy_tags(data), session, lambda s: get_vacancy_facets(s, data, build_vacancies_query(data)[0]))
 
-    if data.city:
-        query = query.where(Vacancy.city.ilike(f"%{data.city}%"))
+    return json_response(page, **fields)
 
-    if data.compensation:
-        query = query.where(Vacancy.compensation >= int(data.compensation))
 
-    if data.title:
-        query = query.where(Vacancy.title.ilike(f'%{data.title}'))
+async def suggest_service(data: Suggest, redis: Redis):
+
+    if data.entity == SuggestEntity.vacancies and data.field == SuggestField.skill:
+        raise HTTPException(status_code=400, detail='Vacancies have no skills to suggest')
+
+    return await get_suggestions(redis, data.entity.value, data.field.value, data.prefix, data.limit)
+
+
+RESUME_EXPORT_FIELDS = ["id", "applicant_id", "title", "about", "stack", "city"]
+VACANCY_EXPORT_FIELDS = ["id", "tenant_id", "title", "compensation", "city"]
+
+
+def export_columns(query, rank, columns: list):
+
+    #Plain columns instead of ORM entities, nothing is kept in the identity map while streaming
+    if rank is not None:
+        return query.with_only_columns(*columns, rank.label('rank'))
+
+    return query.with_only_columns(*columns)
+
+
+async def export_resumes_service(data: SearchResumes, current_user: User, export_format: ExportFormat):
+
+    if current_user.role != Role.tenant:
+        raise HTTPException(status_code=403, detail='Only tenants can search resumes')
+
+    query, rank = build_resumes_query(data)
+    query = export_columns(query, rank, [getattr(Resume, field) for field in RESUME_EXPORT_FIELDS])
+
+    if rank is None:
+        query = query.order_by(Resume.id)
+
+    fields = RESUME_EXPORT_FIELDS + (["rank"] if rank is not None else [])
+
+    return export_response(query, fields, export_format, "resumes")
+
+
+async def export_vacancies_service(data: SearchVacancies, current_user: User, export_format: ExportFormat):
+
+    if current_user.role != Role.applicant:
+        raise HTTPException(status_code=403, detail='Only applicants can search vacancies')
 
-    query = query.limit(data.limit).offset(data.offset)
+    query, rank = build_vacancies_query(data)
+    query = export_columns(query, rank, [getattr(Vacancy, field) for field in VACANCY_EXPORT_FIELDS])
 
-    result = await session.execute(query)
-    vacancies = result.scalars().all()
+    if data.sort == VacancySort.newest:
+        query = query.order_by(None).order_by(Vacancy.id.desc())
+    elif data.sort in SORT_BY_COMPENSATION:
+        descending = data.sort == VacancySort.compensation_desc
+        query = query.order_by(None).order_by(Vacancy.compensation.desc() if descending else Vacancy.compensation, Vacancy.id.desc() if descending else Vacancy.id)
+    elif rank is None:
+        query = query.order_by(Vacancy.id)
 
-    vacancies_json = [v.vacancies_to_dict() for v in vacancies]
-    await redis.set(cache_key, json.dumps(vacancies_json), ex=300)
+    fields = VACANCY_EXPORT_FIELDS + (["rank"] if rank is not None else [])
 
-    return {"vacancies": vacancies_json, "source": "db"}
\ No newline at end of file
+    return export_response(query, fields, export_format, "vacancies")
@@ -0,0 +1,41 @@
+from sqlalchemy import select, delete, intersect, union
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models.skill import Skill, ResumeSkill
+from backend.utils.skills import split_stack
+
+
+async def sync_resume_skills(session: AsyncSession, resume_id: int, stack: str):
+    """Make resume_skills of a resume match its stack. Runs in the caller's transaction."""
+
+    names = split_stack(stack)
+
+    if names:
+        await session.execute(insert(Skill).values([{"name": name} for name in names]).on_conflict_do_nothing(index_elements=[Skill.name]))
+        skill_ids = list(await session.scalars(select(Skill.id).where(Skill.name.in_(names))))
+    else:
+        skill_ids = []
+
+    await session.execute(delete(ResumeSkill).where(ResumeSkill.resume_id == resume_id, ResumeSkill.skill_id.not_in(skill_ids)))
+
+    if skill_ids:
+        await session.execute(
+            insert(ResumeSkill)
+            .values([{"resume_id": resume_id, "skill_id": skill_id} for skill_id in skill_ids])
+            .on_conflict_do_nothing()
+        )
+
+
+def resumes_with_skills(names: list[str], match_all: bool = True):
+
+    #One index scan on (skill_id, resume_id) per skill, combined by INTERSECT / UNION
+    per_skill = [
+        select(ResumeSkill.resume_id).join(Skill, Skill.id == ResumeSkill.skill_id).where(Skill.name == name)
+        for name in names
+    ]
+
+    if len(per_skill) == 1:
+        return per_skill[0]
+
+    return intersect(*per_skill) if match_all else union(*per_skill)
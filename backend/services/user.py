@@ -1,17 +1,25 @@
 from fastapi import HTTPException, Response
 from sqlalchemy import select
 from redis.asyncio import Redis
-import json
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.database.database import session_dep
-from backend.utils.hash import hashing_password, pwd_context
+from backend.utils.hash import hash_password, verify_password
 from backend.utils.auth import security
 from backend.models.user import User
 from backend.schemas.user import CreateUser, Login, EditPassword, EditName, Delete
 from backend.dependencies import get_cache_key
+from backend.utils.local_cache import get_cached_body, set_cached_body
+from backend.utils.identity_cache import invalidate_identity
+from backend.utils.cache_codec import dumps, json_response
 from backend.models.mails import Mails
 from backend.utils.celery_tasks import send_mail_task
+from backend.utils.skill_index import skill_index
+from backend.utils.match_index import match_index
+from backend.utils.search_cache import invalidate_resumes_search, invalidate_vacancies_search
+from backend.utils.suggest import apply_resume_suggestions, apply_vacancy_suggestions
+from backend.services.facets import apply_resume_facets, apply_vacancy_facets
+from backend.services.search import get_owned_search_rows
 
 
 async def create_user(data: CreateUser, session: AsyncSession):
@@ -31,7 +39,7 @@ async def create_user(data: CreateUser, session: AsyncSession):
         email = data.email,
         role = data.role,
         name = data.name,
-        password = hashing_password(data.password)
+        password = await hash_password(data.password)
     )
 
     if data.role == "tenant":
@@ -65,7 +73,7 @@ async def login(data: Login, session: AsyncSession, response: Response):
     if not current_user:
         raise error
 
-    if not pwd_context.verify(data.password, current_user.password):
+    if not await verify_password(data.password, current_user.password):
         raise error
 
     token = security.create_access_token(uid=str(current_user.id))
@@ -77,11 +85,11 @@ async def login(data: Login, session: AsyncSession, response: Response):
 async def get_user_info(current_user: User, redis: Redis):
 
     key = get_cache_key("user", current_user.id, "profile")
-    cached_info = await redis.get(key)
+    cached_body = await get_cached_body(redis, key)
 
-    #If info about user have in redis, return cached info
-    if cached_info:
-        return {"success": True, "info": json.loads(cached_info), "source": "cache"}
+    #If info about user have in this worker or in redis, return cached info as it is stored
+    if cached_body:
+        return json_response(cached_body, source="cache")
 
     user_info = {'id': current_user.id,
                     'email': current_user.email,
@@ -89,20 +97,21 @@ async def get_user_info(current_user: User, redis: Redis):
                     'role': str(current_user.role)}
     
     #Else save info about user in cache on 1 hour
-    await redis.set(key, json.dumps(user_info), ex=3600)
+    body = dumps({"success": True, "info": user_info})
+    await set_cached_body(redis, key, body, ex=3600)
 
-    return {"success": True, "info": user_info, "source": "db"}
+    return json_response(body, source="db")
 
 
-async def update_password(data: EditPassword, session: AsyncSession, current_user: User):
+async def update_password(data: EditPassword, session: AsyncSession, current_user: User, redis: Redis):
 
-    if not pwd_context.verify(data.old_password, current_user.password):
+    if not await verify_password(data.old_password, current_user.password):
         raise HTTPException(status_code=400, detail='Incorrect password')
 
     if data.new_password != data.repeat_new_password:
         raise HTTPException(status_code=400, detail="The passwords don't match")
 
-    current_user.password = hashing_password(data.new_password)
+    current_user.password = await hash_password(data.new_password)
 
 
     mail = Mails(
@@ -114,11 +123,12 @@ async def update_password(data: EditPassword, session: AsyncSession, current_use
     session.add(mail)
     await session.commit()
     await session.refresh(current_user)
+    await invalidate_identity(redis, current_user.id)
     send_mail_task.delay(mail.id)
 
 async def update_name(data: EditName, session: AsyncSession, current_user: User, redis: Redis):
 
-    if not pwd_context.verify(data.password, current_user.password):
+    if not await verify_password(data.password, current_user.password):
         raise HTTPException(status_code=400, detail='Incorrect password')
 
     current_user.name = data.new_name
@@ -128,16 +138,27 @@ async def update_name(data: EditName, session: AsyncSession, current_user: User,
 
     #Delete cache
     key = get_cache_key("user", current_user.id, "profile")
-    await redis.delete(key)
+    await invalidate_identity(redis, current_user.id, key)
 
 
 async def delete_current_user(data: Delete, session: session_dep, current_user: User, redis: Redis):
 
-    if not pwd_context.verify(data.password, current_user.password):
+    if not await verify_password(data.password, current_user.password):
         raise HTTPException(status_code=400, detail='Incorrect password')
 
+    owned_resumes, owned_vacancies = await get_owned_search_rows(session, current_user.id)
+
     await session.delete(current_user)
+    await apply_resume_facets(session, removed=owned_resumes)
+    await apply_vacancy_facets(session, removed=owned_vacancies)
     await session.commit()
 
+    skill_index.remove_applicant(current_user.id)
+    match_index.remove_applicant(current_user.id)
+    await apply_resume_suggestions(redis, removed=owned_resumes)
+    await apply_vacancy_suggestions(redis, removed=owned_vacancies)
+    skill_index.advance(await invalidate_resumes_search(redis, *owned_resumes))
+    await invalidate_vacancies_search(redis, *owned_vacancies)
+
     key = get_cache_key("user", current_user.id, "profile")
-    await redis.delete(key)
\ No newline at end of file
+    await invalidate_identity(redis, current_user.id, key)
\ No newline at end of file
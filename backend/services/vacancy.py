@@ -5,7 +5,16 @@ from redis.asyncio import Redis
 
 from backend.models.user import Role, User
 from backend.models.vacancy import Vacancy
+from backend.models.resume import Resume
+from backend.database.database import new_session
 from backend.schemas.vacancy import CreateVacancy, EditVacancy
+from backend.utils.pagination import page_by_id, next_cursor
+from backend.utils.search_cache import invalidate_vacancies_search
+from backend.utils.suggest import apply_vacancy_suggestions
+from backend.utils.geo import place
+from backend.services.facets import apply_vacancy_facets
+from backend.utils.match_index import match_index
+from backend.utils.celery_tasks import notify_saved_searches_task
 
 
 async def create_new_vacancy(data: CreateVacancy, session: AsyncSession, current_user: User, redis: Redis):
@@ -15,21 +24,32 @@ async def create_new_vacancy(data: CreateVacancy, session: AsyncSession, current
 
     new_vacancy = Vacancy(**data.model_dump())
     new_vacancy.tenant_id = current_user.id
+    place(new_vacancy)
 
     session.add(new_vacancy)
+    await apply_vacancy_facets(session, added=[new_vacancy.vacancies_to_dict()])
     await session.commit()
 
-    await redis.incr("vacancy_version")
-    
+    await apply_vacancy_suggestions(redis, added=[new_vacancy.vacancies_to_dict()])
+    await invalidate_vacancies_search(redis, new_vacancy.vacancies_to_dict())
+    notify_saved_searches_task.delay(new_vacancy.id)
+
     return new_vacancy
 
 
-async def get_all_user_vacancies(session: AsyncSession, current_user: User):
+async def get_all_user_vacancies(session: AsyncSession, current_user: User, limit: int | None = None, cursor: str | None = None):
+
+    query = select(Vacancy).where(Vacancy.tenant_id == current_user.id)
 
-    vacancy_query = await session.execute(select(Vacancy).where(Vacancy.tenant_id == current_user.id))
+    #Without limit the whole list is returned as before
+    if limit is None:
+        vacancy_query = await session.execute(query.order_by(Vacancy.id))
+        return {'Your vacancies': vacancy_query.scalars().all(), 'next_cursor': None}
+
+    vacancy_query = await session.execute(page_by_id(query, Vacancy.id, limit, cursor=cursor))
     all_vacancies = vacancy_query.scalars().all()
 
-    return all_vacancies
+    return {'Your vacancies': all_vacancies, 'next_cursor': next_cursor(all_vacancies, limit, 'id')}
 
 
 async def edit_user_vacancy(session: AsyncSession, current_vacancy: Vacancy, data: EditVacancy, current_user: User, redis: Redis):
@@ -40,19 +60,24 @@ async def edit_user_vacancy(session: AsyncSession, current_vacancy: Vacancy, dat
     if current_user.id != current_vacancy.tenant_id:
         raise HTTPException(status_code=403, detail="It's not your vacancy")
 
+    old_vacancy = current_vacancy.vacancies_to_dict()
+
     if data.new_title:
         current_vacancy.title = data.new_title
 
     if data.new_city:
         current_vacancy.city = data.new_city
+        place(current_vacancy)
 
     if data.new_compensation:
         current_vacancy.compensation = data.new_compensation
 
+    await apply_vacancy_facets(session, [old_vacancy], [current_vacancy.vacancies_to_dict()])
     await session.commit()
     await session.refresh(current_vacancy)
 
-    await redis.incr("vacancy_version")
+    await apply_vacancy_suggestions(redis, [old_vacancy], [current_vacancy.vacancies_to_dict()])
+    await invalidate_vacancies_search(redis, old_vacancy, current_vacancy.vacancies_to_dict())
 
 
 async def delete_user_vacancy(session: AsyncSession, current_vacancy: Vacancy, current_user: User, redis: Redis):
@@ -64,6 +89,30 @@ async def delete_user_vacancy(session: AsyncSession, current_vacancy: Vacancy, c
         raise HTTPException(status_code=403, detail='This is not your vacancy')
 
     await session.delete(current_vacancy)
+    await apply_vacancy_facets(session, removed=[current_vacancy.vacancies_to_dict()])
     await session.commit()
 
-    await redis.incr("vacancy_version")
\ No newline at end of file
+    await apply_vacancy_suggestions(redis, removed=[current_vacancy.vacancies_to_dict()])
+    await invalidate_vacancies_search(redis, current_vacancy.vacancies_to_dict())
+
+
+async def get_vacancy_matches(session: AsyncSession, current_vacancy: Vacancy, current_user: User, redis: Redis, limit: int = 10):
+
+    if current_user.role != Role.tenant:
+        raise HTTPException(status_code=403, detail='Only tenants can see matches')
+
+    if current_vacancy.tenant_id != current_user.id:
+        raise HTTPException(status_code=403, detail='This is not your vacancy')
+
+    await match_index.ensure_ready(new_session, redis)
+    scores = dict(match_index.top(current_vacancy.title, current_vacancy.city, limit))
+
+    if not scores:
+        return []
+
+    result = await session.execute(select(Resume).where(Resume.id.in_(scores)))
+
+    #Resumes deleted by other workers since the last rebuild are simply skipped
+    matches = [{**resume.resumes_to_dict(), 'score': scores[resume.id]} for resume in result.scalars().all()]
+
+    return sorted(matches, key=lambda match: (-match['score'], match['id']))
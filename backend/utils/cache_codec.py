@@ -0,0 +1,146 @@
+import struct
+import weakref
+import zlib
+import orjson
+from fastapi import Response
+from redis.asyncio import Redis, ConnectionPool
+
+from backend.config import settings
+from backend.database.redis_database import redis_conn, redis_binary_conn
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+#Frame of a cached value: codec id, creation time, then the (maybe compressed) JSON body
+HEADER = struct.Struct('<Bd')
+
+
+class Codec:
+    id = 0
+    name = 'none'
+
+    def compress(self, body: bytes) -> bytes:
+        return body
+
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+class ZlibCodec(Codec):
+    id = 1
+    name = 'zlib'
+
+    def compress(self, body: bytes) -> bytes:
+        return zlib.compress(body, 1)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCodec(Codec):
+    id = 2
+    name = 'zstd'
+
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, body: bytes) -> bytes:
+        return self._compressor.compress(body)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+CODECS: dict[int, Codec] = {Codec.id: Codec(), ZlibCodec.id: ZlibCodec()}
+
+if zstandard is not None:
+    CODECS[ZstdCodec.id] = ZstdCodec()
+
+
+def get_codec(name: str) -> Codec:
+
+    for codec in CODECS.values():
+        if codec.name == name:
+            return codec
+
+    #Fails the worker at startup instead of silently caching with another codec
+    if name == ZstdCodec.name:
+        raise RuntimeError("CACHE_COMPRESSION=zstd needs the zstandard package: pip install zstandard")
+
+    raise RuntimeError(f"Unknown CACHE_COMPRESSION {name!r}, expected one of none, zlib, zstd")
+
+
+compression = get_codec(settings.CACHE_COMPRESSION)
+
+
+def dumps(value) -> bytes:
+    return orjson.dumps(value)
+
+
+def pack(body: bytes, created_at: float) -> bytes:
+
+    codec = compression if len(body) >= settings.CACHE_COMPRESS_MIN_BYTES else CODECS[Codec.id]
+
+    return HEADER.pack(codec.id, created_at) + codec.compress(body)
+
+
+def unpack(frame: bytes) -> tuple[float, bytes] | None:
+
+    #Values written before the codec (plain JSON text) or by an unknown codec are treated as a miss
+    if len(frame) < HEADER.size or frame[:1] in (b'{', b'['):
+        return None
+
+    codec_id, created_at = HEADER.unpack_from(frame)
+    codec = CODECS.get(codec_id)
+
+    if codec is None:
+        return None
+
+    return created_at, codec.decompress(frame[HEADER.size:])
+
+
+_binary_views: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def binary_view(redis: Redis) -> Redis:
+    """Client on the same server as `redis` that returns raw bytes instead of decoded str.
+
+    The application client maps to redis_binary_conn. Other clients (fakeredis in the tests)
+    get one small view of their own.
+    """
+
+    if redis is redis_conn:
+        return redis_binary_conn
+
+    view = _binary_views.get(redis)
+
+    if view is None:
+        pool = redis.connection_pool
+        view = Redis(connection_pool=ConnectionPool(
+            connection_class=pool.connection_class,
+            max_connections=settings.REDIS_BINARY_MAX_CONNECTIONS,
+            **{**pool.connection_kwargs, 'decode_responses': False}
+        ))
+        _binary_views[redis] = view
+
+    return view
+
+
+def json_object(body: bytes, **fields) -> bytes:
+    """Append fields to an encoded JSON object without decoding it: b'{"a":1}' + b=2 -> b'{"a":1,"b":2}'."""
+
+    extra = b",".join(dumps(name) + b":" + (value if isinstance(value, bytes) else dumps(value)) for name, value in fields.items())
+
+    if body == b"{}":
+        return b"{" + extra + b"}"
+
+    return body[:-1] + b"," + extra + b"}"
+
+
+def json_response(body: bytes, **fields) -> Response:
+    #Cached bytes go out as they are, no json.loads + jsonable_encoder + json.dumps round trip
+    return Response(content=json_object(body, **fields) if fields else body, media_type='application/json')
@@ -4,6 +4,7 @@ from backend.config import settings
 from backend.models.mails import Mails
 from backend.models.response import Response
 from backend.models.resume import Resume
+from backend.models.saved_search import SavedSearch
 from backend.models.user import User
 from backend.models.vacancy import Vacancy
 
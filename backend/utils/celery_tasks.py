@@ -2,7 +2,9 @@ from backend.utils.smtp_email import email_backend
 from backend.models.mails import Mails
 from backend.utils.celery import celery
 from backend.models.user import User
+from backend.models.vacancy import Vacancy
 from backend.database.database import celery_session
+from backend.services.saved_search import percolate_query, saved_search_mails
 
 @celery.task(name="send_mail_task")
 def send_mail_task(mail_id: int):
@@ -23,4 +25,25 @@ def send_mail_task(mail_id: int):
             )
             return f"Email sent to {recipient.email}"
         except Exception as e:
-            return f"Error: {e}"
\ No newline at end of file
+            return f"Error: {e}"
+
+
+@celery.task(name="notify_saved_searches_task")
+def notify_saved_searches_task(vacancy_id: int):
+    #Off the request: the vacancy is already created, a failing percolation must not turn that into a 500
+    with celery_session() as session:
+        vacancy = session.get(Vacancy, vacancy_id)
+        if not vacancy:
+            return "Vacancy not found"
+
+        mails = saved_search_mails(vacancy, session.scalars(percolate_query(vacancy)).all())
+        if not mails:
+            return "No saved search matched"
+
+        session.add_all(mails)
+        session.commit()
+
+        for mail in mails:
+            send_mail_task.delay(mail.id)
+
+        return f"Notified {len(mails)} users"
@@ -0,0 +1,50 @@
+import csv
+import enum
+import io
+import json
+from fastapi.responses import StreamingResponse
+
+from backend.database.database import new_read_session
+from backend.schemas.export import ExportFormat
+
+
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {ExportFormat.ndjson: 'application/x-ndjson', ExportFormat.csv: 'text/csv'}
+
+
+def plain(value):
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def encode_batch(rows, fields: list[str], export_format: ExportFormat) -> str:
+
+    if export_format == ExportFormat.ndjson:
+        return "".join(json.dumps({field: plain(row[field]) for field in fields}, ensure_ascii=False) + "\n" for row in rows)
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([plain(row[field]) for field in fields] for row in rows)
+    return buffer.getvalue()
+
+
+async def export_rows(query, fields: list[str], export_format: ExportFormat, batch_size: int = EXPORT_BATCH_SIZE):
+
+    if export_format == ExportFormat.csv:
+        yield encode_batch([dict(zip(fields, fields))], fields, export_format)
+
+    #The request session is gone once the endpoint returns, the stream owns its connection until the last row.
+    #stream() opens a server-side cursor, so only one batch is held in memory and it is sent as soon as it is read
+    async with new_read_session() as session:
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+
+        async for batch in result.mappings().partitions():
+            yield encode_batch(batch, fields, export_format)
+
+
+def export_response(query, fields: list[str], export_format: ExportFormat, filename: str) -> StreamingResponse:
+
+    return StreamingResponse(
+        export_rows(query, fields, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{export_format.value}"'}
+    )
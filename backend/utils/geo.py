@@ -0,0 +1,82 @@
+import csv
+import math
+import os
+from functools import lru_cache
+from sqlalchemy import func, and_
+
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cities.csv')
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+#Rows are bucketed into CELL_DEGREES x CELL_DEGREES cells (about 55 km north to south), a radius
+#query reads the few cells of its bounding box through the (geo_cell, id) index and then checks the distance
+CELL_DEGREES = 0.5
+LON_CELLS = int(360 / CELL_DEGREES) + 1
+
+
+def normalize_city(city: str) -> str:
+    #Same as lower(regexp_replace(trim(city), '\s+', ' ', 'g')) in the backfill migration
+    return " ".join(city.lower().split())
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer() -> dict[str, tuple[float, float]]:
+
+    with open(GAZETTEER_PATH, encoding='utf-8') as file:
+        return {normalize_city(row['name']): (float(row['latitude']), float(row['longitude'])) for row in csv.DictReader(file)}
+
+
+def locate(city: str | None) -> tuple[float, float] | None:
+    if not city:
+        return None
+
+    return load_gazetteer().get(normalize_city(city))
+
+
+def grid_cell(latitude: float, longitude: float) -> int:
+    row = math.floor((latitude + 90) / CELL_DEGREES)
+    column = math.floor((longitude + 180) / CELL_DEGREES)
+
+    return row * LON_CELLS + column
+
+
+def cells_within(latitude: float, longitude: float, radius_km: float) -> list[int]:
+    """Cells of the bounding box of the circle. Boxes crossing the antimeridian are not wrapped."""
+
+    lat_delta = radius_km / KM_PER_DEGREE
+    lon_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+
+    rows = range(math.floor((max(latitude - lat_delta, -90) + 90) / CELL_DEGREES), math.floor((min(latitude + lat_delta, 90) + 90) / CELL_DEGREES) + 1)
+    columns = range(math.floor((max(longitude - lon_delta, -180) + 180) / CELL_DEGREES), math.floor((min(longitude + lon_delta, 180) + 180) / CELL_DEGREES) + 1)
+
+    return [row * LON_CELLS + column for row in rows for column in columns]
+
+
+def distance_km(first: tuple[float, float], second: tuple[float, float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (*first, *second))
+
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def place(row):
+    """Fill the coordinates and cell of a resume or vacancy from its city, None for cities not in the gazetteer."""
+
+    point = locate(row.city)
+
+    row.latitude, row.longitude = point if point else (None, None)
+    row.geo_cell = grid_cell(*point) if point else None
+
+
+def within_radius(model, point: tuple[float, float], radius_km: float):
+
+    latitude, longitude = map(math.radians, point)
+    lat, lon = func.radians(model.latitude), func.radians(model.longitude)
+
+    a = func.power(func.sin((lat - latitude) * 0.5), 2) + math.cos(latitude) * func.cos(lat) * func.power(func.sin((lon - longitude) * 0.5), 2)
+    distance = 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a)))
+
+    return and_(model.geo_cell.in_(cells_within(*point, radius_km)), distance <= radius_km)
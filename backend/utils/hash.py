@@ -1,7 +1,99 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from time import perf_counter
+from fastapi import HTTPException
 from passlib.context import CryptContext
 
+from backend.config import settings
+
 
 pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
 def hashing_password(password: str):
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+def verify_password_sync(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+class HashExecutor:
+    """Runs bcrypt off the event loop, HASH_WORKERS at a time.
+
+    bcrypt releases the GIL, so threads already keep the loop responsive. Processes also keep
+    hashing off the worker's CPU share. Past HASH_MAX_PENDING queued calls new ones get a 503
+    instead of waiting behind the whole burst.
+    """
+
+    def __init__(self, kind: str, workers: int, max_pending: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Executor | None = None
+
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def _get_executor(self) -> Executor:
+
+        if self._executor is None:
+            if self.kind == 'process':
+                #spawn, a fork of a worker with a running event loop and open sockets is not safe
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='bcrypt')
+
+        return self._executor
+
+    async def run(self, fn, *args):
+
+        if self.in_flight >= self.workers + self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail='Too many password checks, try again later')
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        start = perf_counter()
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            elapsed = perf_counter() - start
+            self.in_flight -= 1
+            self.completed += 1
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": max(self.in_flight - self.workers, 0),
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "latency_avg_ms": round(self.latency_total / self.completed * 1000, 3) if self.completed else 0.0,
+            "latency_max_ms": round(self.latency_max * 1000, 3)
+        }
+
+
+hash_executor = HashExecutor(settings.HASH_EXECUTOR, settings.HASH_WORKERS, settings.HASH_MAX_PENDING)
+
+
+async def hash_password(password: str) -> str:
+    return await hash_executor.run(hashing_password, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await hash_executor.run(verify_password_sync, password, hashed)
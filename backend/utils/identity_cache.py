@@ -0,0 +1,104 @@
+from dataclasses import dataclass, asdict
+from time import time
+import orjson
+from redis.asyncio import Redis
+
+from backend.config import settings
+from backend.models.user import User, Role
+from backend.utils.local_cache import local_cache, get_cached_body, invalidate
+from backend.utils.cache_codec import binary_view, dumps, pack
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """What check_user and check_admin hand to routes: the user row without the password hash.
+
+    Has the attributes services read from current_user. Endpoints that change the user itself
+    load the ORM row through check_user_for_update instead.
+    """
+
+    id: int
+    email: str
+    name: str
+    role: Role
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(id=user.id, email=user.email, name=user.name, role=user.role)
+
+
+#Fills made before a change of the user lost a race with its invalidation: the version is bumped
+#before the cached snapshot is dropped, and a snapshot is only stored if the version it was read
+#under is still current. Otherwise a demoted or deleted user could be served for IDENTITY_CACHE_TTL.
+IDENTITY_VERSION_TTL = 86400
+
+STORE_IDENTITY_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[3] then
+    return 0
+end
+
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+
+def identity_key(user_id: int) -> str:
+    return f"cache:user:{user_id}:identity"
+
+
+def identity_version_key(user_id: int) -> str:
+    return f"cache:user:{user_id}:identity_version"
+
+
+async def get_identity_version(redis: Redis, user_id: int) -> str:
+    return await redis.get(identity_version_key(user_id)) or '0'
+
+
+async def invalidate_identity(redis: Redis, user_id: int, *keys: str):
+    """Drop the cached snapshot of a user (and other keys of the user) after a committed change."""
+
+    async with redis.pipeline(transaction=False) as pipeline:
+        pipeline.incr(identity_version_key(user_id))
+        pipeline.expire(identity_version_key(user_id), IDENTITY_VERSION_TTL)
+        await pipeline.execute()
+
+    await invalidate(redis, identity_key(user_id), *keys)
+
+
+def decode(body: bytes) -> UserSnapshot:
+    data = orjson.loads(body)
+    return UserSnapshot(id=data["id"], email=data["email"], name=data["name"], role=Role(data["role"]))
+
+
+async def get_identity(redis: Redis, user_id: int) -> UserSnapshot | None:
+
+    key = identity_key(user_id)
+
+    if settings.IDENTITY_CACHE_REDIS:
+        body = await get_cached_body(redis, key)
+    else:
+        entry = local_cache.get(key)
+        body = entry[1] if entry is not None else None
+
+    return decode(body) if body else None
+
+
+async def set_identity(redis: Redis, user: User, version: str) -> UserSnapshot:
+    """Cache the snapshot of a user row read after get_identity_version() returned `version`."""
+
+    snapshot = UserSnapshot.from_user(user)
+    body = dumps({**asdict(snapshot), "role": snapshot.role.value})
+
+    if settings.IDENTITY_CACHE_REDIS:
+        created_at = time()
+        store = binary_view(redis).register_script(STORE_IDENTITY_SCRIPT)
+        stored = await store(keys=[identity_key(user.id), identity_version_key(user.id)], args=[pack(body, created_at), settings.IDENTITY_CACHE_TTL, version])
+
+        if stored:
+            local_cache.set(identity_key(user.id), (created_at, body), len(body), ttl=min(settings.IDENTITY_CACHE_TTL, local_cache.ttl))
+
+    #The version is bumped before the invalidation is published, so a fill that still sees its version gets evicted by it
+    elif await get_identity_version(redis, user.id) == version:
+        local_cache.set(identity_key(user.id), (0.0, body), len(body), ttl=settings.IDENTITY_CACHE_TTL)
+
+    return snapshot
@@ -1,74 +1,306 @@
 from typing import Annotated
+from collections import OrderedDict
+from dataclasses import dataclass
 from redis.asyncio import Redis
 import random
-from time import time
+from time import time, monotonic
+from uuid import uuid4
 from fastapi import HTTPException, Depends, Request
 
+from backend.config import settings
 from backend.dependencies import get_user_token
 from backend.models.user import User
 from backend.database.redis_database import get_redis
+from backend.utils.local_cache import TierStats
 
 
 class RateLimiter:
     def __init__(self, redis: Redis):
         self._redis = redis
 
-    async def is_limited(self, key_suffix: str, endpoint: str, max_requests: int, window_seconds: int) -> bool:
+    async def check(self, key_suffix: str, endpoint: str, max_requests: int, window_seconds: int, cost: int = 1, lease_id: str | None = None) -> float:
+        """Seconds until the oldest logged request leaves the window when limited, 0 when allowed.
+
+        Requests of a lease are logged as {lease_id}-{i}, so release() can find the unused ones.
+        """
+
         key = f"rate_limiter:{endpoint}:{key_suffix}"
         current_ms = time() * 1000
         window_start_ms = current_ms - window_seconds * 1000
-        current_request = f"{current_ms}-{random.randint(0, 100_000)}"
+        prefix = lease_id or f"{current_ms}-{random.randint(0, 100_000)}"
+        current_requests = {f"{prefix}-{i}": current_ms for i in range(cost)}
 
         async with self._redis.pipeline() as pipeline:
             pipeline.zremrangebyscore(key, 0, window_start_ms)
             pipeline.zcard(key)
-            pipeline.zadd(key, {current_request: current_ms})
+            pipeline.zrange(key, 0, 0, withscores=True)
+            pipeline.zadd(key, current_requests)
 
             pipeline.expire(key, window_seconds)
             
             result = await pipeline.execute()
 
-        _, current_count, _, _ = result
+        _, current_count, oldest, _, _ = result
+
+        if current_count + cost > max_requests:
+            if cost > 1:
+                #A rejected weighted request is not logged, so a failed lease does not eat the requests left
+                await self._redis.zrem(key, *current_requests)
+
+            oldest_ms = oldest[0][1] if oldest else current_ms
+            return max(oldest_ms + window_seconds * 1000 - current_ms, 0) / 1000 or 0.001
+
+        return 0.0
+
+    async def release(self, key_suffix: str, endpoint: str, max_requests: int, window_seconds: int, leased: int, unused: int, lease_id: str):
+        key = f"rate_limiter:{endpoint}:{key_suffix}"
+        await self._redis.zrem(key, *(f"{lease_id}-{i}" for i in range(leased - unused, leased)))
+
+    async def is_limited(self, key_suffix: str, endpoint: str, max_requests: int, window_seconds: int, cost: int = 1) -> bool:
+        return await self.check(key_suffix, endpoint, max_requests, window_seconds, cost) > 0
+
+
+#GCRA: the key holds one number, the theoretical arrival time (TAT) of the next request in ms.
+#Every request moves it cost * window / max_requests further, a request is allowed while the TAT
+#stays within one window of now. Rejected requests change nothing, so a client that keeps hammering
+#is let in again as soon as its window has passed.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+
+local new_tat = tat + interval * cost
+
+if new_tat - window > now then
+    return {1, math.ceil(new_tat - window - now)}
+end
+
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {0, 0}
+"""
+
+#Gives back unused tokens of a lease: the TAT moves back, but never behind now
+GCRA_RELEASE_SCRIPT = """
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat then
+    return 0
+end
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+
+local new_tat = tat - tonumber(ARGV[1]) * tonumber(ARGV[2])
+
+if new_tat <= now then
+    redis.call('DEL', KEYS[1])
+else
+    redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+end
+return 1
+"""
 
-        if current_count >= max_requests:
-            return True
 
-        return False
+class GcraRateLimiter:
+    """One key and one round trip per check, atomic because the script runs as a single command."""
+
+    def __init__(self, redis: Redis):
+        self._redis = redis
+        self._script = redis.register_script(GCRA_SCRIPT)
+        self._release_script = redis.register_script(GCRA_RELEASE_SCRIPT)
+
+    async def check(self, key_suffix: str, endpoint: str, max_requests: int, window_seconds: int, cost: int = 1, lease_id: str | None = None) -> float:
+        """Seconds until the request would fit when limited, 0 when allowed."""
+
+        key = f"rate_limiter:gcra:{endpoint}:{key_suffix}"
+        window_ms = window_seconds * 1000
+
+        limited, retry_after_ms = await self._script(keys=[key], args=[window_ms / max_requests, window_ms, cost])
+
+        return max(retry_after_ms, 1) / 1000 if limited else 0.0
+
+    async def release(self, key_suffix: str, endpoint: str, max_requests: int, window_seconds: int, leased: int, unused: int, lease_id: str):
+        key = f"rate_limiter:gcra:{endpoint}:{key_suffix}"
+        await self._release_script(keys=[key], args=[window_seconds * 1000 / max_requests, unused])
+
+    async def is_limited(self, key_suffix: str, endpoint: str, max_requests: int, window_seconds: int, cost: int = 1) -> bool:
+        return await self.check(key_suffix, endpoint, max_requests, window_seconds, cost) > 0
+
+
+LIMITER_ENGINES = {"sliding_log": RateLimiter, "gcra": GcraRateLimiter}
 
 
 def get_rate_limiter(redis: Annotated[Redis, Depends(get_redis)]):
-    return RateLimiter(redis)
+    return LIMITER_ENGINES[settings.RATE_LIMITER_ENGINE](redis)
+
+
+def get_limiter_dependency(engine: str | None):
+
+    if engine is None:
+        return get_rate_limiter
+
+    def get_engine_limiter(redis: Annotated[Redis, Depends(get_redis)]):
+        return LIMITER_ENGINES[engine](redis)
+
+    return get_engine_limiter
+
+
+@dataclass(frozen=True)
+class PreLimit:
+    """How much of a limiter's work a worker may do without asking Redis.
+
+    lease: most tokens taken from Redis in one call. A client starts with leases of 1, a lease
+    used up within lease_seconds doubles the next one up to this, an expired lease sizes the next
+    one to what was used of it. Unused tokens go back to Redis when their lease expires, so slow
+    clients are not charged for them. 1 turns leasing off.
+    block: after Redis limits a client, reject it locally until Redis says it would fit again.
+    """
+
+    lease: int = 1
+    lease_seconds: float = 1.0
+    block: bool = True
 
 
-def rate_limiter_factory(endpoint: str, max_requests: int, window_seconds: int):
-    async def dependency(rate_limiter: Annotated[RateLimiter, Depends(get_rate_limiter)], user_id: User = Depends(get_user_token)):
+@dataclass(slots=True)
+class LeaseState:
+    tokens: int = 0
+    leased: int = 0
+    lease_id: str = ""
+    expires_at: float = 0.0
+    blocked_until: float = 0.0
+    next_lease: int = 1
 
+
+class LocalPreLimiter:
+    """Per-process tier in front of one rate_limiter_factory instance, keyed by user id or IP."""
+
+    max_keys = 10_000
+
+    def __init__(self, endpoint: str, max_requests: int, pre_limit: PreLimit):
+        self.endpoint = endpoint
+        self.lease = min(max(pre_limit.lease, 1), max_requests)
+        self.lease_seconds = pre_limit.lease_seconds
+        self.block = pre_limit.block
+        #Monotonic clock, unused leased tokens of evicted keys are not returned and age out of the window
+        self._keys: OrderedDict[str, LeaseState] = OrderedDict()
+        self.stats = TierStats("local_allowed", "local_rejected", "redis_calls", "tokens_returned")
+
+    async def is_limited(self, rate_limiter: RateLimiter | GcraRateLimiter, key_suffix, max_requests: int, window_seconds: int, cost: int) -> bool:
+
+        key = str(key_suffix)
+        now = monotonic()
+        state = self._keys.get(key) or LeaseState()
+        self._store(key, state)
+
+        if state.blocked_until > now:
+            self.stats.incr("local_rejected")
+            return True
+
+        if state.expires_at > now:
+            if state.tokens >= cost:
+                state.tokens -= cost
+                self.stats.incr("local_allowed")
+                return False
+
+            if state.tokens == 0:
+                #Used up before it expired, the client is fast enough for a bigger lease
+                state.next_lease = min(state.leased * 2, self.lease)
+        elif state.leased:
+            state.next_lease = max(state.leased - state.tokens, 1)
+
+        if state.tokens:
+            self.stats.incr("redis_calls")
+            await rate_limiter.release(key_suffix, self.endpoint, max_requests, window_seconds, state.leased, state.tokens, state.lease_id)
+            self.stats.incr("tokens_returned", state.tokens)
+            state.tokens = 0
+
+        #Take a whole lease when it still fits, close to the limit fall back to the request's own cost
+        for amount in dict.fromkeys((max(state.next_lease, cost), cost)):
+            lease_id = uuid4().hex
+            self.stats.incr("redis_calls")
+            retry_after = await rate_limiter.check(key_suffix, self.endpoint, max_requests, window_seconds, amount, lease_id=lease_id)
+
+            if not retry_after:
+                state.tokens, state.leased, state.lease_id = amount - cost, amount, lease_id
+                state.expires_at = monotonic() + self.lease_seconds
+                return False
+
+        state.leased = 0
+        state.expires_at = 0.0
+        state.blocked_until = monotonic() + retry_after if self.block else 0.0
+        return True
+
+    def _store(self, key: str, state: LeaseState):
+
+        self._keys[key] = state
+        self._keys.move_to_end(key)
+
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        counters = self.stats.snapshot()
+        return {**counters, "endpoint": self.endpoint, "lease": self.lease, "keys": len(self._keys), "redis_calls_avoided": counters["local_allowed"] + counters["local_rejected"]}
+
+
+pre_limiters: list[LocalPreLimiter] = []
+
+
+def pre_limiter_stats() -> list[dict]:
+    return [pre_limiter.snapshot() for pre_limiter in pre_limiters]
+
+
+def make_pre_limiter(endpoint: str, max_requests: int, pre_limit: PreLimit | None) -> LocalPreLimiter | None:
+
+    if pre_limit is None or not settings.RATE_LIMITER_PRE_LIMIT:
+        return None
+
+    pre_limiter = LocalPreLimiter(endpoint, max_requests, pre_limit)
+    pre_limiters.append(pre_limiter)
+
+    return pre_limiter
+
+
+async def check_limit(rate_limiter, pre_limiter: LocalPreLimiter | None, key_suffix, endpoint: str, max_requests: int, window_seconds: int, cost: int):
+
+    if pre_limiter is not None:
+        limited = await pre_limiter.is_limited(rate_limiter, key_suffix, max_requests, window_seconds, cost)
+    else:
         limited = await rate_limiter.is_limited(
-            key_suffix=user_id,
+            key_suffix=key_suffix,
             endpoint=endpoint,
             max_requests=max_requests,
-            window_seconds=window_seconds
+            window_seconds=window_seconds,
+            cost=cost
         )
 
-        if limited:
-            raise HTTPException(status_code=429, detail="Requests exceeded")
+    if limited:
+        raise HTTPException(status_code=429, detail="Requests exceeded")
+
+
+def rate_limiter_factory(endpoint: str, max_requests: int, window_seconds: int, engine: str | None = None, cost: int = 1, pre_limit: PreLimit | None = None):
+    pre_limiter = make_pre_limiter(endpoint, max_requests, pre_limit)
+
+    async def dependency(rate_limiter: Annotated[RateLimiter | GcraRateLimiter, Depends(get_limiter_dependency(engine))], user_id: User = Depends(get_user_token)):
+        await check_limit(rate_limiter, pre_limiter, user_id, endpoint, max_requests, window_seconds, cost)
 
     return dependency
 
 
-def rate_limiter_factory_by_ip(endpoint: str, max_requests: int, window_seconds: int):
-    async def dependency(request: Request, rate_limiter: Annotated[RateLimiter, Depends(get_rate_limiter)]):
+def rate_limiter_factory_by_ip(endpoint: str, max_requests: int, window_seconds: int, engine: str | None = None, cost: int = 1, pre_limit: PreLimit | None = None):
+    pre_limiter = make_pre_limiter(endpoint, max_requests, pre_limit)
 
-        ip_address = request.client.host
+    async def dependency(request: Request, rate_limiter: Annotated[RateLimiter | GcraRateLimiter, Depends(get_limiter_dependency(engine))]):
 
-        limited = await rate_limiter.is_limited(
-            key_suffix=ip_address,
-            endpoint=endpoint,
-            max_requests=max_requests,
-            window_seconds=window_seconds
-        )
+        ip_address = request.client.host
 
-        if limited:
-            raise HTTPException(status_code=429, detail="Requests exceeded")
+        await check_limit(rate_limiter, pre_limiter, ip_address, endpoint, max_requests, window_seconds, cost)
 
-    return dependency
\ No newline at end of file
+    return dependency
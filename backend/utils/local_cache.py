@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from time import monotonic, time
+from redis.asyncio import Redis
+
+from backend.config import settings
+from backend.utils.cache_codec import binary_view, pack, unpack
+
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+RECONNECT_DELAY = 1.0
+
+
+class TierStats:
+
+    def __init__(self, *names: str):
+        self.counters = {name: 0 for name in names}
+
+    def incr(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def snapshot(self) -> dict:
+        return {"pid": os.getpid(), **self.counters}
+
+
+class LocalCache:
+    """Per-process LRU with TTL, bounded both by entry count and by the size of the cached payloads.
+
+    It only holds copies of Redis keys. Writers evict through invalidate(), which also tells every
+    other worker over pub/sub, and the short TTL bounds staleness if such a message is ever lost.
+    Cached values are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, int, object]] = OrderedDict()
+        self.stats = TierStats("hit", "miss", "expired", "eviction", "invalidation")
+
+    def get(self, key: str):
+
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.stats.incr("miss")
+            return None
+
+        expires_at, _, value = entry
+
+        if expires_at <= monotonic():
+            self._drop(key)
+            self.stats.incr("expired")
+            self.stats.incr("miss")
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.incr("hit")
+        return value
+
+    def set(self, key: str, value, size: int, ttl: float | None = None):
+
+        #A payload that would push out most of the cache is not worth keeping locally
+        if size > self.max_bytes // 4:
+            return
+
+        self._drop(key)
+
+        self._entries[key] = (monotonic() + (ttl or self.ttl), size, value)
+        self.size += size
+
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.stats.incr("eviction")
+
+    def evict(self, *keys: str):
+        for key in keys:
+            if self._drop(key):
+                self.stats.incr("invalidation")
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _drop(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+
+        if entry is None:
+            return False
+
+        self.size -= entry[1]
+        return True
+
+    def snapshot(self) -> dict:
+        return {**self.stats.snapshot(), "entries": len(self._entries), "bytes": self.size}
+
+
+local_cache = LocalCache(settings.LOCAL_CACHE_MAX_ENTRIES, settings.LOCAL_CACHE_MAX_BYTES, settings.LOCAL_CACHE_TTL)
+redis_cache_stats = TierStats("hit", "miss")
+
+
+async def get_cached_body(redis: Redis, key: str) -> bytes | None:
+    """Read the encoded JSON body of a key through both tiers, None if neither has it."""
+
+    entry = local_cache.get(key)
+    if entry is not None:
+        return entry[1]
+
+    frame = await binary_view(redis).get(key)
+    entry = unpack(frame) if frame is not None else None
+
+    if entry is None:
+        redis_cache_stats.incr("miss")
+        return None
+
+    redis_cache_stats.incr("hit")
+    local_cache.set(key, entry, len(entry[1]))
+
+    return entry[1]
+
+
+async def set_cached_body(redis: Redis, key: str, body: bytes, ex: int):
+
+    created_at = time()
+
+    await binary_view(redis).set(key, pack(body, created_at), ex=ex)
+    local_cache.set(key, (created_at, body), len(body), ttl=min(ex, local_cache.ttl))
+
+
+async def invalidate(redis: Redis, *keys: str):
+    """Delete keys from Redis and from the local tier of every worker."""
+
+    keys = [key for key in keys if key]
+    if not keys:
+        return
+
+    local_cache.evict(*keys)
+
+    async with redis.pipeline(transaction=False) as pipeline:
+        pipeline.delete(*keys)
+        pipeline.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+        await pipeline.execute()
+
+
+async def listen_invalidations(redis: Redis):
+
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+
+                #Messages published while disconnected are lost, start over from an empty local tier
+                local_cache.clear()
+
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        local_cache.evict(*json.loads(message["data"]))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await asyncio.sleep(RECONNECT_DELAY)
@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import re
+import numpy as np
+from redis.asyncio import Redis
+from sqlalchemy import select
+
+from backend.models.resume import Resume
+from backend.utils.skills import split_stack, normalize_skill
+from backend.utils.search_cache import get_generation
+
+
+logger = logging.getLogger(__name__)
+
+#Weights of the three signals, the score of a resume is in [0, 1]
+SKILL_WEIGHT = 0.6
+TITLE_WEIGHT = 0.25
+CITY_WEIGHT = 0.15
+
+WORD = re.compile(r'\w+')
+
+
+def title_words(title: str) -> list[str]:
+    return list(dict.fromkeys(WORD.findall(title.lower())))
+
+
+class Vocabulary:
+
+    def __init__(self):
+        self.codes: dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        return self.codes.setdefault(value, len(self.codes))
+
+    def lookup(self, values) -> list[int]:
+        return [self.codes[value] for value in values if value in self.codes]
+
+
+class Postings:
+    """Sparse resume x token matrix in column (CSC) form: the rows of every token code, sorted."""
+
+    def __init__(self, token_lists: list[list[str]], vocabulary: Vocabulary):
+        self.counts = np.fromiter(map(len, token_lists), dtype=np.int32, count=len(token_lists))
+
+        codes = np.fromiter((vocabulary.code(token) for tokens in token_lists for token in tokens), dtype=np.int32, count=int(self.counts.sum()))
+        rows = np.repeat(np.arange(len(token_lists), dtype=np.int32), self.counts)
+
+        order = np.argsort(codes, kind='stable')
+        self.rows = rows[order]
+        self.starts = np.zeros(len(vocabulary.codes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(vocabulary.codes)), out=self.starts[1:])
+
+    def hits(self, codes: list[int], size: int) -> np.ndarray:
+        #Rows are unique within a column, so a fancy index increment counts every hit once
+        hits = np.zeros(size, dtype=np.float32)
+
+        for code in codes:
+            if code + 1 < len(self.starts):
+                hits[self.rows[self.starts[code]:self.starts[code + 1]]] += 1
+
+        return hits
+
+    def nbytes(self) -> int:
+        return self.counts.nbytes + self.rows.nbytes + self.starts.nbytes
+
+
+class Segment:
+    """Column arrays of a batch of resumes: ids, cities, skills and title words."""
+
+    def __init__(self, docs: list[tuple], skills: Vocabulary, words: Vocabulary, cities: Vocabulary):
+        size = len(docs)
+
+        self.ids = np.fromiter((doc[0] for doc in docs), dtype=np.int64, count=size)
+        self.applicants = np.fromiter((doc[1] for doc in docs), dtype=np.int64, count=size)
+        self.cities = np.fromiter((cities.code(doc[2]) for doc in docs), dtype=np.int32, count=size)
+        self.alive = np.ones(size, dtype=bool)
+
+        self.skills = Postings([doc[4] for doc in docs], skills)
+        self.words = Postings([doc[3] for doc in docs], words)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.applicants.nbytes + self.cities.nbytes + self.alive.nbytes + self.skills.nbytes() + self.words.nbytes()
+
+    def position(self, resume_id: int) -> int | None:
+        position = int(np.searchsorted(self.ids, resume_id))
+        if position < len(self.ids) and self.ids[position] == resume_id:
+            return position
+        return None
+
+    def scores(self, skill_codes: list[int], word_codes: list[int], wanted_skills: int, wanted_words: int, city: int) -> np.ndarray:
+        size = len(self.ids)
+        score = np.zeros(size, dtype=np.float32)
+
+        if wanted_skills:
+            score += self.skills.hits(skill_codes, size) * np.float32(SKILL_WEIGHT / wanted_skills)
+
+        if wanted_words:
+            #Jaccard similarity of the title words
+            word_hits = self.words.hits(word_codes, size)
+            union = self.words.counts + np.float32(wanted_words) - word_hits
+            score += np.float32(TITLE_WEIGHT) * word_hits / np.maximum(union, 1)
+
+        score[self.cities == city] += np.float32(CITY_WEIGHT)
+        score[~self.alive] = 0
+
+        return score
+
+
+class MatchIndex:
+    """Cached feature matrix of all resumes for scoring them against a vacancy with NumPy.
+
+    The bulk of the resumes lives in one large segment built from Postgres. Resumes written by
+    this process since then go to a small recent segment and their old rows are masked out, so
+    the large arrays are never copied on writes. Periodic rebuilds merge everything again,
+    once a resume write bumped the resumes search cache generation past `generation`.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.generation: int | None = None
+        self.refresh_errors = 0
+        self._skills = Vocabulary()
+        self._words = Vocabulary()
+        self._cities = Vocabulary()
+        self._main: Segment | None = None
+        self._recent: dict[int, tuple] = {}
+        self._recent_segment: Segment | None = None
+        self._build_lock = asyncio.Lock()
+
+    @staticmethod
+    def _doc(resume_id: int, applicant_id: int, city: str, title: str, stack: str) -> tuple:
+        return (resume_id, applicant_id, city.strip().lower(), title_words(title), split_stack(stack))
+
+    def add(self, resume: Resume):
+
+        if not self.ready:
+            return
+
+        self.remove(resume.id)
+        self._recent[resume.id] = self._doc(resume.id, resume.applicant_id, resume.city, resume.title, resume.stack)
+        self._recent_segment = None
+
+    def remove(self, resume_id: int):
+
+        if not self.ready:
+            return
+
+        if self._recent.pop(resume_id, None) is not None:
+            self._recent_segment = None
+
+        position = self._main.position(resume_id)
+        if position is not None:
+            self._main.alive[position] = False
+
+    def remove_applicant(self, applicant_id: int):
+
+        if not self.ready:
+            return
+
+        self._main.alive[self._main.applicants == applicant_id] = False
+
+        for resume_id in [resume_id for resume_id, doc in self._recent.items() if doc[1] == applicant_id]:
+            del self._recent[resume_id]
+        self._recent_segment = None
+
+    def _segments(self) -> list[Segment]:
+
+        if self._recent_segment is None:
+            self._recent_segment = Segment(sorted(self._recent.values()), self._skills, self._words, self._cities)
+
+        return [self._main, self._recent_segment]
+
+    def top(self, title: str, city: str, limit: int = 10) -> list[tuple[int, float]]:
+        """Return [(resume_id, score)] of the best matching resumes, best first."""
+
+        #Building the recent segment may add new tokens, so it comes before the lookups
+        segments = self._segments()
+        words = title_words(title)
+
+        #Vacancies have no stack, the skills they ask for are the known skills named in the title
+        skills = [skill for skill in dict.fromkeys([normalize_skill(title), *words]) if skill in self._skills.codes]
+
+        skill_codes = self._skills.lookup(skills)
+        word_codes = self._words.lookup(words)
+        city_code = self._cities.codes.get(city.strip().lower(), -1)
+
+        ids, scores = [], []
+
+        for segment in segments:
+            if not len(segment):
+                continue
+
+            score = segment.scores(skill_codes, word_codes, len(skills), len(words), city_code)
+
+            if len(score) > limit:
+                best = np.argpartition(score, -limit)[-limit:]
+            else:
+                best = np.arange(len(score))
+
+            ids.append(segment.ids[best])
+            scores.append(score[best])
+
+        if not ids:
+            return []
+
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        order = np.lexsort((ids, -scores))[:limit]
+
+        return [(int(ids[i]), round(float(scores[i]), 4)) for i in order if scores[i] > 0]
+
+    @classmethod
+    def _build_main(cls, rows: list) -> tuple[Segment, Vocabulary, Vocabulary, Vocabulary]:
+        skills, words, cities = Vocabulary(), Vocabulary(), Vocabulary()
+        return Segment([cls._doc(*row) for row in rows], skills, words, cities), skills, words, cities
+
+    async def build(self, session_factory, redis: Redis, batch_size: int = 10_000):
+
+        rows = []
+
+        #Read before the rows: a write committed meanwhile bumps it past this value and triggers the next rebuild
+        generation = await get_generation(redis, "resumes")
+
+        async with session_factory() as session:
+            result = await session.stream(
+                select(Resume.id, Resume.applicant_id, Resume.city, Resume.title, Resume.stack)
+                .order_by(Resume.id)
+                .execution_options(yield_per=batch_size)
+            )
+
+            async for partition in result.partitions():
+                rows.extend(partition)
+
+        #Tokenizing and building the arrays takes seconds on a large table, keep it off the event loop
+        main, skills, words, cities = await asyncio.to_thread(self._build_main, rows)
+
+        #Swap in one step so concurrent requests never score against a half built matrix
+        self._skills, self._words, self._cities = skills, words, cities
+        self._main, self._recent, self._recent_segment = main, {}, None
+        self.generation = generation
+        self.ready = True
+
+    async def ensure_ready(self, session_factory, redis: Redis):
+
+        if self.ready:
+            return
+
+        async with self._build_lock:
+            if not self.ready:
+                await self.build(session_factory, redis)
+
+    async def refresh_forever(self, session_factory, redis: Redis, interval_seconds: int):
+        while True:
+            await asyncio.sleep(interval_seconds)
+
+            #A failed rebuild keeps the previous matrix, the next round tries again
+            try:
+                if self.ready and self.generation != await get_generation(redis, "resumes"):
+                    await self.build(session_factory, redis)
+            except Exception:
+                self.refresh_errors += 1
+                logger.exception("Match index refresh failed")
+
+    def stats(self) -> dict:
+        arrays = 0
+        resumes = 0
+
+        for segment in (self._segments() if self.ready else []):
+            arrays += segment.nbytes()
+            resumes += int(segment.alive.sum())
+
+        return {'ready': self.ready, 'generation': self.generation, 'refresh_errors': self.refresh_errors, 'resumes': resumes, 'recent': len(self._recent), 'bytes': arrays}
+
+
+match_index = MatchIndex()
@@ -0,0 +1,80 @@
+import base64
+import binascii
+import json
+from fastapi import HTTPException
+from sqlalchemy import or_, and_, tuple_
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+
+    error = HTTPException(status_code=400, detail='Invalid cursor')
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise error
+
+    if not isinstance(values, list) or len(values) != size:
+        raise error
+
+    return values
+
+
+def page_by_id(query, id_column, limit: int, offset: int = 0, cursor: str | None = None, descending: bool = False):
+
+    #With a cursor the page starts right after the last seen id, so deep pages cost the same as the first one
+    if cursor:
+        last_id, = decode_cursor(cursor, 1)
+        query = query.where(id_column < last_id if descending else id_column > last_id)
+    else:
+        query = query.offset(offset)
+
+    return query.order_by(id_column.desc() if descending else id_column).limit(limit)
+
+
+def page_by_value(query, value_column, id_column, limit: int, offset: int = 0, cursor: str | None = None, descending: bool = False):
+
+    #Keyset on (value, id): both go the same direction, so one composite index serves the filter and the order
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, 2)
+        keyset = tuple_(value_column, id_column)
+        query = query.where(keyset < tuple_(last_value, last_id) if descending else keyset > tuple_(last_value, last_id))
+    else:
+        query = query.offset(offset)
+
+    if descending:
+        return query.order_by(value_column.desc(), id_column.desc()).limit(limit)
+
+    return query.order_by(value_column, id_column).limit(limit)
+
+
+def page_by_rank(query, rank, id_column, limit: int, offset: int = 0, cursor: str | None = None):
+
+    #Query must already be ordered by rank DESC, id ASC
+    if cursor:
+        last_rank, last_id = decode_cursor(cursor, 2)
+        query = query.where(or_(rank < last_rank, and_(rank == last_rank, id_column > last_id)))
+    else:
+        query = query.offset(offset)
+
+    return query.limit(limit)
+
+
+def next_cursor(items: list, limit: int, *keys: str) -> str | None:
+
+    if len(items) < limit:
+        return None
+
+    last = items[-1]
+
+    if isinstance(last, dict):
+        return encode_cursor(*(last[key] for key in keys))
+
+    return encode_cursor(*(getattr(last, key) for key in keys))
@@ -0,0 +1,375 @@
+import asyncio
+import json
+import os
+from time import time, perf_counter
+from uuid import uuid4
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database.database import new_session
+from backend.schemas.search import SearchResumes, SearchVacancies
+from backend.utils.skills import split_stack
+from backend.utils.local_cache import local_cache, redis_cache_stats, INVALIDATION_CHANNEL
+from backend.utils.cache_codec import binary_view, dumps, pack, unpack
+from backend.utils.geo import locate, distance_km
+
+
+#Pages are fresh for SEARCH_CACHE_TTL, then served stale while being refreshed until SEARCH_CACHE_STALE_TTL
+SEARCH_CACHE_TTL = 300
+SEARCH_CACHE_STALE_TTL = 900
+SEARCH_LOCK_TTL = 10
+SEARCH_LOCK_POLL = 0.05
+#Waiters give up on the lock holder after a few times the usual page load, never less than this
+SEARCH_LOCK_MIN_WAIT = 0.25
+
+
+#Every cached search page is registered under the tags of ONE filter dimension (city first, then the
+#others). A page can only change if a written row matches all of its filters, in particular that one,
+#so evicting the tags a row matches never leaves a stale page behind.
+def resume_tags(data: SearchResumes) -> list[str]:
+
+    if data.city:
+        return [f"city:{data.city.strip().lower()}"]
+
+    if data.near:
+        return [near_tag(data)]
+
+    #stack and skills both match exact skill names
+    if split_stack(data.skills):
+        return [f"skill:{skill}" for skill in split_stack(data.skills)]
+
+    if split_stack(data.stack):
+        return [f"skill:{skill}" for skill in split_stack(data.stack)]
+
+    if data.title:
+        return [f"title:{data.title.strip().lower()}"]
+
+    if data.q:
+        return ["text"]
+
+    return ["all"]
+
+
+def vacancy_tags(data: SearchVacancies) -> list[str]:
+
+    if data.city:
+        return [f"city:{data.city.strip().lower()}"]
+
+    if data.near:
+        return [near_tag(data)]
+
+    if data.title:
+        return [f"title:{data.title.strip().lower()}"]
+
+    if data.compensation:
+        return [f"compensation:{int(data.compensation)}"]
+
+    if data.q:
+        return ["text"]
+
+    return ["all"]
+
+
+def near_tag(data: SearchResumes | SearchVacancies) -> str:
+    return f"near:{data.radius_km}:{data.near.strip().lower()}"
+
+
+def tag_matches(tag: str, row: dict) -> bool:
+    dimension, _, value = tag.partition(":")
+
+    if dimension in ("all", "text"):
+        return True
+
+    if dimension == "near":
+        radius_km, _, near = value.partition(":")
+        center, point = locate(near), locate(row["city"])
+        return center is not None and point is not None and distance_km(center, point) <= int(radius_km)
+
+    if dimension == "compensation":
+        return row["compensation"] >= int(value)
+
+    if dimension == "skill":
+        return value in split_stack(row["stack"])
+
+    return value in str(row[dimension]).lower()
+
+
+def registry_key(entity: str) -> str:
+    return f"search:{entity}:tags"
+
+
+def tag_key(entity: str, tag: str) -> str:
+    return f"search:{entity}:tag:{tag}"
+
+
+def generation_key(entity: str) -> str:
+    return f"search:{entity}:generation"
+
+
+async def get_generation(redis: Redis, entity: str) -> int:
+    return int(await redis.get(generation_key(entity)) or 0)
+
+
+async def get_search_cache(redis: Redis, key: str) -> tuple[float, bytes] | None:
+    """Return (created_at, encoded JSON body) of a cached page."""
+
+    entry = local_cache.get(key)
+
+    #A page that went stale locally is read again, another worker may have refreshed it already
+    if entry is not None and time() - entry[0] < SEARCH_CACHE_TTL:
+        return entry
+
+    frame = await binary_view(redis).get(key)
+    entry = unpack(frame) if frame is not None else None
+
+    if entry is None:
+        redis_cache_stats.incr("miss")
+        return None
+
+    redis_cache_stats.incr("hit")
+    local_cache.set(key, entry, len(entry[1]))
+
+    return entry
+
+
+#Stores a page and registers its tags in one step, unless the entity's generation moved since the
+#page was read: a write committed meanwhile and its invalidation may already have run, so the page
+#could predate it. Per entity rather than per tag, the tags a written row matches cannot be listed
+#(title and stack match by substring), and skipping a fill only costs one cache miss.
+#KEYS: page, generation, registry, tag keys. ARGV: frame, ttl, generation, only if exists, registry score, tags.
+STORE_PAGE_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[2]) or '0') ~= tonumber(ARGV[3]) then
+    return 0
+end
+
+if ARGV[4] == '1' and redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+
+for i = 4, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    redis.call('EXPIRE', KEYS[i], ARGV[2])
+    redis.call('ZADD', KEYS[3], ARGV[5], ARGV[i + 2])
+end
+
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+return 1
+"""
+
+
+async def set_search_cache(redis: Redis, entity: str, key: str, tags: list[str], body: bytes, generation: int, only_if_exists: bool = False):
+
+    created_at = time()
+    #Registry score is the time the tag can be forgotten, so it never outgrows the live tags
+    expires_at = created_at + SEARCH_CACHE_STALE_TTL
+
+    store = binary_view(redis).register_script(STORE_PAGE_SCRIPT)
+    stored = await store(
+        keys=[key, generation_key(entity), registry_key(entity), *(tag_key(entity, tag) for tag in tags)],
+        args=[pack(body, created_at), SEARCH_CACHE_STALE_TTL, generation, int(only_if_exists), expires_at, *tags]
+    )
+
+    if stored:
+        local_cache.set(key, (created_at, body), len(body))
+
+
+class SearchCacheStats:
+
+    def __init__(self):
+        self.counters = {"hit": 0, "stale_hit": 0, "coalesced": 0, "miss": 0, "refresh": 0, "refresh_error": 0, "wait_timeout": 0}
+        #Moving average of page loads on a miss, sizes how long other requests wait for the lock holder
+        self.load_seconds = 0.0
+
+    def incr(self, name: str):
+        self.counters[name] += 1
+
+    def observe_load(self, seconds: float):
+        self.load_seconds = seconds if not self.load_seconds else self.load_seconds * 0.9 + seconds * 0.1
+
+    def lock_wait(self) -> float:
+        return min(SEARCH_LOCK_TTL, max(SEARCH_LOCK_MIN_WAIT, self.load_seconds * 3))
+
+    def snapshot(self) -> dict:
+        return {"pid": os.getpid(), **self.counters, "load_ms": round(self.load_seconds * 1000, 3)}
+
+
+search_cache_stats = SearchCacheStats()
+
+#Strong references to running refreshes, otherwise the event loop may garbage collect them
+refresh_tasks: set[asyncio.Task] = set()
+
+
+def lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+
+#Deletes the lock only while it still holds our token: a holder that ran past SEARCH_LOCK_TTL
+#must not release the lock the next holder took since
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+async def acquire_refresh_lock(redis: Redis, key: str) -> str | None:
+    token = uuid4().hex
+    return token if await redis.set(lock_key(key), token, nx=True, ex=SEARCH_LOCK_TTL) else None
+
+
+async def release_refresh_lock(redis: Redis, key: str, token: str):
+    await redis.register_script(RELEASE_LOCK_SCRIPT)(keys=[lock_key(key)], args=[token])
+
+
+async def refresh_in_background(redis: Redis, entity: str, key: str, tags: list[str], loader, token: str):
+
+    try:
+        generation = await get_generation(redis, entity)
+
+        async with new_session() as session:
+            body = dumps(await loader(session))
+
+        #XX: if a write evicted the page meanwhile, the next reader recomputes it instead
+        await set_search_cache(redis, entity, key, tags, body, generation, only_if_exists=True)
+        search_cache_stats.incr("refresh")
+    except Exception:
+        search_cache_stats.incr("refresh_error")
+    finally:
+        await release_refresh_lock(redis, key, token)
+
+
+async def cached_search(redis: Redis, entity: str, key: str, tags: list[str], session: AsyncSession, loader):
+    """Return (body, source) for a search page, body being the loader result encoded as JSON bytes.
+
+    Fresh pages are served as "cache". Pages older than the soft TTL are still served
+    ("stale") while one worker refreshes them in the background. On a miss only the worker
+    holding the lock queries Postgres, the others wait for its result ("cache") instead.
+    """
+
+    entry = await get_search_cache(redis, key)
+
+    if entry is not None:
+        created_at, body = entry
+
+        if time() - created_at < SEARCH_CACHE_TTL:
+            search_cache_stats.incr("hit")
+            return body, "cache"
+
+        token = await acquire_refresh_lock(redis, key)
+
+        if token is not None:
+            task = asyncio.create_task(refresh_in_background(redis, entity, key, tags, loader, token))
+            refresh_tasks.add(task)
+            task.add_done_callback(refresh_tasks.discard)
+
+        search_cache_stats.incr("stale_hit")
+        return body, "stale"
+
+    token = await acquire_refresh_lock(redis, key)
+
+    if token is None:
+        waited, wait = 0.0, search_cache_stats.lock_wait()
+
+        while waited < wait:
+            await asyncio.sleep(SEARCH_LOCK_POLL)
+            waited += SEARCH_LOCK_POLL
+
+            entry = await get_search_cache(redis, key)
+            if entry is not None:
+                search_cache_stats.incr("coalesced")
+                return entry[1], "cache"
+
+            #The holder is done without storing the page (a write raced it, or it failed)
+            if not await redis.exists(lock_key(key)):
+                break
+        else:
+            search_cache_stats.incr("wait_timeout")
+
+        search_cache_stats.incr("miss")
+        return dumps(await loader(session)), "db"
+
+    try:
+        generation = await get_generation(redis, entity)
+        start = perf_counter()
+        body = dumps(await loader(session))
+        search_cache_stats.observe_load(perf_counter() - start)
+        await set_search_cache(redis, entity, key, tags, body, generation)
+    finally:
+        await release_refresh_lock(redis, key, token)
+
+    search_cache_stats.incr("miss")
+    return body, "db"
+
+
+async def invalidate_search_cache(redis: Redis, entity: str, *rows: dict) -> int | None:
+    """Evict the cached pages the written rows may appear on, return the new generation of the entity."""
+
+    rows = [row for row in rows if row]
+    if not rows:
+        return None
+
+    async with redis.pipeline(transaction=False) as pipeline:
+        #First, so a page read before the write can no longer be stored once its tags were looked up
+        pipeline.incr(generation_key(entity))
+        pipeline.zremrangebyscore(registry_key(entity), "-inf", time())
+        pipeline.zrange(registry_key(entity), 0, -1)
+        generation, _, tags = await pipeline.execute()
+
+    touched = [tag for tag in tags if any(tag_matches(tag, row) for row in rows)]
+    if not touched:
+        return generation
+
+    async with redis.pipeline(transaction=False) as pipeline:
+        for tag in touched:
+            pipeline.smembers(tag_key(entity, tag))
+        members = await pipeline.execute()
+
+    keys = set().union(*members)
+
+    local_cache.evict(*keys)
+
+    async with redis.pipeline(transaction=False) as pipeline:
+        if keys:
+            pipeline.delete(*keys)
+            pipeline.publish(INVALIDATION_CHANNEL, json.dumps(sorted(keys)))
+        pipeline.delete(*(tag_key(entity, tag) for tag in touched))
+        pipeline.zrem(registry_key(entity), *touched)
+        await pipeline.execute()
+
+    return generation
+
+
+async def invalidate_resumes_search(redis: Redis, *resumes: dict) -> int | None:
+    return await invalidate_search_cache(redis, "resumes", *resumes)
+
+
+async def invalidate_vacancies_search(redis: Redis, *vacancies: dict) -> int | None:
+    return await invalidate_search_cache(redis, "vacancies", *vacancies)
+
+
+LEGACY_PURGE_MARKER = "search:legacy_keys_purged"
+
+
+async def purge_legacy_search_keys(redis: Redis, batch_size: int = 500):
+
+    #Pages cached under the old global resume_version / vacancy_version counters are never read again.
+    #One-off: the first worker to start after the upgrade claims the marker and scans, later starts skip it
+    if not await redis.set(LEGACY_PURGE_MARKER, 1, nx=True):
+        return
+
+    batch = []
+
+    async for key in redis.scan_iter(match="search:*:version:*", count=batch_size):
+        batch.append(key)
+
+        if len(batch) >= batch_size:
+            await redis.delete(*batch)
+            batch = []
+
+    if batch:
+        await redis.delete(*batch)
+
+    await redis.delete("resume_version", "vacancy_version")
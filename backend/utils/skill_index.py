@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from redis.asyncio import Redis
+from sqlalchemy import select
+
+from backend.models.resume import Resume
+from backend.utils.skills import split_stack
+from backend.utils.search_cache import get_generation
+
+
+logger = logging.getLogger(__name__)
+
+#Candidates are produced in growing chunks: small for the first page, larger while filters reject them
+MAX_CHUNK = 4096
+
+class SkillIndex:
+    """In-process inverted index from normalized skill to a sorted array of resume ids.
+
+    Every worker keeps its own copy: it is built at startup, updated by the resume
+    services of this process and periodically rebuilt to pick up writes of other workers.
+    `generation` is the resumes search cache generation the index is known to reflect,
+    searches fall back to SQL while another worker's write is not in the index yet.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.generation: int | None = None
+        self.refresh_errors = 0
+        self._postings: dict[str, array] = {}
+        self._docs: dict[int, tuple[str, str, int, tuple[str, ...]]] = {}
+
+    def add(self, resume: Resume):
+
+        if not self.ready:
+            return
+
+        if resume.id in self._docs:
+            self.remove(resume.id)
+
+        skills = tuple(sys.intern(skill) for skill in split_stack(resume.stack))
+
+        self._docs[resume.id] = (sys.intern(resume.city.lower()), resume.title.lower(), resume.applicant_id, skills)
+
+        for skill in skills:
+            posting = self._postings.setdefault(skill, array('I'))
+
+            #New resumes get the highest id, so appending is the common case
+            if not posting or posting[-1] < resume.id:
+                posting.append(resume.id)
+            else:
+                posting.insert(bisect_left(posting, resume.id), resume.id)
+
+    def remove(self, resume_id: int):
+
+        doc = self._docs.pop(resume_id, None)
+        if doc is None:
+            return
+
+        for skill in doc[3]:
+            posting = self._postings[skill]
+            position = bisect_left(posting, resume_id)
+
+            if position < len(posting) and posting[position] == resume_id:
+                del posting[position]
+
+            if not posting:
+                del self._postings[skill]
+
+    def advance(self, generation: int | None):
+        #The write that bumped the generation to this value was applied here, and it was the only one since
+        if generation is not None and self.generation is not None and generation == self.generation + 1:
+            self.generation = generation
+
+    def is_current(self, generation: int) -> bool:
+        return self.ready and self.generation == generation
+
+    def remove_applicant(self, applicant_id: int):
+        #Account deletion is rare, a full scan is cheaper than keeping a reverse map per applicant
+        for resume_id in [resume_id for resume_id, doc in self._docs.items() if doc[2] == applicant_id]:
+            self.remove(resume_id)
+
+    def search(self, skills: list[str], match_all: bool = True, city: str | None = None, title: str | None = None,
+               limit: int = 10, offset: int = 0, after_id: int | None = None) -> list[int]:
+
+        postings = [self._postings.get(skill) for skill in skills]
+
+        if match_all:
+            if not postings or any(posting is None for posting in postings):
+                return []
+            candidates = self._intersect(sorted(postings, key=len), after_id)
+        else:
+            candidates = self._union([posting for posting in postings if posting], after_id)
+
+        city = city.strip().lower() if city else None
+        title = title.strip().lower() if title else None
+
+        def matches(resume_id: int) -> bool:
+            doc_city, doc_title, _, _ = self._docs[resume_id]
+            return (not city or city in doc_city) and (not title or title in doc_title)
+
+        #Candidates come in id order, so only offset + limit of them are ever materialized
+        return list(islice(filter(matches, candidates), offset, offset + limit))
+
+    @staticmethod
+    def _window(postings: list[array], lows: list[int], chunk: int) -> int | None:
+        #Upper id bound covering at most `chunk` ids of the densest remaining posting
+        bounds = [posting[low + chunk - 1] for posting, low in zip(postings, lows) if low + chunk - 1 < len(posting)]
+        return min(bounds) if bounds else None
+
+    def _intersect(self, postings: list[array], after_id: int | None, chunk: int = 64):
+        smallest, *others = postings
+        position = bisect_right(smallest, after_id) if after_id is not None else 0
+
+        #Set intersection runs in C, so work chunk by chunk of the rarest skill instead of id by id
+        while position < len(smallest):
+            window = smallest[position:position + chunk]
+
+            if others:
+                low, high = window[0], window[-1]
+                matched = set(window)
+
+                for posting in others:
+                    matched.intersection_update(posting[bisect_left(posting, low):bisect_right(posting, high)])
+                    if not matched:
+                        break
+
+                window = sorted(matched)
+
+            yield from window
+            position += chunk
+            chunk = min(chunk * 2, MAX_CHUNK)
+
+    def _union(self, postings: list[array], after_id: int | None, chunk: int = 64):
+        lows = [bisect_right(posting, after_id) if after_id is not None else 0 for posting in postings]
+
+        while any(low < len(posting) for posting, low in zip(postings, lows)):
+            high = self._window(postings, lows, chunk)
+            matched = set()
+
+            for index, posting in enumerate(postings):
+                end = len(posting) if high is None else bisect_right(posting, high, lows[index])
+                matched.update(posting[lows[index]:end])
+                lows[index] = end
+
+            yield from sorted(matched)
+            chunk = min(chunk * 2, MAX_CHUNK)
+
+    async def build(self, session_factory, redis: Redis, batch_size: int = 10_000):
+
+        postings: dict[str, list[int]] = {}
+        docs = {}
+
+        #Read before the rows: a write committed meanwhile bumps it past this value, never the other way round
+        generation = await get_generation(redis, "resumes")
+
+        async with session_factory() as session:
+            rows = await session.stream(
+                select(Resume.id, Resume.applicant_id, Resume.city, Resume.title, Resume.stack)
+                .order_by(Resume.id)
+                .execution_options(yield_per=batch_size)
+            )
+
+            async for resume_id, applicant_id, city, title, stack in rows:
+                skills = tuple(sys.intern(skill) for skill in split_stack(stack))
+
+                docs[resume_id] = (sys.intern(city.lower()), title.lower(), applicant_id, skills)
+
+                for skill in skills:
+                    postings.setdefault(skill, []).append(resume_id)
+
+        #Swap in one step so concurrent searches never see a half built index
+        self._postings = {skill: array('I', ids) for skill, ids in postings.items()}
+        self._docs = docs
+        self.generation = generation
+        self.ready = True
+
+    async def refresh_forever(self, session_factory, redis: Redis, interval_seconds: int):
+        while True:
+            await asyncio.sleep(interval_seconds)
+
+            #A failed rebuild keeps the previous index, the next round tries again
+            try:
+                if not self.is_current(await get_generation(redis, "resumes")):
+                    await self.build(session_factory, redis)
+            except Exception:
+                self.refresh_errors += 1
+                logger.exception("Skill index refresh failed")
+
+    def memory_usage(self) -> int:
+        size = sys.getsizeof(self._postings) + sys.getsizeof(self._docs)
+
+        for skill, posting in self._postings.items():
+            size += sys.getsizeof(skill) + sys.getsizeof(posting)
+
+        cities = set()
+        for resume_id, doc in self._docs.items():
+            city, title, applicant_id, skills = doc
+            size += sys.getsizeof(resume_id) + sys.getsizeof(doc) + sys.getsizeof(title) + sys.getsizeof(applicant_id) + sys.getsizeof(skills)
+            cities.add(city)
+
+        size += sum(sys.getsizeof(city) for city in cities)
+
+        return size
+
+    def stats(self) -> dict:
+        resumes = len(self._docs)
+        size = self.memory_usage()
+
+        return {
+            'ready': self.ready,
+            'generation': self.generation,
+            'refresh_errors': self.refresh_errors,
+            'resumes': resumes,
+            'skills': len(self._postings),
+            'postings': sum(len(posting) for posting in self._postings.values()),
+            'bytes': size,
+            'bytes_per_100k_resumes': round(size / resumes * 100_000) if resumes else 0
+        }
+
+
+skill_index = SkillIndex()
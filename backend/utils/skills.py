@@ -0,0 +1,20 @@
+import re
+
+
+SKILL_SEPARATORS = re.compile(r'[,;]')
+
+
+def normalize_skill(skill: str) -> str:
+    return " ".join(skill.lower().split())
+
+
+def split_stack(stack: str | None) -> list[str]:
+    #"FastAPI, PostgreSQL, Python" -> ["fastapi", "postgresql", "python"]
+    skills = []
+
+    for part in SKILL_SEPARATORS.split(stack or ""):
+        skill = normalize_skill(part)
+        if skill and skill not in skills:
+            skills.append(skill)
+
+    return skills
@@ -0,0 +1,238 @@
+from collections import Counter
+from redis.asyncio import Redis
+from sqlalchemy import select
+
+from backend.models.resume import Resume
+from backend.models.vacancy import Vacancy
+from backend.utils.skills import split_stack, normalize_skill
+
+
+#Every term is a member of suggest:{entity}:{field} with score 0, so ZRANGEBYLEX walks them in
+#prefix order, and its frequency lives in the suggest:{entity}:{field}:counts hash. Terms are also
+#members of suggest:{entity}:{field}:prefix:{p} for each of their first SUGGEST_PREFIX_LEN prefixes,
+#scored by minus their frequency: ZRANGEBYSCORE then returns the most frequent first, ties by term
+SUGGEST_FIELDS = {"resumes": ("city", "title", "skill"), "vacancies": ("city", "title")}
+SUGGEST_BUILT_KEY = "suggest:built"
+SUGGEST_PREFIX_LEN = 3
+
+#Longer prefixes rank their whole lex range when it holds at most this many terms, wider ranges are
+#walked in frequency order through the set of their first SUGGEST_PREFIX_LEN characters instead
+SUGGEST_SCAN = 200
+SUGGEST_BATCH = 1000
+
+#Sorts after every UTF-8 encoded character, "[py" .. "[py" + LEX_MAX is the range of the "py" prefix
+LEX_MAX = "\U0010ffff"
+
+
+def suggest_key(entity: str, field: str) -> str:
+    return f"suggest:{entity}:{field}"
+
+
+def counts_key(entity: str, field: str) -> str:
+    return f"suggest:{entity}:{field}:counts"
+
+
+def prefix_key(entity: str, field: str, prefix: str) -> str:
+    return f"suggest:{entity}:{field}:prefix:{prefix}"
+
+
+def term_prefixes(term: str) -> list[str]:
+    return [term[:length] for length in range(1, min(len(term), SUGGEST_PREFIX_LEN) + 1)]
+
+
+def resume_suggest_terms(resume: dict) -> list[tuple]:
+    terms = [("city", normalize_skill(resume["city"])), ("title", normalize_skill(resume["title"]))]
+    terms += [("skill", skill) for skill in split_stack(resume["stack"])]
+
+    return [(field, term) for field, term in terms if term]
+
+
+def vacancy_suggest_terms(vacancy: dict) -> list[tuple]:
+    terms = [("city", normalize_skill(vacancy["city"])), ("title", normalize_skill(vacancy["title"]))]
+
+    return [(field, term) for field, term in terms if term]
+
+
+async def apply_suggest_deltas(redis: Redis, entity: str, removed: list[dict] = (), added: list[dict] = (), terms=resume_suggest_terms):
+    """Move the term frequencies from the removed rows to the added ones, after the write committed."""
+
+    deltas = Counter()
+
+    for row in removed:
+        deltas.subtract(terms(row))
+
+    for row in added:
+        deltas.update(terms(row))
+
+    deltas = [(field, term, delta) for (field, term), delta in deltas.items() if delta]
+
+    if not deltas:
+        return
+
+    async with redis.pipeline(transaction=False) as pipeline:
+        for field, term, delta in deltas:
+            pipeline.hincrby(counts_key(entity, field), term, delta)
+
+        for field, term, delta in deltas:
+            if delta > 0:
+                pipeline.zadd(suggest_key(entity, field), {term: 0})
+
+            for prefix in term_prefixes(term):
+                pipeline.zincrby(prefix_key(entity, field, prefix), -delta, term)
+
+        counts = (await pipeline.execute())[:len(deltas)]
+
+    gone = [(field, term) for (field, term, _), count in zip(deltas, counts) if count <= 0]
+
+    if not gone:
+        return
+
+    #A term added again between the two pipelines loses its member until the next rebuild, which only
+    #hides it from suggestions, while keeping every dead term would grow the sets forever
+    async with redis.pipeline(transaction=False) as pipeline:
+        for field, term in gone:
+            pipeline.zrem(suggest_key(entity, field), term)
+            pipeline.hdel(counts_key(entity, field), term)
+
+            for prefix in term_prefixes(term):
+                pipeline.zrem(prefix_key(entity, field, prefix), term)
+
+        await pipeline.execute()
+
+
+async def apply_resume_suggestions(redis: Redis, removed: list[dict] = (), added: list[dict] = ()):
+    await apply_suggest_deltas(redis, "resumes", removed, added, terms=resume_suggest_terms)
+
+
+async def apply_vacancy_suggestions(redis: Redis, removed: list[dict] = (), added: list[dict] = ()):
+    await apply_suggest_deltas(redis, "vacancies", removed, added, terms=vacancy_suggest_terms)
+
+
+async def rank_lex_range(redis: Redis, entity: str, field: str, prefix: str, limit: int) -> list[dict]:
+
+    terms = await redis.zrangebylex(suggest_key(entity, field), f"[{prefix}", f"[{prefix}{LEX_MAX}")
+
+    if not terms:
+        return []
+
+    counts = await redis.hmget(counts_key(entity, field), terms)
+
+    ranked = sorted(((int(count or 0), term) for term, count in zip(terms, counts)), key=lambda pair: (-pair[0], pair[1]))
+
+    return [{"value": term, "count": count} for count, term in ranked[:limit] if count > 0]
+
+
+async def walk_prefix_set(redis: Redis, entity: str, field: str, prefix: str, limit: int) -> list[dict]:
+
+    key = prefix_key(entity, field, prefix[:SUGGEST_PREFIX_LEN])
+    suggestions, start = [], 0
+
+    #Members come most frequent first, so the first `limit` that match the whole prefix are the top ones
+    while len(suggestions) < limit:
+        page = await redis.zrangebyscore(key, "-inf", "(0", start=start, num=SUGGEST_SCAN, withscores=True)
+
+        suggestions += [{"value": term, "count": -int(score)} for term, score in page if term.startswith(prefix)]
+
+        if len(page) < SUGGEST_SCAN:
+            break
+
+        start += SUGGEST_SCAN
+
+    return suggestions[:limit]
+
+
+async def get_suggestions(redis: Redis, entity: str, field: str, prefix: str, limit: int = 10) -> list[dict]:
+    """Most frequent terms starting with prefix, read from Redis only."""
+
+    prefix = normalize_skill(prefix)
+
+    if not prefix:
+        return []
+
+    if len(prefix) <= SUGGEST_PREFIX_LEN:
+        ranked = await redis.zrangebyscore(prefix_key(entity, field, prefix), "-inf", "(0", start=0, num=limit, withscores=True)
+        return [{"value": term, "count": -int(score)} for term, score in ranked]
+
+    if await redis.zlexcount(suggest_key(entity, field), f"[{prefix}", f"[{prefix}{LEX_MAX}") <= SUGGEST_SCAN:
+        return await rank_lex_range(redis, entity, field, prefix, limit)
+
+    return await walk_prefix_set(redis, entity, field, prefix, limit)
+
+
+async def write_counts(redis: Redis, entity: str, field: str, counts: Counter):
+
+    key, counts_hash = suggest_key(entity, field), counts_key(entity, field)
+    items = list(counts.items())
+
+    prefixes: dict[str, dict[str, int]] = {}
+    for term, count in items:
+        for prefix in term_prefixes(term):
+            prefixes.setdefault(prefix, {})[term] = -count
+
+    #Prefix sets of terms that are gone from Postgres would otherwise keep them forever
+    stale = {prefix for term in await redis.zrange(key, 0, -1) for prefix in term_prefixes(term)} - prefixes.keys()
+
+    #Filled under temporary names and swapped in with RENAME, readers never see a half built set
+    async with redis.pipeline(transaction=False) as pipeline:
+        pipeline.delete(f"{key}:rebuild", f"{counts_hash}:rebuild")
+
+        for start in range(0, len(items), SUGGEST_BATCH):
+            batch = dict(items[start:start + SUGGEST_BATCH])
+            pipeline.zadd(f"{key}:rebuild", {term: 0 for term in batch})
+            pipeline.hset(f"{counts_hash}:rebuild", mapping=batch)
+
+        for prefix, scores in prefixes.items():
+            rebuild_key = f"{prefix_key(entity, field, prefix)}:rebuild"
+            pipeline.delete(rebuild_key)
+
+            scores = list(scores.items())
+            for start in range(0, len(scores), SUGGEST_BATCH):
+                pipeline.zadd(rebuild_key, dict(scores[start:start + SUGGEST_BATCH]))
+
+        await pipeline.execute()
+
+    async with redis.pipeline(transaction=True) as pipeline:
+        if items:
+            pipeline.rename(f"{key}:rebuild", key)
+            pipeline.rename(f"{counts_hash}:rebuild", counts_hash)
+        else:
+            pipeline.delete(key, counts_hash)
+
+        for prefix in prefixes:
+            pipeline.rename(f"{prefix_key(entity, field, prefix)}:rebuild", prefix_key(entity, field, prefix))
+
+        if stale:
+            pipeline.delete(*(prefix_key(entity, field, prefix) for prefix in stale))
+
+        await pipeline.execute()
+
+
+async def rebuild_suggestions(redis: Redis, session_factory, batch_size: int = 10_000):
+    """Recount every term from Postgres. Writes that commit while it runs are picked up by the next rebuild."""
+
+    sources = {
+        "resumes": (select(Resume.city, Resume.title, Resume.stack), resume_suggest_terms),
+        "vacancies": (select(Vacancy.city, Vacancy.title), vacancy_suggest_terms)
+    }
+
+    async with session_factory() as session:
+        for entity, (query, terms) in sources.items():
+            counts = {field: Counter() for field in SUGGEST_FIELDS[entity]}
+
+            rows = await session.stream(query.execution_options(yield_per=batch_size))
+
+            async for row in rows:
+                for field, term in terms(row._asdict()):
+                    counts[field][term] += 1
+
+            for field, field_counts in counts.items():
+                await write_counts(redis, entity, field, field_counts)
+
+    await redis.set(SUGGEST_BUILT_KEY, 1)
+
+
+async def ensure_suggestions(redis: Redis, session_factory):
+
+    #Sets survive restarts in Redis, only a fresh Redis needs the bulk build
+    if not await redis.exists(SUGGEST_BUILT_KEY):
+        await rebuild_suggestions(redis, session_factory)
@@ -0,0 +1,49 @@
+from redis.asyncio import Redis
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+#Exact totals are recounted at most once per TTL, admin listings page far more often than that
+COUNT_CACHE_TTL = 30
+
+
+def count_key(table: str) -> str:
+    return f"count:{table}"
+
+
+async def exact_count(session: AsyncSession, redis: Redis, model) -> int:
+
+    table = model.__tablename__
+
+    cached = await redis.get(count_key(table))
+    if cached is not None:
+        return int(cached)
+
+    quantity = await session.scalar(select(func.count()).select_from(model))
+    await redis.set(count_key(table), quantity, ex=COUNT_CACHE_TTL)
+
+    return quantity
+
+
+async def estimated_count(session: AsyncSession, redis: Redis, model) -> tuple[int, bool]:
+
+    #Row estimate the planner keeps from VACUUM / ANALYZE, a catalog lookup instead of a table scan
+    reltuples = await session.scalar(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": model.__tablename__}
+    )
+
+    #-1 (or 0 before PostgreSQL 14) until the table is analyzed for the first time
+    if reltuples is None or reltuples <= 0:
+        return await exact_count(session, redis, model), False
+
+    return reltuples, True
+
+
+async def table_count(session: AsyncSession, redis: Redis, model, estimate: bool = False) -> tuple[int, bool]:
+    """Return (quantity, is_estimate). An estimate is only given when asked for and the table has statistics."""
+
+    if estimate:
+        return await estimated_count(session, redis, model)
+
+    return await exact_count(session, redis, model), False
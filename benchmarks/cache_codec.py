@@ -0,0 +1,81 @@
+"""CPU cost of serving one cached search page: the old JSON round trip vs passing the cached bytes through.
+
+    PYTHONPATH=. MODE=TEST python benchmarks/cache_codec.py --rows 10 50 100
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from backend.utils.cache_codec import CODECS, dumps, json_response, pack, unpack
+
+
+SKILLS = ['Python', 'FastAPI', 'Django', 'PostgreSQL', 'Redis', 'Docker', 'Kubernetes', 'Go', 'Kafka', 'React']
+CITIES = ['Almaty', 'Astana', 'Shymkent', 'Karaganda', 'Aktobe', 'Moscow']
+TITLES = ['Backend Developer', 'Python Developer', 'Data Engineer', 'DevOps Engineer', 'Frontend Developer']
+
+
+def page(rows: int) -> dict:
+    rng = random.Random(42)
+    created_at = datetime(2026, 1, 1)
+
+    resumes = [{
+        "id": resume_id,
+        "applicant_id": rng.randint(1, 100_000),
+        "title": rng.choice(TITLES),
+        "about": " ".join(rng.choice(SKILLS) for _ in range(40)),
+        "stack": ", ".join(rng.sample(SKILLS, rng.randint(2, 6))),
+        "city": rng.choice(CITIES),
+        "created_at": (created_at + timedelta(minutes=resume_id)).isoformat()
+    } for resume_id in range(1, rows + 1)]
+
+    return {"resumes": resumes, "next_cursor": "MTA"}
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def run(rows: int, repeat: int):
+    payload = page(rows)
+    body = dumps(payload)
+
+    #Before: the envelope was JSON text, decoded on every hit and encoded again by FastAPI
+    legacy = json.dumps({"t": time.time(), "v": payload["resumes"]})
+
+    def legacy_hit():
+        entry = json.loads(legacy)
+        JSONResponse(jsonable_encoder({"resumes": entry["v"], "next_cursor": "MTA", "source": "cache"}))
+
+    def passthrough_hit():
+        _, cached = unpack(frame)
+        json_response(cached, source="cache")
+
+    print(f"{rows} rows, {len(body)} bytes of JSON")
+
+    frame = pack(body, time.time())
+    print(f"  legacy json round trip: {timed(legacy_hit, repeat):8.1f}us per hit")
+    print(f"  bytes passthrough:      {timed(passthrough_hit, repeat):8.1f}us per hit ({len(frame)} bytes in Redis)")
+
+    for codec in CODECS.values():
+        compressed = codec.compress(body)
+        encode_us = timed(lambda: codec.compress(body), repeat)
+        decode_us = timed(lambda: codec.decompress(compressed), repeat)
+        print(f"  {codec.name:>4}: {len(compressed):7} bytes, compress {encode_us:7.1f}us, decompress {decode_us:7.1f}us")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        run(rows, args.repeat)
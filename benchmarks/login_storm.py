@@ -0,0 +1,82 @@
+"""Event loop lag seen by other requests while a burst of logins verifies bcrypt hashes.
+
+A probe coroutine stands in for a non-auth endpoint: it wakes every 5 ms and records how late it
+was woken. The storm runs with bcrypt inline (the old behaviour), in a thread pool and in a process pool.
+
+    PYTHONPATH=. MODE=TEST python benchmarks/login_storm.py --logins 40 --workers 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from backend.utils.hash import HashExecutor, hashing_password, verify_password_sync
+
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+
+async def storm(mode: str, logins: int, workers: int, hashed: str) -> dict:
+    lags, stop = [], asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    executor = HashExecutor(mode, workers, max_pending=logins) if mode != 'inline' else None
+
+    async def login():
+        if executor is None:
+            return verify_password_sync("12345678", hashed)
+        return await executor.run(verify_password_sync, "12345678", hashed)
+
+    if executor is not None:
+        #Process workers start lazily, warm them up outside the measurement
+        await asyncio.gather(*(executor.run(verify_password_sync, "12345678", hashed) for _ in range(workers)))
+
+    await asyncio.sleep(0.05)
+    lags.clear()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe_task
+
+    if executor is not None:
+        executor.shutdown()
+
+    lags.sort()
+    return {
+        "mode": mode,
+        "logins_per_s": logins / elapsed,
+        "probe_samples": len(lags),
+        "lag_p50_ms": statistics.median(lags) if lags else float('nan'),
+        "lag_p99_ms": lags[int(len(lags) * 0.99) - 1] if lags else float('nan'),
+        "lag_max_ms": lags[-1] if lags else float('nan'),
+    }
+
+
+async def main(logins: int, workers: int):
+    hashed = hashing_password("12345678")
+
+    for mode in ('inline', 'thread', 'process'):
+        result = await storm(mode, logins, workers, hashed)
+        print(
+            f"{result['mode']:>7}: {result['logins_per_s']:6.1f} logins/s, "
+            f"probe lag p50 {result['lag_p50_ms']:7.1f}ms p99 {result['lag_p99_ms']:7.1f}ms max {result['lag_max_ms']:7.1f}ms "
+            f"({result['probe_samples']} samples)"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.logins, args.workers))
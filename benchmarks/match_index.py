@@ -0,0 +1,61 @@
+"""Latency of scoring every resume against a vacancy with the NumPy match index.
+
+    PYTHONPATH=. python benchmarks/match_index.py --resumes 1000000
+"""
+import argparse
+import random
+import time
+
+from backend.utils.match_index import MatchIndex, Segment, Vocabulary
+
+
+SKILLS = ['Python', 'FastAPI', 'Django', 'PostgreSQL', 'Redis', 'Docker', 'Kubernetes', 'Go', 'Kafka', 'React',
+          'TypeScript', 'Java', 'Spring', 'Celery', 'RabbitMQ', 'Linux', 'Git', 'SQLAlchemy', 'Pandas', 'NumPy']
+CITIES = ['Almaty', 'Astana', 'Shymkent', 'Karaganda', 'Aktobe', 'Moscow']
+TITLES = ['Backend Developer', 'Python Developer', 'Data Engineer', 'DevOps Engineer', 'Frontend Developer']
+
+VACANCIES = [
+    ('Python developer', 'Almaty'),
+    ('Senior Go Kafka engineer', 'Astana'),
+    ('React TypeScript frontend developer', 'Moscow'),
+]
+
+
+def build(size: int) -> MatchIndex:
+    rng = random.Random(42)
+    index = MatchIndex()
+
+    docs = [
+        MatchIndex._doc(resume_id, resume_id, rng.choice(CITIES), rng.choice(TITLES), ", ".join(rng.sample(SKILLS, rng.randint(2, 6))))
+        for resume_id in range(1, size + 1)
+    ]
+
+    index._skills, index._words, index._cities = Vocabulary(), Vocabulary(), Vocabulary()
+    index._main = Segment(docs, index._skills, index._words, index._cities)
+    index.ready = True
+
+    return index
+
+
+def run(size: int, repeat: int = 20):
+    start = time.perf_counter()
+    index = build(size)
+    print(f"built {size} resumes in {time.perf_counter() - start:.2f}s")
+    print(index.stats())
+
+    for title, city in VACANCIES:
+        index.top(title, city)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            index.top(title, city, limit=10)
+        elapsed_ms = (time.perf_counter() - start) / repeat * 1000
+        print(f"{title!r} in {city}: {elapsed_ms:.1f}ms per vacancy")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resumes', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    run(args.resumes)
@@ -0,0 +1,101 @@
+"""Redis CPU and memory of the sliding log and the GCRA limiter for many distinct keys.
+
+Every engine gets its own run on a flushed database: --keys users make --requests requests each
+against a 5 requests / 60 s limit, then the script reads the server's commandstats and memory.
+Needs a real Redis, fakeredis has neither counter. The database is FLUSHDB'ed, do not point it at a live one.
+
+    PYTHONPATH=. MODE=TEST python benchmarks/rate_limiter.py --keys 10000 --requests 10 --db 15
+"""
+import argparse
+import asyncio
+import time
+
+from redis.asyncio import Redis
+
+from backend.config import settings
+from backend.utils.limiter import LIMITER_ENGINES
+
+
+MAX_REQUESTS = 5
+WINDOW_SECONDS = 60
+CONCURRENCY = 200
+
+
+ADMIN_COMMANDS = ('config', 'info', 'flushdb', 'memory', 'scan', 'script')
+
+
+def server_cost(commandstats: dict) -> tuple[int, int]:
+    """Calls and usec the limiter cost the server.
+
+    Commands run by a script are listed on their own too, but EVALSHA's usec already includes
+    them, so for scripts only EVALSHA is counted.
+    """
+
+    stats = {name.removeprefix('cmdstat_'): value for name, value in commandstats.items() if name.removeprefix('cmdstat_') not in ADMIN_COMMANDS}
+
+    if 'evalsha' in stats:
+        stats = {'evalsha': stats['evalsha']}
+
+    return sum(value['calls'] for value in stats.values()), sum(value['usec'] for value in stats.values())
+
+
+async def run(redis: Redis, engine: str, keys: int, requests: int) -> dict:
+    await redis.flushdb()
+    await redis.config_resetstat()
+    memory_before = (await redis.info('memory'))['used_memory']
+
+    limiter = LIMITER_ENGINES[engine](redis)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    limited = 0
+
+    async def user(user_id: int):
+        nonlocal limited
+        for _ in range(requests):
+            async with semaphore:
+                limited += await limiter.is_limited(str(user_id), "bench", MAX_REQUESTS, WINDOW_SECONDS)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(user_id) for user_id in range(keys)))
+    elapsed = time.perf_counter() - start
+
+    commandstats = await redis.info('commandstats')
+    calls, usec = server_cost(commandstats)
+    memory_after = (await redis.info('memory'))['used_memory']
+
+    sample_key = next(iter([key async for key in redis.scan_iter(match="rate_limiter:*", count=100)]), None)
+
+    return {
+        "engine": engine,
+        "checks": keys * requests,
+        "limited": limited,
+        "checks_per_s": keys * requests / elapsed,
+        "commands": calls,
+        "server_usec_per_check": usec / (keys * requests),
+        "memory_mb": (memory_after - memory_before) / 2 ** 20,
+        "key_bytes": await redis.memory_usage(sample_key) if sample_key else 0,
+    }
+
+
+async def main(keys: int, requests: int, db: int):
+    redis = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=db, decode_responses=True)
+
+    for engine in LIMITER_ENGINES:
+        result = await run(redis, engine, keys, requests)
+        print(
+            f"{result['engine']:>11}: {result['checks']} checks ({result['limited']} limited), {result['checks_per_s']:8.0f} checks/s, "
+            f"{result['commands']} commands, {result['server_usec_per_check']:5.2f} server usec/check, "
+            f"{result['memory_mb']:6.2f} MB for {keys} keys, {result['key_bytes']} bytes per key"
+        )
+
+    await redis.flushdb()
+    await redis.aclose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--keys', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=10)
+    parser.add_argument('--db', type=int, default=15)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.keys, args.requests, args.db))
@@ -0,0 +1,62 @@
+"""Latency and memory footprint of the in-process skill index.
+
+    PYTHONPATH=. python benchmarks/skill_index.py --resumes 100000
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from backend.utils.skill_index import SkillIndex
+
+
+SKILLS = ['Python', 'FastAPI', 'Django', 'PostgreSQL', 'Redis', 'Docker', 'Kubernetes', 'Go', 'Kafka', 'React',
+          'TypeScript', 'Java', 'Spring', 'Celery', 'RabbitMQ', 'Linux', 'Git', 'SQLAlchemy', 'Pandas', 'NumPy']
+CITIES = ['Almaty', 'Astana', 'Shymkent', 'Karaganda', 'Aktobe', 'Moscow']
+TITLES = ['Backend Developer', 'Python Developer', 'Data Engineer', 'DevOps Engineer', 'Frontend Developer']
+
+QUERIES = [
+    (['python'], True, None),
+    (['python', 'postgresql'], True, 'almaty'),
+    (['go', 'kafka', 'kubernetes'], True, None),
+    (['react', 'typescript'], False, 'astana'),
+]
+
+
+def build(size: int) -> SkillIndex:
+    rng = random.Random(42)
+    index = SkillIndex()
+    index.ready = True
+
+    for resume_id in range(1, size + 1):
+        index.add(SimpleNamespace(
+            id=resume_id,
+            applicant_id=resume_id,
+            city=rng.choice(CITIES),
+            title=rng.choice(TITLES),
+            stack=", ".join(rng.sample(SKILLS, rng.randint(2, 6)))
+        ))
+
+    return index
+
+
+def run(size: int, repeat: int = 1000):
+    start = time.perf_counter()
+    index = build(size)
+    print(f"built {size} resumes in {time.perf_counter() - start:.2f}s")
+    print(index.stats())
+
+    for skills, match_all, city in QUERIES:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            index.search(skills, match_all=match_all, city=city, limit=10)
+        elapsed_us = (time.perf_counter() - start) / repeat * 1_000_000
+        print(f"{'AND' if match_all else 'OR'} {skills} city={city}: {elapsed_us:.1f}us per query")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resumes', type=int, default=100_000)
+    args = parser.parse_args()
+
+    run(args.resumes)
@@ -1,10 +1,55 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 import uvicorn
 
 from backend.router import main_router
+from backend.config import settings
+from backend.database.database import new_session, engine, read_engine, stick_to_primary
+from backend.database.redis_database import redis_conn
+from backend.utils.skill_index import skill_index
+from backend.utils.match_index import match_index
+from backend.utils.search_cache import purge_legacy_search_keys
+from backend.utils.local_cache import listen_invalidations
+from backend.utils.suggest import ensure_suggestions
+from backend.utils.hash import hash_executor
 
 
-app = FastAPI(root_path="/api")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background_tasks = []
+
+    await purge_legacy_search_keys(redis_conn)
+    await ensure_suggestions(redis_conn, new_session)
+
+    #Evicts this worker's local cache tier when another worker invalidates a key
+    background_tasks.append(asyncio.create_task(listen_invalidations(redis_conn)))
+
+    #Index rebuilds read the primary: a lagging replica would drop rows that add() just put in
+    if settings.SKILL_INDEX_ENABLED:
+        await skill_index.build(new_session, redis_conn)
+        background_tasks.append(asyncio.create_task(skill_index.refresh_forever(new_session, redis_conn, settings.SKILL_INDEX_REFRESH_SECONDS)))
+
+    #The match matrix is built on the first /matches request, then kept fresh here
+    background_tasks.append(asyncio.create_task(match_index.refresh_forever(new_session, redis_conn, settings.MATCH_INDEX_REFRESH_SECONDS)))
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+
+    hash_executor.shutdown()
+
+    #Closes the pooled connections instead of leaving them to be dropped with the process
+    await engine.dispose()
+
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+app = FastAPI(root_path="/api", lifespan=lifespan)
+
+app.middleware("http")(stick_to_primary)
 
 app.include_router(main_router)
 
@@ -23,6 +23,8 @@ async def setup_db():
     assert settings.MODE == 'TEST'
     
     async with engine.begin() as conn:
+        #The gin_trgm_ops indexes of the models need it, alembic is not run on the test database
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
 
     yield
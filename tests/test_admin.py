@@ -184,4 +184,75 @@ async def test_delete_response(get_token_as_admin, apply_to_vacancy):
 
     response = await get_token_as_admin.request("DELETE", f"/admin/delete_response/{response_id}")
 
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_get_users_with_cursor(get_token_as_admin, get_token_as_tenant, get_token_as_applicant):
+
+    first_page = await get_token_as_admin.get("/admin/get_users", params={"limit": 1})
+    next_cursor = first_page.json()["next_cursor"]
+
+    assert next_cursor is not None
+
+    second_page = await get_token_as_admin.get("/admin/get_users", params={"limit": 1, "cursor": next_cursor})
+
+    assert second_page.status_code == 200
+    assert second_page.json()["users"][0]["id"] > first_page.json()["users"][0]["id"]
+
+
+@pytest.mark.asyncio
+async def test_get_users_with_invalid_cursor(get_token_as_admin):
+
+    response = await get_token_as_admin.get("/admin/get_users", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_users_with_estimated_quantity(get_token_as_admin):
+
+    response = await get_token_as_admin.get("/admin/get_users", params={"estimate": True})
+
+    assert response.status_code == 200
+
+    data = response.json()
+
+    assert data["quantity of all users"] > 0
+
+    #A never analyzed table has no estimate, the exact count is reported as such
+    if not data["quantity is estimated"]:
+        exact = await get_token_as_admin.get("/admin/get_users")
+        assert data["quantity of all users"] == exact.json()["quantity of all users"]
+
+
+@pytest.mark.asyncio
+async def test_get_metrics(get_token_as_admin):
+
+    response = await get_token_as_admin.get("/admin/metrics")
+
+    assert response.status_code == 200
+
+    search_cache = response.json()["search_cache"]
+
+    for counter in ("hit", "stale_hit", "coalesced", "miss"):
+        assert counter in search_cache
+
+    assert "pool" in response.json()["database_pool"]
+    assert all("redis_calls_avoided" in limiter for limiter in response.json()["rate_limiter_pre_limit"])
+
+
+@pytest.mark.asyncio
+async def test_rebuild_facets_matches_incremental_counts(get_token_as_admin, get_token_as_applicant):
+
+    async def facets(city: str):
+        response = await get_token_as_applicant.get("/search/search_vacancies", params={"city": city, "facets": True})
+        assert response.status_code == 200
+        return response.json()["facets"]
+
+    before = await facets("Almaty")
+
+    response = await get_token_as_admin.post("/admin/rebuild_facets")
+    assert response.status_code == 200
+
+    #Another spelling of the same filter, so the facets are not served from the search cache
+    assert await facets("almaty") == before
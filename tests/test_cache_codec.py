@@ -0,0 +1,46 @@
+import json
+import pytest
+
+from backend.config import settings
+from backend.utils.cache_codec import CODECS, Codec, dumps, json_object, pack, unpack, get_codec
+
+
+def test_pack_round_trip():
+    small = dumps({"resumes": [], "next_cursor": None})
+    large = dumps({"resumes": [{"id": i, "about": "python " * 20} for i in range(100)], "next_cursor": "MTAw"})
+
+    assert len(large) >= settings.CACHE_COMPRESS_MIN_BYTES
+
+    assert unpack(pack(small, 1.5)) == (1.5, small)
+    assert unpack(pack(large, 2.5)) == (2.5, large)
+
+    #Large bodies are compressed, small ones are stored as they are
+    assert pack(small, 1.5)[0] == Codec.id
+    assert pack(large, 2.5)[0] != Codec.id
+    assert len(pack(large, 2.5)) < len(large)
+
+
+def test_unpack_legacy_and_unknown():
+    #Plain JSON written before the codec existed is a miss, not an error
+    assert unpack(json.dumps({"t": 1, "v": []}).encode()) is None
+    assert unpack(b"[]") is None
+    assert unpack(b"") is None
+
+    unknown = max(CODECS) + 1
+    assert unpack(bytes([unknown]) + pack(b"{}", 1.0)[1:]) is None
+
+
+def test_json_object():
+    assert json.loads(json_object(b'{"a":1}', b=2, c="x")) == {"a": 1, "b": 2, "c": "x"}
+    assert json.loads(json_object(b"{}", facets=b'{"city":[]}')) == {"facets": {"city": []}}
+
+
+def test_unavailable_codec_fails_loudly():
+    assert get_codec("zlib").name == "zlib"
+
+    with pytest.raises(RuntimeError):
+        get_codec("brotli")
+
+    if not any(codec.name == "zstd" for codec in CODECS.values()):
+        with pytest.raises(RuntimeError, match="zstandard"):
+            get_codec("zstd")
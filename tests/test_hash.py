@@ -0,0 +1,33 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+
+from backend.utils.hash import HashExecutor, hashing_password, verify_password_sync
+
+
+@pytest.mark.asyncio
+async def test_hash_executor_verifies():
+    executor = HashExecutor('thread', workers=2, max_pending=4)
+    hashed = hashing_password("12345678")
+
+    assert await executor.run(verify_password_sync, "12345678", hashed)
+    assert not await executor.run(verify_password_sync, "87654321", hashed)
+    assert executor.stats()["completed"] == 2
+
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_executor_rejects_over_capacity():
+    executor = HashExecutor('thread', workers=1, max_pending=1)
+
+    results = await asyncio.gather(*(executor.run(time.sleep, 0.05) for _ in range(3)), return_exceptions=True)
+
+    #One running and one queued call fit, the third one is turned away
+    rejected = [result for result in results if isinstance(result, HTTPException)]
+    assert len(rejected) == 1 and rejected[0].status_code == 503
+    assert executor.stats()["rejected"] == 1
+    assert executor.stats()["max_in_flight"] == 2
+
+    executor.shutdown()
@@ -0,0 +1,28 @@
+import pytest
+import fakeredis.aioredis
+from types import SimpleNamespace
+
+from backend.models.user import Role
+from backend.utils.local_cache import local_cache
+from backend.utils.identity_cache import get_identity, set_identity, get_identity_version, invalidate_identity, identity_key
+
+
+@pytest.mark.asyncio
+async def test_snapshot_read_before_a_role_change_is_not_cached():
+    pytest.importorskip("lupa")
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    user = SimpleNamespace(id=501, email="admin@example.com", name="Admin", role=Role.admin)
+
+    #The row is read as admin, then a demotion commits and invalidates before the fill
+    version = await get_identity_version(redis, user.id)
+    await invalidate_identity(redis, user.id)
+    await set_identity(redis, user, version)
+
+    local_cache.evict(identity_key(user.id))
+    assert await get_identity(redis, user.id) is None
+
+    #A fill under the current version is cached as before
+    await set_identity(redis, user, await get_identity_version(redis, user.id))
+
+    local_cache.evict(identity_key(user.id))
+    assert (await get_identity(redis, user.id)).role == Role.admin
@@ -44,4 +44,38 @@ async def test_vacancy_search_invalidation(get_token_as_applicant, get_token_as_
     assert third_response.json()["source"] == "db"
 
     titles = [v["title"] for v in third_response.json()["vacancies"]]
-    assert "Senior Python Developer" in titles
\ No newline at end of file
+    assert "Senior Python Developer" in titles
+
+@pytest.mark.asyncio
+async def test_vacancy_search_invalidation_by_city(get_token_as_applicant, get_token_as_tenant):
+
+    params = {"city": "Shymkent"}
+
+    await get_token_as_applicant.get("/search/search_vacancies", params=params)
+    cached_response = await get_token_as_applicant.get("/search/search_vacancies", params=params)
+    assert cached_response.json()["source"] == "cache"
+
+    other_city_vacancy = {
+        "title": "Go Developer",
+        "city": "Almaty",
+        "compensation": 400000
+    }
+
+    await get_token_as_tenant.post("/vacancy/create_vacancy", json=other_city_vacancy)
+
+    untouched_response = await get_token_as_applicant.get("/search/search_vacancies", params=params)
+    assert untouched_response.json()["source"] == "cache"
+
+    same_city_vacancy = {
+        "title": "Go Developer",
+        "city": "Shymkent",
+        "compensation": 400000
+    }
+
+    await get_token_as_tenant.post("/vacancy/create_vacancy", json=same_city_vacancy)
+
+    invalidated_response = await get_token_as_applicant.get("/search/search_vacancies", params=params)
+    assert invalidated_response.json()["source"] == "db"
+
+    titles = [v["title"] for v in invalidated_response.json()["vacancies"]]
+    assert "Go Developer" in titles
@@ -1,4 +1,15 @@
 import pytest
+import fakeredis.aioredis
+
+from backend.utils import limiter as limiter_module
+from backend.utils.limiter import GcraRateLimiter, LIMITER_ENGINES, LocalPreLimiter, PreLimit
+
+
+@pytest.fixture
+def redis():
+    #fakeredis runs the Lua scripts of the limiters with lupa
+    pytest.importorskip("lupa")
+    return fakeredis.aioredis.FakeRedis(decode_responses=True)
 
 
 @pytest.mark.order(-1)
@@ -10,4 +21,68 @@ async def test_limiter_on_search_resumes(get_token_as_tenant):
         status_codes.append(response.status_code)
 
     assert status_codes[0] == 200
-    assert status_codes[-1] == 429
\ No newline at end of file
+    assert status_codes[-1] == 429
+
+@pytest.mark.asyncio
+async def test_gcra_limiter_allows_burst_then_limits(redis):
+    limiter = GcraRateLimiter(redis)
+
+    results = [await limiter.is_limited("1", "test", max_requests=5, window_seconds=60) for _ in range(7)]
+    assert results == [False] * 5 + [True] * 2
+
+    #A weighted request spends several tokens of a fresh key at once
+    assert not await limiter.is_limited("2", "test", max_requests=5, window_seconds=60, cost=5)
+    assert await limiter.is_limited("2", "test", max_requests=5, window_seconds=60)
+
+
+@pytest.mark.asyncio
+async def test_gcra_limiter_keeps_one_key(redis):
+    limiter = GcraRateLimiter(redis)
+
+    for _ in range(3):
+        await limiter.is_limited("1", "test", max_requests=5, window_seconds=60)
+
+    assert await redis.keys("rate_limiter:*") == ["rate_limiter:gcra:test:1"]
+    assert 0 < await redis.pttl("rate_limiter:gcra:test:1") <= 60_000
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine", ["sliding_log", "gcra"])
+async def test_pre_limiter_leases_and_blocks_locally(engine, redis):
+    limiter = LIMITER_ENGINES[engine](redis)
+    pre_limiter = LocalPreLimiter("test", max_requests=10, pre_limit=PreLimit(lease=4, lease_seconds=60))
+
+    results = [await pre_limiter.is_limited(limiter, 1, max_requests=10, window_seconds=60, cost=1) for _ in range(14)]
+
+    #Leases of 1, 2 and 4, then 1 and 2 after a refused lease of 4, then a single
+    #refusal from Redis and the rest is rejected without asking it
+    assert results == [False] * 10 + [True] * 4
+    stats = pre_limiter.snapshot()
+    assert stats["redis_calls"] == 8
+    assert stats["local_allowed"] == 5 and stats["local_rejected"] == 3
+    assert stats["redis_calls_avoided"] == 8
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("engine", ["sliding_log", "gcra"])
+async def test_pre_limiter_returns_unused_tokens(engine, redis, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(limiter_module, "monotonic", lambda: clock[0])
+
+    limiter = LIMITER_ENGINES[engine](redis)
+    pre_limiter = LocalPreLimiter("test", max_requests=12, pre_limit=PreLimit(lease=8, lease_seconds=1))
+
+    async def request(after: float):
+        clock[0] += after
+        return await pre_limiter.is_limited(limiter, 1, max_requests=12, window_seconds=60, cost=1)
+
+    #A burst grows the lease to 4, of which 3 are left when the client slows down
+    assert [await request(0.01) for _ in range(4)] == [False] * 4
+
+    #A request every 1.1 s outlives each lease: leftovers go back and leases shrink to what was used
+    assert [await request(1.1) for _ in range(7)] == [False] * 7
+    assert pre_limiter.snapshot()["tokens_returned"] == 3
+
+    #11 requests were made, so exactly one more fits into the shared budget
+    assert not await limiter.is_limited("1", "test", max_requests=12, window_seconds=60)
+    assert await limiter.is_limited("1", "test", max_requests=12, window_seconds=60)
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import pytest
+import fakeredis.aioredis
+
+from backend.utils.local_cache import LocalCache, local_cache, listen_invalidations, INVALIDATION_CHANNEL
+
+
+def test_local_cache_bounds():
+    cache = LocalCache(max_entries=2, max_bytes=100, ttl=30)
+
+    cache.set("a", 1, size=10)
+    cache.set("b", 2, size=10)
+    cache.get("a")
+    cache.set("c", 3, size=10)
+
+    #"b" was the least recently used entry
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("d", 4, size=20)
+    cache.set("e", 5, size=90)
+
+    assert cache.get("e") is None
+    assert cache.snapshot()["eviction"] == 2
+    assert cache.size <= 100
+
+
+def test_local_cache_ttl():
+    cache = LocalCache(max_entries=10, max_bytes=100, ttl=0.01)
+    cache.set("a", 1, size=1)
+
+    assert cache.get("a") == 1
+
+    cache._entries["a"] = (0, 1, 1)
+
+    assert cache.get("a") is None
+    assert cache.snapshot()["expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_local_cache_pubsub_invalidation():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    listener = asyncio.create_task(listen_invalidations(redis))
+
+    await asyncio.sleep(0.1)
+    local_cache.set("cache:user:1:profile", {"name": "Anton"}, size=20)
+
+    #Published by another worker
+    await redis.publish(INVALIDATION_CHANNEL, json.dumps(["cache:user:1:profile"]))
+    await asyncio.sleep(0.1)
+
+    assert local_cache.get("cache:user:1:profile") is None
+
+    listener.cancel()
+    await redis.aclose()
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+import fakeredis.aioredis
+from types import SimpleNamespace
+
+from backend.utils.match_index import MatchIndex, Segment
+from backend.utils.search_cache import generation_key
+
+
+@pytest.fixture
+def index():
+    match_index = MatchIndex()
+    match_index._main = Segment([], match_index._skills, match_index._words, match_index._cities)
+    match_index.ready = True
+
+    resumes = [
+        (1, 10, "Almaty", "FastAPI Developer", "FastAPI, PostgreSQL, Python"),
+        (2, 11, "Astana", "Python Developer", "Python, Django"),
+        (3, 12, "Almaty", "Go Developer", "Go, PostgreSQL"),
+        (4, 13, "Moscow", "Data Engineer", "Kafka"),
+    ]
+
+    for resume_id, applicant_id, city, title, stack in resumes:
+        match_index.add(SimpleNamespace(id=resume_id, applicant_id=applicant_id, city=city, title=title, stack=stack))
+
+    return match_index
+
+
+def test_match_index_ranking(index):
+    ranked = [resume_id for resume_id, _ in index.top("Python developer", "Almaty")]
+
+    #The same title outweighs the same city, resumes sharing nothing with the vacancy are left out
+    assert ranked == [2, 1, 3]
+    assert index.top("Python developer", "Almaty", limit=1)[0][0] == 2
+
+
+def test_match_index_updates(index):
+    index.add(SimpleNamespace(id=3, applicant_id=12, city="Almaty", title="Python Developer", stack="Python"))
+    index.remove_applicant(10)
+
+    assert [resume_id for resume_id, _ in index.top("Python developer", "Almaty")] == [3, 2]
+
+
+def test_match_index_main_segment():
+    main, skills, words, cities = MatchIndex._build_main([(5, 20, "Almaty", "Python Developer", "Python, Go")])
+
+    assert list(main.ids) == [5]
+    assert set(skills.codes) == {"python", "go"}
+    assert set(cities.codes) == {"almaty"}
+
+
+@pytest.mark.asyncio
+async def test_match_index_rebuilds_only_after_writes(index):
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    builds = []
+
+    async def build(session_factory, redis):
+        builds.append(await redis.get(generation_key("resumes")))
+        index.generation = int(builds[-1] or 0)
+
+    index.build = build
+    index.generation = 0
+    task = asyncio.create_task(index.refresh_forever(None, redis, 0))
+
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert builds == []
+
+    await redis.incr(generation_key("resumes"))
+    while not builds:
+        await asyncio.sleep(0)
+
+    task.cancel()
+    assert builds == ["1"]
+
+
+@pytest.mark.asyncio
+async def test_match_index_refresh_survives_errors(index):
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    calls = 0
+
+    async def build(session_factory, redis):
+        nonlocal calls
+        calls += 1
+        raise ConnectionError("database is gone")
+
+    index.build = build
+    index.generation = -1
+    task = asyncio.create_task(index.refresh_forever(None, redis, 0))
+
+    while calls < 3:
+        await asyncio.sleep(0)
+
+    task.cancel()
+
+    assert index.stats()["refresh_errors"] >= 2
+    assert index.top("Python developer", "Almaty")[0][0] == 2
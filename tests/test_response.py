@@ -1,5 +1,9 @@
 import pytest
 import asyncio
+import json
+from sqlalchemy import event
+
+from backend.database.database import engine
 
 
 @pytest.mark.asyncio
@@ -14,6 +18,23 @@ async def test_apply_to_vacancy(apply_to_vacancy, get_latest_emails):
     assert "city: Almaty" in emails[-1]["text"]
 
 
+@pytest.mark.asyncio
+async def test_apply_twice(get_token_as_applicant, create_vacancy, create_resume, apply_to_vacancy):
+
+    cover_letter = {"cover_letter": "Hello again"}
+    url = f"/response/apply_to_vacancy/{create_vacancy}"
+
+    #Both concurrent attempts hit the unique index, neither gets a second response in
+    responses = await asyncio.gather(
+        get_token_as_applicant.post(url, params={"resume_id": create_resume}, json=cover_letter),
+        get_token_as_applicant.post(url, params={"resume_id": create_resume}, json=cover_letter)
+    )
+
+    for response in responses:
+        assert response.status_code == 400
+        assert response.json()["detail"] == "You have already applied to this vacancy with this resume"
+
+
 @pytest.mark.asyncio
 async def test_get_responses(get_token_as_tenant, create_vacancy, apply_to_vacancy):
 
@@ -33,6 +54,23 @@ async def test_get_responses(get_token_as_tenant, create_vacancy, apply_to_vacan
     assert "user" in first_response
 
 
+@pytest.mark.asyncio
+async def test_export_responses(get_token_as_tenant, create_vacancy, apply_to_vacancy):
+
+    response = await get_token_as_tenant.get(f"/response/{create_vacancy}/export_responses", params={"format": "ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert apply_to_vacancy in [row["id"] for row in rows]
+
+    response = await get_token_as_tenant.get(f"/response/{create_vacancy}/export_responses", params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.text.splitlines()[0].startswith("id,status,cover_letter")
+
+
 @pytest.mark.asyncio
 async def test_set_status(get_token_as_tenant, apply_to_vacancy):
 
@@ -44,4 +82,28 @@ async def test_set_status(get_token_as_tenant, apply_to_vacancy):
 
     response = await get_token_as_tenant.put(f"/response/set_status/{response_id}", json=status)
 
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_apply_round_trips(get_token_as_applicant, create_vacancy, create_resume):
+
+    #Warms the cached identity, check_user then needs no query
+    await get_token_as_applicant.get("/user/get_info")
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+
+    try:
+        response = await get_token_as_applicant.post(f"/response/apply_to_vacancy/{create_vacancy}", params={"resume_id": create_resume}, json={"cover_letter": "Hello"})
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    assert response.status_code == 200
+
+    #Vacancy and resume in one SELECT, the response INSERT ... RETURNING and the mail INSERT (6 before)
+    assert len(statements) == 3, statements
@@ -45,4 +45,26 @@ async def test_delete_resume(get_token_as_applicant, create_resume):
 
     response = await get_token_as_applicant.request("DELETE", f"/resume/delete_resume/{resume_id}")
 
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_reads_stick_to_primary_after_write(get_token_as_applicant):
+
+    new_resume = {
+        "title": "Backend Developer",
+        "about": "Read your writes",
+        "city": "Astana",
+        "stack": "Python"
+    }
+
+    response = await get_token_as_applicant.post("/resume/create_resume", json=new_resume)
+
+    assert response.status_code == 200
+    assert "primary_until" in response.cookies
+
+    resume_id = response.json()["Resume"]["id"]
+
+    #The cookie sends this listing to the primary even when a lagging replica is configured
+    response = await get_token_as_applicant.get("/resume/get_all_my_resumes")
+
+    assert resume_id in [resume["id"] for resume in response.json()["Your resumes"]]
@@ -1,3 +1,5 @@
+import asyncio
+import httpx
 import pytest
 
 
@@ -32,4 +34,167 @@ async def test_search_vacancies(get_token_as_applicant):
     assert len(data) > 0
 
     titles = [vacancy["title"] for vacancy in data]
-    assert "Python developer" in titles
\ No newline at end of file
+    assert "Python developer" in titles
+
+@pytest.mark.asyncio
+async def test_search_vacancies_by_title_substring(get_token_as_applicant, create_vacancy):
+
+    response = await get_token_as_applicant.get("/search/search_vacancies", params={"title": "Python"})
+
+    assert response.status_code == 200
+
+    titles = [vacancy["title"] for vacancy in response.json()["vacancies"]]
+    assert "Python developer" in titles
+
+
+@pytest.mark.asyncio
+async def test_search_vacancies_full_text(get_token_as_applicant, create_vacancy):
+
+    response = await get_token_as_applicant.get("/search/search_vacancies", params={"q": "python almaty"})
+
+    assert response.status_code == 200
+
+    vacancies = response.json()["vacancies"]
+    assert len(vacancies) > 0
+    assert all("rank" in vacancy for vacancy in vacancies)
+
+    ranks = [vacancy["rank"] for vacancy in vacancies]
+    assert ranks == sorted(ranks, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_search_resumes_by_skills(get_token_as_tenant, create_resume):
+
+    response = await get_token_as_tenant.get("/search/search_resumes", params={"skills": "Python, PostgreSQL"})
+
+    assert response.status_code == 200
+    assert create_resume in [resume["id"] for resume in response.json()["resumes"]]
+
+    #Exact skill names: "python" does not match "Py"
+    response = await get_token_as_tenant.get("/search/search_resumes", params={"skills": "Py"})
+
+    assert create_resume not in [resume["id"] for resume in response.json()["resumes"]]
+
+
+@pytest.mark.asyncio
+async def test_search_resumes_by_stack_matches_exact_skills(get_token_as_tenant, create_resume):
+
+    #Same semantics as skills= and the skill index: "postgre" does not match "PostgreSQL".
+    #One request only, search_resumes keeps its rate limit in the tests
+    response = await get_token_as_tenant.get("/search/search_resumes", params={"stack": "Postgre"})
+
+    assert response.status_code == 200
+    assert create_resume not in [resume["id"] for resume in response.json()["resumes"]]
+
+
+@pytest.mark.asyncio
+async def test_search_vacancies_sorted_by_compensation(get_token_as_applicant, create_vacancy):
+
+    params = {"city": "Almaty", "compensation_max": 1000000, "sort": "compensation_desc", "limit": 1}
+    response = await get_token_as_applicant.get("/search/search_vacancies", params=params)
+
+    assert response.status_code == 200
+
+    first = response.json()
+    assert first["next_cursor"] is not None
+
+    response = await get_token_as_applicant.get("/search/search_vacancies", params={**params, "cursor": first["next_cursor"]})
+
+    assert response.status_code == 200
+
+    top, second = first["vacancies"][0], response.json()["vacancies"][0]
+    assert (top["compensation"], top["id"]) > (second["compensation"], second["id"])
+
+
+@pytest.mark.asyncio
+async def test_search_vacancies_city_matches_the_same_for_every_sort(get_token_as_applicant, create_vacancy):
+
+    ids = []
+
+    for sort in (None, "newest", "compensation_desc"):
+        params = {"city": "lmat", "limit": 100, **({"sort": sort} if sort else {})}
+        response = await get_token_as_applicant.get("/search/search_vacancies", params=params)
+
+        assert response.status_code == 200
+        ids.append(sorted(vacancy["id"] for vacancy in response.json()["vacancies"]))
+
+    assert ids[0] and ids[0] == ids[1] == ids[2]
+
+
+@pytest.mark.asyncio
+async def test_search_vacancies_facets(get_token_as_applicant, create_vacancy):
+
+    response = await get_token_as_applicant.get("/search/search_vacancies", params={"city": "Almaty", "facets": True})
+
+    assert response.status_code == 200
+
+    facets = response.json()["facets"]
+    cities = {facet["value"]: facet["count"] for facet in facets["city"]}
+    buckets = {facet["value"]: facet["count"] for facet in facets["compensation"]}
+
+    assert cities["Almaty"] >= 1
+    assert buckets["500000"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_saved_search_alert(get_token_as_applicant, get_token_as_tenant):
+
+    response = await get_token_as_applicant.post("/search/saved_searches", json={"city": "almaty", "title": "golang", "compensation": 100000})
+
+    assert response.status_code == 200
+    saved_search_id = response.json()["Saved search"]["id"]
+
+    response = await get_token_as_applicant.get("/search/saved_searches")
+    assert saved_search_id in [saved["id"] for saved in response.json()["Your saved searches"]]
+
+    new_vacancy = {"title": "Senior Golang developer", "compensation": 700000, "city": "Almaty"}
+    response = await get_token_as_tenant.post("/vacancy/create_vacancy", json=new_vacancy)
+    assert response.status_code == 200
+
+    await asyncio.sleep(1)
+
+    async with httpx.AsyncClient() as client:
+        emails = (await client.get("http://localhost:8080/email")).json()
+
+    assert emails[-1]["subject"] == "New vacancy for your saved search!"
+    assert "Senior Golang developer" in emails[-1]["text"]
+
+    response = await get_token_as_applicant.delete(f"/search/saved_searches/{saved_search_id}")
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_suggest(get_token_as_applicant, get_token_as_tenant, create_vacancy, create_resume):
+
+    response = await get_token_as_applicant.get("/search/suggest", params={"field": "title", "prefix": "pyth"})
+
+    assert response.status_code == 200
+    assert "python developer" in [suggestion["value"] for suggestion in response.json()["suggestions"]]
+
+    response = await get_token_as_tenant.get("/search/suggest", params={"field": "skill", "prefix": "Fast", "entity": "resumes"})
+
+    assert response.status_code == 200
+    assert response.json()["suggestions"][0]["value"] == "fastapi"
+
+    #Vacancies have no stack
+    response = await get_token_as_applicant.get("/search/suggest", params={"field": "skill", "prefix": "py"})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_search_vacancies_near(get_token_as_applicant, create_vacancy):
+
+    #Talgar is about 30 km from Almaty, Astana about 970 km
+    response = await get_token_as_applicant.get("/search/search_vacancies", params={"near": "Talgar", "radius_km": 50})
+
+    assert response.status_code == 200
+    assert create_vacancy in [vacancy["id"] for vacancy in response.json()["vacancies"]]
+
+    response = await get_token_as_applicant.get("/search/search_vacancies", params={"near": "Astana", "radius_km": 50})
+
+    assert create_vacancy not in [vacancy["id"] for vacancy in response.json()["vacancies"]]
+
+    response = await get_token_as_applicant.get("/search/search_vacancies", params={"near": "Atlantis"})
+
+    assert response.status_code == 400
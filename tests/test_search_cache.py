@@ -0,0 +1,96 @@
+import time
+import pytest
+import fakeredis.aioredis
+
+from backend.utils.local_cache import local_cache
+from backend.utils.search_cache import (
+    set_search_cache, get_search_cache, get_generation, invalidate_search_cache, tag_key,
+    acquire_refresh_lock, release_refresh_lock, lock_key, cached_search, purge_legacy_search_keys, SEARCH_LOCK_MIN_WAIT
+)
+
+
+ROW = {"title": "Backend developer", "city": "Berlin", "stack": "python", "compensation": 1000}
+
+
+@pytest.mark.asyncio
+async def test_fill_is_stored_and_evicted():
+    pytest.importorskip("lupa")
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    key = "search:resumes:page:fill"
+
+    await set_search_cache(redis, "resumes", key, ["city:berlin"], b'{"items":[]}', await get_generation(redis, "resumes"))
+
+    assert (await get_search_cache(redis, key))[1] == b'{"items":[]}'
+    assert await redis.smembers(tag_key("resumes", "city:berlin")) == {key}
+
+    await invalidate_search_cache(redis, "resumes", ROW)
+    local_cache.evict(key)
+
+    assert await get_search_cache(redis, key) is None
+
+
+@pytest.mark.asyncio
+async def test_fill_read_before_a_write_is_dropped():
+    pytest.importorskip("lupa")
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    key = "search:resumes:page:race"
+
+    #The page is read, then a write commits and invalidates before the page is stored
+    generation = await get_generation(redis, "resumes")
+    await invalidate_search_cache(redis, "resumes", ROW)
+    await set_search_cache(redis, "resumes", key, ["city:berlin"], b'{"items":["old"]}', generation)
+
+    local_cache.evict(key)
+    assert await get_search_cache(redis, key) is None
+    assert not await redis.exists(tag_key("resumes", "city:berlin"))
+
+
+@pytest.mark.asyncio
+async def test_expired_holder_keeps_next_holders_lock():
+    pytest.importorskip("lupa")
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    first = await acquire_refresh_lock(redis, "page")
+    await redis.delete(lock_key("page"))
+    second = await acquire_refresh_lock(redis, "page")
+
+    #The first holder ran past SEARCH_LOCK_TTL, its release must leave the second lock alone
+    await release_refresh_lock(redis, "page", first)
+    assert await redis.get(lock_key("page")) == second
+
+    await release_refresh_lock(redis, "page", second)
+    assert not await redis.exists(lock_key("page"))
+
+
+@pytest.mark.asyncio
+async def test_waiter_stops_when_holder_is_gone():
+    pytest.importorskip("lupa")
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    key = "search:resumes:page:waiter"
+
+    #Another worker holds the lock and then goes away without storing the page
+    await redis.set(lock_key(key), "other", px=100)
+
+    async def loader(session):
+        return {"items": []}
+
+    start = time.perf_counter()
+    body, source = await cached_search(redis, "resumes", key, ["all"], None, loader)
+
+    assert (body, source) == (b'{"items":[]}', "db")
+    #It loads the page itself once the lock is gone instead of waiting out lock_wait()
+    assert time.perf_counter() - start < SEARCH_LOCK_MIN_WAIT
+
+
+@pytest.mark.asyncio
+async def test_legacy_purge_runs_once():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    await redis.set("search:resumes:version:1:page", "old")
+    await purge_legacy_search_keys(redis)
+    assert not await redis.exists("search:resumes:version:1:page")
+
+    #Later starts skip the keyspace scan
+    await redis.set("search:resumes:version:1:page", "old")
+    await purge_legacy_search_keys(redis)
+    assert await redis.exists("search:resumes:version:1:page")
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+import fakeredis.aioredis
+from types import SimpleNamespace
+
+from backend.utils.skill_index import SkillIndex
+
+
+@pytest.fixture
+def index():
+    skill_index = SkillIndex()
+    skill_index.ready = True
+
+    resumes = [
+        (1, 10, "Almaty", "FastAPI Developer", "FastAPI, PostgreSQL, Python"),
+        (2, 11, "Astana", "Python Developer", "Python, Django"),
+        (3, 12, "Almaty", "Go Developer", "Go, PostgreSQL"),
+        (4, 10, "Almaty", "Data Engineer", "MicroPython, Kafka"),
+    ]
+
+    for resume_id, applicant_id, city, title, stack in resumes:
+        skill_index.add(SimpleNamespace(id=resume_id, applicant_id=applicant_id, city=city, title=title, stack=stack))
+
+    return skill_index
+
+
+def test_skill_index_and_or(index):
+    assert index.search(["python"]) == [1, 2]
+    assert index.search(["python", "postgresql"]) == [1]
+    assert index.search(["django", "go"], match_all=False) == [2, 3]
+    assert index.search(["python"], city="alma") == [1]
+
+
+def test_skill_index_pagination(index):
+    assert index.search(["postgresql", "python"], match_all=False, limit=2) == [1, 2]
+    assert index.search(["postgresql", "python"], match_all=False, limit=2, after_id=2) == [3]
+
+
+def test_skill_index_incremental_updates(index):
+    index.add(SimpleNamespace(id=2, applicant_id=11, city="Astana", title="Go Developer", stack="Go"))
+    index.remove(3)
+
+    assert index.search(["python"]) == [1]
+    assert index.search(["go"]) == [2]
+
+    index.remove_applicant(10)
+
+    assert index.search(["fastapi"]) == []
+    assert index.stats()["resumes"] == 1
+
+
+def test_skill_index_generation(index):
+    index.generation = 5
+
+    #Only this worker wrote since the build
+    index.advance(6)
+    assert index.is_current(6)
+
+    #Another worker's write came first, the index stays behind until the next rebuild
+    index.advance(8)
+    assert not index.is_current(8)
+    assert index.generation == 6
+
+    index.advance(None)
+    assert index.generation == 6
+
+
+@pytest.mark.asyncio
+async def test_skill_index_refresh_survives_errors(index):
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    calls = 0
+
+    async def build(session_factory, redis):
+        nonlocal calls
+        calls += 1
+        raise ConnectionError("database is gone")
+
+    index.build = build
+    task = asyncio.create_task(index.refresh_forever(None, redis, 0))
+
+    while calls < 3:
+        await asyncio.sleep(0)
+
+    task.cancel()
+
+    assert index.stats()["refresh_errors"] >= 2
+    assert index.search(["python"]) == [1, 2]
@@ -0,0 +1,48 @@
+import pytest
+import fakeredis.aioredis
+from collections import Counter
+
+from backend.utils.suggest import apply_suggest_deltas, get_suggestions, write_counts, prefix_key, SUGGEST_SCAN
+
+
+def resume(title: str) -> dict:
+    return {"city": "Almaty", "title": title, "stack": ""}
+
+
+@pytest.mark.asyncio
+async def test_frequent_term_after_the_lex_scan_is_suggested():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    #Hundreds of rare titles sort before the frequent one
+    rare = [resume(f"python a{i:04d}") for i in range(SUGGEST_SCAN + 50)]
+    frequent = [resume("python zope developer")] * 5
+
+    await apply_suggest_deltas(redis, "resumes", added=rare + frequent)
+
+    for prefix in ("p", "pyt", "python", "python zo"):
+        suggestions = await get_suggestions(redis, "resumes", "title", prefix, limit=3)
+        assert suggestions[0] == {"value": "python zope developer", "count": 5}
+
+    #Ties come in term order
+    assert [s["value"] for s in await get_suggestions(redis, "resumes", "title", "py", limit=3)] == ["python zope developer", "python a0000", "python a0001"]
+
+
+@pytest.mark.asyncio
+async def test_removed_terms_leave_the_prefix_sets():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    await apply_suggest_deltas(redis, "resumes", added=[resume("go developer"), resume("golang developer")])
+    await apply_suggest_deltas(redis, "resumes", removed=[resume("go developer")])
+
+    assert await get_suggestions(redis, "resumes", "title", "go") == [{"value": "golang developer", "count": 1}]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_replaces_prefix_sets():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    await write_counts(redis, "resumes", "title", Counter({"rust developer": 2, "java developer": 1}))
+    await write_counts(redis, "resumes", "title", Counter({"rust developer": 3}))
+
+    assert await get_suggestions(redis, "resumes", "title", "ru") == [{"value": "rust developer", "count": 3}]
+    assert not await redis.exists(prefix_key("resumes", "title", "j"))
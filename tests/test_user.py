@@ -45,6 +45,11 @@ async def test_edit_name(get_token_as_tenant):
 
     assert response.status_code == 200
 
+    #The cached identity and profile were evicted by the rename
+    response = await get_token_as_tenant.get("/user/get_info")
+
+    assert response.json()["info"]["name"] == "Andrey"
+
 
 @pytest.mark.order(-1)
 async def test_delete_user(get_token_as_tenant):
@@ -55,4 +60,9 @@ async def test_delete_user(get_token_as_tenant):
 
     response = await get_token_as_tenant.request("DELETE", "/user/delete_user", json=confirm_password)
 
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+    #A deleted user is not kept alive by the identity cache
+    response = await get_token_as_tenant.get("/user/get_info")
+
+    assert response.status_code == 404
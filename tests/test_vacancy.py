@@ -20,6 +20,20 @@ async def test_get_all_my_vacancies(get_token_as_tenant):
     assert data["Your vacancies"][0]["title"] == "Python developer"
 
 
+@pytest.mark.asyncio
+async def test_vacancy_matches(get_token_as_tenant, create_vacancy, create_resume):
+
+    response = await get_token_as_tenant.get(f"/vacancy/{create_vacancy}/matches", params={"limit": 100})
+
+    assert response.status_code == 200
+
+    matches = response.json()["matches"]
+    scores = [match["score"] for match in matches]
+
+    assert create_resume in [match["id"] for match in matches]
+    assert scores == sorted(scores, reverse=True)
+
+
 @pytest.mark.asyncio
 async def test_edit_vacancy(get_token_as_tenant, create_vacancy):
 